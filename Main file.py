@@ -1,7 +1,48 @@
+import argparse
+import csv
+import io
+import json
+import mmap
+import os
+import socket
+import sqlite3
+import struct
+import sys
+import threading
+import zlib
 from abc import ABC, abstractmethod
-from datetime import datetime
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from heapq import merge
+from http.server import BaseHTTPRequestHandler, HTTPServer, ThreadingHTTPServer
+from itertools import islice, repeat
+from operator import itemgetter
+from collections import OrderedDict, deque
+from collections.abc import MutableMapping
+from datetime import date, datetime
+from enum import IntEnum
+from functools import wraps
+from sys import intern
+from time import perf_counter, sleep
+from urllib.parse import parse_qs, unquote, urlsplit
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks (Windows): File_Lock then only serializes the threads of one process.
+    fcntl = None
+
+try:
+    import numpy
+except ImportError:
+    # Catalog_Analytics falls back to plain Python loops.
+    numpy = None
 
 class Movie_Abstract(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def text_file(self):
         """
@@ -13,8 +54,26 @@ class Movie_Abstract(ABC):
 class BaseFilm(Movie_Abstract):
     """
     Base class for all film-related objects. Contains common attributes and methods for both movies and shows.
+
+    Attributes are declared in __slots__, so instances carry no per-instance __dict__. That keeps large catalogs
+    small in memory; subclasses must declare __slots__ as well.
+
+    The text written to the data file is rendered once and cached until a setter changes the record, so saves,
+    listings and searches do not re-render unchanged records.
+
+    The release date is also kept as a date ordinal, parsed once when the record is created, for sorting and range
+    filters.
     """
 
+    __slots__ = ("__id", "__title", "__genre", "__duration", "__producer", "__release_date", "__release_ordinal",
+                 "__number_of_views", "__average_rating", "__director", "__age_restrictions", "__type", "__episodes",
+                 "__text")
+    # Release dates repeat across many records: each distinct date is parsed once, and records released on the same
+    # day share one ordinal object. Only valid dates are kept, and the cache is emptied once it holds ORDINAL_CACHE_SIZE
+    # of them, so it stays small whatever dates pass through.
+    __ordinals = {}
+    ORDINAL_CACHE_SIZE = 65536
+
     def __init__(self, id, title, genre, producer, release_date, number_of_views, average_rating, director,
                  age_restrictions, duration, types, episodes):
         """
@@ -40,34 +99,54 @@ class BaseFilm(Movie_Abstract):
         self.__duration = duration
         self.__producer = producer
         self.__release_date = release_date
+        ordinal = BaseFilm.__ordinals.get(release_date)
+        if ordinal is None:
+            try:
+                ordinal = self.release_ordinal(release_date)
+            except ValueError:
+                ordinal = 0
+            else:
+                if len(BaseFilm.__ordinals) >= BaseFilm.ORDINAL_CACHE_SIZE:
+                    BaseFilm.__ordinals.clear()
+                BaseFilm.__ordinals[release_date] = ordinal
+        self.__release_ordinal = ordinal
         self.__number_of_views = number_of_views
         self.__average_rating = average_rating
         self.__director = director
         self.__age_restrictions = age_restrictions
         self.__type = types
         self.__episodes = episodes
+        self.__text = None
 
     def text_file(self):
         """
-        Returns a textual representation of the movie/show's details.
+        Returns a textual representation of the movie/show's details. The text is cached until the record changes.
 
         Returns:
             str: A formatted string containing the details of the movie/show.
         """
-        return (
-            f"ID: {self.get_id()}\n"
-            f"Title: {self.get_movie_title()}\n"
-            f"Genre: {self.get_genre()}\n"
-            f"Duration: {self.get_duration()}\n"
-            f"Producer: {self.get_producer()}\n"
-            f"Release Date: {self.get_release_date()}\n"
-            f"Number of Views: {self.get_number_of_views()}\n"
-            f"Average Rating: {self.get_average_rating()}\n"
-            f"Director: {self.get_director()}\n"
-            f"Age Restriction: {self.get_age_restrictions()}\n"
-            f"Type: {self.get_type()}\n"
-            f"Episodes: {self.get_episodes()}\n"
-        )
+        text = self.__text
+        if text is None:
+            fields = (self.__id, self.__title, self.__average_rating)
+            text = self.__text = (
+                f"ID: {self.__id}\n"
+                f"Title: {self.__title}\n"
+                f"Genre: {self.__genre}\n"
+                f"Duration: {self.__duration}\n"
+                f"Producer: {self.__producer}\n"
+                f"Release Date: {self.__release_date}\n"
+                f"Number of Views: {self.__number_of_views}\n"
+                f"Average Rating: {self.__average_rating}\n"
+                f"Director: {self.__director}\n"
+                f"Age Restriction: {self.__age_restrictions}\n"
+                f"Type: {self.__type}\n"
+                f"Episodes: {self.__episodes}\n"
+            )
+            # A background compaction renders records while setters may run on another thread. If a field changed
+            # while this text was being rendered, the cached copy is stale and must not be kept.
+            if fields != (self.__id, self.__title, self.__average_rating):
+                self.__text = None
+        return text
 
     def get_id(self):
         """
@@ -86,6 +165,7 @@ class BaseFilm(Movie_Abstract):
             id (str): The new ID for the movie/show.
         """
         self.__id = id
+        self.__text = None
 
     def get_movie_title(self):
         """
@@ -104,6 +184,7 @@ class BaseFilm(Movie_Abstract):
             movie_title (str): The new title for the movie/show.
         """
         self.__title = movie_title
+        self.__text = None
 
     def get_average_rating(self):
         """
@@ -126,6 +207,7 @@ class BaseFilm(Movie_Abstract):
         """
         if 0 <= new_rating <= 10:
             self.__average_rating = new_rating
+            self.__text = None
         else:
             raise ValueError("Average rating must be between 0 and 10.")
 
@@ -156,6 +238,36 @@ class BaseFilm(Movie_Abstract):
         """
         return self.__release_date
 
+    def get_release_ordinal(self):
+        """
+        Returns the release date of the movie/show as a date ordinal (see date.toordinal).
+
+        Returns:
+            int: The ordinal, or 0 if the release date is not a valid date.
+        """
+        return self.__release_ordinal
+
+    @staticmethod
+    def release_ordinal(release_date):
+        """
+        Converts a release date to the ordinal used for sorting and range filters.
+
+        Parameters:
+            release_date: A date, or a string in YYYY-MM-DD format.
+
+        Returns:
+            int: The date ordinal.
+
+        Raises:
+            ValueError: If the string is not a valid date.
+        """
+        if isinstance(release_date, date):
+            return release_date.toordinal()
+        try:
+            return date.fromisoformat(release_date).toordinal()
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid release date '{release_date}', expected YYYY-MM-DD.")
+
     def get_number_of_views(self):
         """
         Returns the number of views for the movie/show.
@@ -216,6 +328,8 @@ class Movies(BaseFilm):
     Subclass representing a movie. Inherits from BaseFilm and implements its functionality.
     """
 
+    __slots__ = ()
+
     def __init__(self, id, title, genre, producer, release_date, number_of_views, average_rating, director,
                  age_restrictions, duration):
         """
@@ -243,6 +357,8 @@ class Shows(BaseFilm):
     Subclass representing a show. Inherits from BaseFilm and implements its functionality.
     """
 
+    __slots__ = ()
+
     def __init__(self, id, title, genre, producer, release_date, number_of_views, average_rating, director,
                  age_restrictions, duration, episodes):
         """
@@ -265,6 +381,17 @@ class Shows(BaseFilm):
                          age_restrictions, duration, "Show", episodes)
 
 
+class Movie_Action(IntEnum):
+    """
+    The kinds of change observers are notified about. The values are the action numbers observers have always
+    received, so observers comparing against plain integers keep working.
+    """
+
+    ADDED = 1
+    RATING_UPDATED = 2
+    DELETED = 5
+
+
 class Movie_observer(ABC):
     """
     Abstract base class for movie observers. All concrete observers must implement the update_viewer and update_observer methods.
@@ -277,7 +404,7 @@ class Movie_observer(ABC):
 
         Parameters:
             movie: The movie that was updated.
-            action: The type of action (e.g., add, update, delete).
+            action: The Movie_Action describing the change.
         """
         pass
 
@@ -288,10 +415,24 @@ class Movie_observer(ABC):
 
         Parameters:
             movie: The movie that was updated.
-            action: The type of action (e.g., add, update, delete).
+            action: The Movie_Action describing the change.
         """
         pass
 
+    def update_batch(self, movies, action):
+        """
+        Method to notify about the same change applied to many movies at once (bulk operations). Observers that can
+        handle a whole batch should override it; by default each movie is passed to update_viewer and
+        update_observer in turn.
+
+        Parameters:
+            movies: The movies that were changed.
+            action: The Movie_Action describing the change.
+        """
+        for movie in movies:
+            self.update_viewer(movie, action)
+            self.update_observer(movie, action)
+
 
 class Observer_Notification(Movie_observer):
     """
@@ -304,14 +445,14 @@ class Observer_Notification(Movie_observer):
 
         Parameters:
             movie: The movie that was updated.
-            action: The action to notify about (1 = added, 2 = rating updated, 5 = deleted).
+            action: The Movie_Action describing the change.
         """
         print()
-        if action == 1:
+        if action == Movie_Action.ADDED:
             print(f"Viewer Notification: A new movie '{movie.get_movie_title()}' has been added!")
-        elif action == 2:
+        elif action == Movie_Action.RATING_UPDATED:
             print(f"Viewer Notification: Movie '{movie.get_movie_title()}' rating has been updated!")
-        elif action == 5:
+        elif action == Movie_Action.DELETED:
             print(f"Viewer Notification: Movie '{movie.get_movie_title()}' has been deleted!")
 
     def update_observer(self, movie, action):
@@ -325,316 +466,6074 @@ class Observer_Notification(Movie_observer):
         print()
         print(f"Observer Update: Action {action} performed. Check the database!")
 
+    def update_batch(self, movies, action):
+        """
+        Notifies the viewer and the observer once about an action performed on many movies.
+
+        Parameters:
+            movies: The movies that were changed.
+            action: The Movie_Action describing the change.
+        """
+        print()
+        if action == Movie_Action.ADDED:
+            print(f"Viewer Notification: {len(movies)} new movies have been added!")
+        elif action == Movie_Action.RATING_UPDATED:
+            print(f"Viewer Notification: The ratings of {len(movies)} movies have been updated!")
+        elif action == Movie_Action.DELETED:
+            print(f"Viewer Notification: {len(movies)} movies have been deleted!")
+        print()
+        print(f"Observer Update: Action {action} performed on {len(movies)} movies. Check the database!")
+
 
-class Movie_Manager:
+class Observer_Dispatcher:
     """
-    Manages a collection of movies, including adding, removing, and updating movies. It also allows searching and saving the movie list to a file.
+    Delivers notifications to observers. This dispatcher calls them right away, on the thread that made the change.
+    An observer that raises does not stop the others from being notified.
     """
 
-    def __init__(self, filename):
+    def dispatch(self, observers, movies, action, batch=False):
         """
-        Initializes the Movie Manager with a filename to load and save movies.
+        Delivers a notification to the given observers.
 
         Parameters:
-            filename: The file from which movie data is loaded and saved.
+            observers: The observers to notify.
+            movies: The movie that was changed, or a list of movies for a batch.
+            action: The type of action performed (e.g., add, update, delete).
+            batch: True if movies is a list of movies changed by a bulk operation.
         """
-        self.__filename = filename
-        self.__movies = []
-        self.__observers = []
-        self.load_movies()
+        self.deliver(observers, movies, action, batch)
 
-    def add_observer(self, observer):
+    @staticmethod
+    def deliver(observers, movies, action, batch):
         """
-        Adds an observer to the list of observers for notifications.
+        Calls each observer in turn, reporting and isolating errors raised by an observer.
 
         Parameters:
-            observer: The observer to be added.
+            observers: The observers to notify.
+            movies: The movie that was changed, or a list of movies for a batch.
+            action: The type of action performed.
+            batch: True if movies is a list of movies changed by a bulk operation.
         """
-        self.__observers.append(observer)
+        for observer in observers:
+            try:
+                if batch:
+                    observer.update_batch(movies, action)
+                else:
+                    observer.update_viewer(movies, action)
+                    observer.update_observer(movies, action)
+            except Exception as e:
+                print(f"Error in observer {type(observer).__name__}: {e}")
 
-    def notify_observer(self, movie, action):
+    def flush(self, timeout=None):
         """
-        Notifies all observers about a change to a movie.
+        Waits until every notification dispatched so far has been delivered. Nothing to wait for here.
 
         Parameters:
-            movie: The movie that was updated.
-            action: The type of action performed on the movie (e.g., add, update, delete).
+            timeout: The maximum number of seconds to wait, or None to wait as long as needed.
+
+        Returns:
+            bool: True if everything was delivered.
         """
-        for observer in self.__observers:
-            observer.update_viewer(movie, action)
-            observer.update_observer(movie, action)
+        return True
 
-    def load_movies(self):
+    def close(self):
         """
-        Loads movie data from the specified file. If the file doesn't exist, creates an empty one.
+        Delivers pending notifications and stops the dispatcher. Nothing to do here.
         """
-        try:
-            with open(self.__filename, "r") as file:
-                contents_of_file = file.read().strip()
-                movie_data = contents_of_file.split("\n\n")
-                for movie in movie_data:
-                    lines = movie.split("\n")
-                    data = {}
-                    for line in lines:
-                        if ": " in line:
-                            key, value = line.split(": ", 1)
-                            data[key] = value.strip()
-
-                    if all(key in data for key in ['ID', 'Title', 'Genre', 'Duration', 'Producer', 'Release Date',
-                                                   'Number of Views', 'Average Rating', 'Director', 'Age Restriction',
-                                                   'Type']):
-                        if data["Type"] == "Movie":
-                            movie_obj = Movies(
-                                id=data["ID"],
-                                title=data["Title"],
-                                genre=data["Genre"],
-                                duration=int(data["Duration"]),
-                                producer=data["Producer"],
-                                release_date=data["Release Date"],
-                                number_of_views=int(data["Number of Views"]),
-                                average_rating=float(data["Average Rating"]),
-                                director=data["Director"],
-                                age_restrictions=data["Age Restriction"]
-                            )
-
-                        elif data["Type"] == "Show":
-                            movie_obj = Shows(
-                                id=data["ID"],
-                                title=data["Title"],
-                                genre=data["Genre"],
-                                duration=int(data["Duration"]),
-                                producer=data["Producer"],
-                                release_date=data["Release Date"],
-                                number_of_views=int(data["Number of Views"]),
-                                average_rating=float(data["Average Rating"]),
-                                director=data["Director"],
-                                age_restrictions=data["Age Restriction"],
-                                episodes=int(data["Episodes"])
-                            )
-                        self.__movies.append(movie_obj)
+        pass
 
-        except FileNotFoundError:
-            print("File doesn't exist. Creating an empty file.")
-            open(self.__filename, "w").close()
 
-        except Exception as e:
-            print(f"Error while loading movies: {e}")
+class Async_Observer_Dispatcher(Observer_Dispatcher):
+    """
+    Delivers notifications from a bounded queue on a worker thread, so a slow observer does not add its latency to
+    the change that triggered it. What happens when the queue is full is set by the backpressure policy:
 
-    def save_movies(self):
-        """
-        Saves the current list of movies to the file.
+    - "block": the changing thread waits until there is room.
+    - "drop_oldest": the oldest queued notification is dropped to make room.
+    - "coalesce": a notification with the same action as the latest one still queued for the same movie is
+      dropped; otherwise the changing thread waits for room. Only the latest notification of each movie is
+      compared, so add, delete, add still reaches observers in that order. Observers read the movie when they are
+      notified, so they still see the latest state.
+
+    Observers must not call flush or close from inside a notification.
+    """
+
+    BACKPRESSURE_POLICIES = ("block", "drop_oldest", "coalesce")
+
+    def __init__(self, max_size=1024, backpressure="block"):
         """
-        try:
-            with open(self.__filename, "w") as file:
-                for movie in self.__movies:
-                    file.write(movie.text_file() + "\n")
+        Starts the worker thread.
 
-        except Exception as e:
-            print(f"Error while saving movies: {e}")
+        Parameters:
+            max_size: The maximum number of queued notifications.
+            backpressure: "block", "drop_oldest" or "coalesce".
 
-    def search_movies(self):
+        Raises:
+            ValueError: If the policy is unknown or the size is not positive.
         """
-        Allows the user to search for movies by title or genre and displays the results.
+        if backpressure not in self.BACKPRESSURE_POLICIES:
+            raise ValueError("Backpressure must be 'block', 'drop_oldest' or 'coalesce'.")
+        if max_size < 1:
+            raise ValueError("Queue size must be a positive number.")
+
+        self.__max_size = max_size
+        self.__backpressure = backpressure
+        self.__queue = deque()
+        # With "coalesce": the latest queued notification of each movie, by ID.
+        self.__latest = {}
+        self.__condition = threading.Condition()
+        self.__busy = False
+        self.__closed = False
+        self.__dropped = 0
+        self.__worker = threading.Thread(target=self.__run, name="observer-dispatcher", daemon=True)
+        self.__worker.start()
+
+    def get_dropped(self):
         """
-        while True:
-            search_criteria = input("\nSearch by (1) Title or (2) Genre? (Enter 1 or 2, or 'quit' to exit): ").lower()
-            if search_criteria == "1":
-                search_input = input("Enter the title to search for: ").strip().lower()
-                results = [movie for movie in self.__movies if search_input in movie.get_movie_title().lower()]
-            elif search_criteria == "2":
-                search_input = input("Enter the genre to search for: ").strip().lower()
-                results = [movie for movie in self.__movies if search_input in movie.get_genre().lower()]
-            elif search_criteria == "quit":
-                print("Exiting search.")
-                break
-            else:
-                print("Invalid input! Please enter 1, 2, or 'quit'.")
-                continue
+        Returns how many notifications were dropped because the queue was full.
 
-            if results:
-                print("\n--- Search Results ---")
-                for movie in results:
-                    print(movie.text_file())
-            else:
-                print("No results found. Try again.")
+        Returns:
+            int: The number of dropped notifications.
+        """
+        return self.__dropped
 
-    def add_movie_from_input(self):
+    def dispatch(self, observers, movies, action, batch=False):
         """
-        Prompts the user to input information about a new movie and adds it to the list.
+        Queues a notification for the worker thread. After close, notifications are delivered right away.
+
+        Parameters:
+            observers: The observers to notify.
+            movies: The movie that was changed, or a list of movies for a batch.
+            action: The type of action performed (e.g., add, update, delete).
+            batch: True if movies is a list of movies changed by a bulk operation.
         """
-        while True:
-            id = input("Enter Movie ID: ")
-            if any(movie.get_id() == id for movie in self.__movies):
-                print("ID already exists!")
-                continue
-            break
+        coalesce = self.__backpressure == "coalesce"
+        with self.__condition:
+            if not self.__closed:
+                if coalesce and not batch:
+                    latest = self.__latest.get(movies.get_id())
+                    if latest is not None and not latest[3] and latest[2] == action:
+                        return
+                while len(self.__queue) >= self.__max_size and not self.__closed:
+                    if self.__backpressure == "drop_oldest":
+                        self.__queue.popleft()
+                        self.__dropped += 1
+                    else:
+                        self.__condition.wait()
 
-        # INPUT TITLE
+            if not self.__closed:
+                notification = (observers, movies, action, batch)
+                self.__queue.append(notification)
+                if coalesce:
+                    for movie in movies if batch else (movies,):
+                        self.__latest[movie.get_id()] = notification
+                self.__condition.notify_all()
+                return
+
+        self.deliver(observers, movies, action, batch)
+
+    def __run(self):
+        """
+        Worker loop: takes notifications off the queue and delivers them until closed and drained.
+        """
         while True:
-            title = input("Enter Title: ").strip()
-            new_title = title.lower()
+            with self.__condition:
+                while not self.__queue and not self.__closed:
+                    self.__condition.wait()
+                if not self.__queue:
+                    return
+                notification = self.__queue.popleft()
+                if self.__latest:
+                    self.__forget(notification)
+                self.__busy = True
+                self.__condition.notify_all()
 
-            if any(movie.get_movie_title().strip().lower() == new_title for movie in self.__movies):
-                print("Title already exists!")
-                continue
-            break
+            self.deliver(*notification)
 
-        # INPUT GENRE
-        genre = input("Enter Genre: ")
+            with self.__condition:
+                self.__busy = False
+                self.__condition.notify_all()
 
-        # INPUT DURATION
-        while True:
-            try:
-                duration = int(input("Enter Duration (in minutes): "))
-                if duration <= 0:
-                    print("Duration must be a positive number!")
-                    continue
+    def __forget(self, notification):
+        """
+        Stops tracking a notification taken off the queue as the latest one of its movies. Must be called while
+        holding the condition.
+        """
+        observers, movies, action, batch = notification
+        for movie in movies if batch else (movies,):
+            id = movie.get_id()
+            if self.__latest.get(id) is notification:
+                del self.__latest[id]
 
-            except ValueError:
-                print("Invalid input for duration!")
-                continue
-            break
+    def flush(self, timeout=None):
+        """
+        Waits until every queued notification has been delivered.
 
-        # INPUT PRODUCER
-        producer = input("Enter Producer: ")
+        Parameters:
+            timeout: The maximum number of seconds to wait, or None to wait as long as needed.
 
-        # INPUT RELEASE DATE
-        while True:
-            release_date = input("Enter Release Date (YYYY-MM-DD): ").strip()
-            try:
-                datetime.strptime(release_date, "%Y-%m-%d")
-            except ValueError:
-                print("Invalid date format! Please use 'YYYY-MM-DD'.")
-                continue
-            break
+        Returns:
+            bool: True if the queue was drained, False if the timeout expired first.
+        """
+        with self.__condition:
+            return self.__condition.wait_for(lambda: not self.__queue and not self.__busy, timeout)
 
-        # INPUT NUMBER OF VIEWS
-        while True:
-            try:
-                number_of_views = int(input("Enter Number of Views: "))
-                if number_of_views < 0:
-                    print("Number of views must not be negative.")
-                    continue
-            except ValueError:
-                print("Invalid input for number of views! Please enter a number.")
-                continue
-            break
+    def close(self):
+        """
+        Delivers the notifications still queued, then stops the worker thread.
+        """
+        with self.__condition:
+            self.__closed = True
+            self.__condition.notify_all()
+        self.__worker.join()
 
-        # INPUT AVERAGE RATING
-        while True:
-            try:
-                average_rating = float(input("Enter Average Rating (0-10): "))
-                if not (0 <= average_rating <= 10):
-                    print("Average rating must be between 0 and 10!")
-                    continue
-            except ValueError:
-                print("Invalid input for average rating! Please enter a number.")
-                continue
-            break
 
-        # INPUT DIRECTOR
-        director = input("Enter Director: ")
+class Catalog_Parser:
+    """
+    Streaming reader for the "Key: value" text format written by BaseFilm.text_file. Records are built one at a time
+    while the lines go by, so only the record being read is held in memory.
+    """
 
-        # INPUT AGE RESTRICTIONS
-        while True:
-            age_restrictions = input("Enter Age Restriction (PG-13, R, 18+, 21+): ").strip()
-            if age_restrictions not in ["PG-13", "R", "18+", "21+"]:
-                print("Invalid age restriction! Please choose from 'PG-13', 'R', '18+', or '21+'.")
-                continue
-            break
+    REQUIRED_FIELDS = ('ID', 'Title', 'Genre', 'Duration', 'Producer', 'Release Date', 'Number of Views',
+                       'Average Rating', 'Director', 'Age Restriction', 'Type')
+    FIELDS = REQUIRED_FIELDS + ('Episodes',)
+    # Files smaller than this are parsed in the calling process: starting worker processes would cost more than
+    # they save.
+    PARALLEL_MIN_BYTES = 8 * 1024 * 1024
 
-        # INPUT TYPE (MOVIE OR SHOW)
-        while True:
-            type_of_movie = input("Enter Type (Movie or Show): ").capitalize()
-            if type_of_movie not in ["Movie", "Show"]:
-                print("Invalid type! Please choose either 'Movie' or 'Show'.")
-                continue
-            break
+    def __init__(self):
+        """
+        Initializes the parser with an empty list of errors.
+        """
+        self.__errors = []
 
-        if type_of_movie == "Movie":
-            new_movie = Movies(
-                id=id,
-                title=title,
-                genre=genre,
-                producer=producer,
-                release_date=release_date,
-                number_of_views=number_of_views,
-                average_rating=average_rating,
-                director=director,
-                age_restrictions=age_restrictions,
-                duration=duration
-            )
+    def get_errors(self):
+        """
+        Returns the problems found in the records parsed so far.
 
-        else:
-            try:
-                episodes = int(input("Enter Number of Episodes: "))
-                if episodes < 1:
-                    print("Episodes must be at least 1!")
-                    return
+        Returns:
+            list: (line number, message) pairs, one per malformed line or record.
+        """
+        return self.__errors
 
-            except ValueError:
-                print("Invalid input for episodes!")
-                return
+    def parse(self, lines, first_line=1):
+        """
+        Yields the movies/shows described by the given lines. Malformed records are skipped and recorded in the
+        errors together with the line they start on.
 
-            new_movie = Shows(
-                id=id,
-                title=title,
-                genre=genre,
-                producer=producer,
-                release_date=release_date,
-                number_of_views=number_of_views,
-                average_rating=average_rating,
-                director=director,
-                age_restrictions=age_restrictions,
-                duration=duration,
-                episodes=episodes
-            )
+        Parameters:
+            lines: An iterable of lines, such as an open file.
+            first_line: The line number of the first line, used when parsing a slice of a larger file.
 
-        self.__movies.append(new_movie)
-        self.save_movies()
-        self.notify_observer(new_movie, 1)
-        print(f"Movie/Show '{title}' added successfully!")
+        Yields:
+            BaseFilm: Each well-formed movie/show, in file order.
+        """
+        for _, movie in self.parse_records(lines, first_line):
+            yield movie
 
-    def update_movie_rating(self, id, new_rating):
+    def parse_records(self, lines, first_line=1):
         """
-        Updates the rating of an existing movie/show.
+        Like parse, but also yields the line number each movie/show starts on.
 
         Parameters:
-            id: The ID of the movie/show to update.
-            new_rating: The new rating for the movie/show (between 0 and 10).
+            lines: An iterable of lines, such as an open file.
+            first_line: The line number of the first line, used when parsing a slice of a larger file.
+
+        Yields:
+            tuple: The line number and the movie/show, for each well-formed record in file order.
         """
-        try:
-            if not (0 <= new_rating <= 10):
-                raise ValueError("Average rating must be between 0 and 10.")
+        data = {}
+        record_line = None
+        number = first_line
+        for number, line in enumerate(lines, first_line):
+            line = line.rstrip("\r\n")
+            if not line.strip():
+                if data:
+                    movie = self.__finish(data, record_line)
+                    if movie is not None:
+                        yield record_line, movie
+                    data = {}
+                continue
 
-            for movie in self.__movies:
-                if movie.get_id() == id:
-                    movie.set_movie_rating(new_rating)
-                    self.notify_observer(movie, 2)
-                    self.save_movies()
-                    print(f"Rating for Movie/Show '{movie.get_movie_title()}' updated to {new_rating}.")
-                    return
-            print(f"No movie/show found with ID '{id}'.")
+            if not data:
+                record_line = number
+            key, separator, value = line.partition(": ")
+            if not separator:
+                self.__errors.append((number, f"Expected 'Key: value', got '{line}'."))
+                continue
+            data[key] = value.strip()
 
-        except ValueError as e:
-            print(f"Error: {e}")
+        if data:
+            movie = self.__finish(data, record_line)
+            if movie is not None:
+                yield record_line, movie
 
-    def remove_movie(self, id):
+    def parse_file(self, filename, workers=None):
         """
-        Removes a movie/show from the list.
+        Yields the movies/shows of a whole data file with the line number each starts on. A large file is split into
+        chunks that end on blank lines and parsed by a pool of worker processes; the chunks are merged back in file
+        order and their line numbers (including those of the errors) refer to the whole file.
 
         Parameters:
-            id: The ID of the movie/show to remove.
-        """
-        try:
-            for movie in self.__movies:
-                if movie.get_id() == id:
-                    self.__movies.remove(movie)
-                    self.save_movies()
-                    print(f"Movie/Show '{movie.get_movie_title()}' has been deleted.")
-                    self.notify_observer(movie, 4)
+            filename: The data file.
+            workers: The number of worker processes, or None for one per CPU core. With 1 the file is parsed in
+                this process.
+
+        Yields:
+            tuple: The line number and the movie/show, for each well-formed record in file order.
+
+        Raises:
+            FileNotFoundError: If the file doesn't exist.
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers < 2 or os.path.getsize(filename) < self.PARALLEL_MIN_BYTES:
+            with open(filename, "r") as file:
+                yield from self.parse_records(file)
+            return
+
+        # A few chunks per worker, so one slow chunk does not leave the other workers idle at the end.
+        ranges = self.split_file(filename, workers * 4)
+        first_line = 0
+        with ProcessPoolExecutor(workers) as executor:
+            results = executor.map(Catalog_Parser.parse_chunk, repeat(filename), *zip(*ranges))
+            for rows, errors, line_count in results:
+                self.__errors += [(first_line + line, message) for line, message in errors]
+                for line, row in rows:
+                    yield first_line + line, self.from_row(row)
+                first_line += line_count
+
+    @staticmethod
+    def split_file(filename, chunks):
+        """
+        Splits a data file into about the given number of byte ranges. Every range ends just after a blank line (or
+        at the end of the file), so no record is cut in two.
+
+        Parameters:
+            filename: The data file.
+            chunks: The number of ranges wanted.
+
+        Returns:
+            list: (start, end) byte offsets covering the whole file, in order.
+        """
+        size = os.path.getsize(filename)
+        ranges = []
+        start = 0
+        with open(filename, "rb") as file:
+            for number in range(1, chunks):
+                target = size * number // chunks
+                if target <= start:
+                    continue
+                file.seek(target)
+                file.readline()
+                line = file.readline()
+                while line and line.strip():
+                    line = file.readline()
+                end = file.tell()
+                if end >= size:
+                    break
+                ranges.append((start, end))
+                start = end
+        ranges.append((start, size))
+        return ranges
+
+    @staticmethod
+    def parse_chunk(filename, start, end):
+        """
+        Parses one byte range of a data file. Runs in a worker process of parse_file.
+
+        Parameters:
+            filename: The data file.
+            start: The offset of the first byte of the range.
+            end: The offset just past the range.
+
+        Returns:
+            tuple: The (line number, row) pairs (see to_row) and the (line number, message) errors, numbered from
+                the start of the range, and the number of lines in the range.
+        """
+        with open(filename, "rb") as file:
+            file.seek(start)
+            data = file.read(end - start)
+        parser = Catalog_Parser()
+        rows = [(line, Catalog_Parser.to_row(movie))
+                for line, movie in parser.parse_records(io.TextIOWrapper(io.BytesIO(data)))]
+        return rows, parser.get_errors(), data.count(b"\n")
+
+    @staticmethod
+    def to_row(movie):
+        """
+        Returns the fields of a movie/show as a tuple in BaseFilm constructor order. Worker processes send rows
+        instead of objects: a tuple of plain values is several times cheaper to pickle and unpickle.
+
+        Parameters:
+            movie: The movie/show to convert.
+
+        Returns:
+            tuple: The fields of the movie/show.
+        """
+        return (movie.get_id(), movie.get_movie_title(), movie.get_genre(), movie.get_producer(),
+                movie.get_release_date(), movie.get_number_of_views(), movie.get_average_rating(),
+                movie.get_director(), movie.get_age_restrictions(), movie.get_duration(), movie.get_type(),
+                movie.get_episodes())
+
+    @staticmethod
+    def from_row(row):
+        """
+        Builds the movie/show described by a row from to_row, sharing repeated strings as build_movie does.
+
+        Parameters:
+            row: The fields of the movie/show.
+
+        Returns:
+            BaseFilm: The movie/show.
+        """
+        (id, title, genre, producer, release_date, number_of_views, average_rating, director, age_restrictions,
+         duration, types, episodes) = row
+        if types == "Show":
+            return Shows(id, title, intern(genre), intern(producer), intern(release_date), number_of_views,
+                         average_rating, intern(director), intern(age_restrictions), duration, episodes)
+        return Movies(id, title, intern(genre), intern(producer), intern(release_date), number_of_views,
+                      average_rating, intern(director), intern(age_restrictions), duration)
+
+    @staticmethod
+    def check_records(records, rows=False):
+        """
+        Builds and validates a chunk of import records with the rules of Movie_Manager.validate_movie. Runs in a
+        worker process when records are imported in parallel.
+
+        Parameters:
+            records: A list of (line number, dict of fields) pairs; the dict is None for an unreadable line.
+            rows: If True, returns rows (see to_row) instead of movies/shows, for sending back from a worker.
+
+        Returns:
+            list: (line number, movie/show, problems) triples, in the same order. The movie/show is None if the
+                record could not be built; the problems list is empty if the fields are valid.
+        """
+        checked = []
+        for line_number, data in records:
+            try:
+                if data is None:
+                    raise ValueError("Not a record.")
+                movie = Catalog_Parser.build_movie(data)
+            except ValueError as e:
+                checked.append((line_number, None, [str(e)]))
+                continue
+            problems = Movie_Manager.validate_movie(movie)
+            checked.append((line_number, Catalog_Parser.to_row(movie) if rows else movie, problems))
+        return checked
+
+    def __finish(self, data, record_line):
+        """
+        Builds the movie/show for a complete block of fields, recording an error if it is malformed.
+
+        Parameters:
+            data: The fields of the record.
+            record_line: The line number the record starts on.
+
+        Returns:
+            BaseFilm: The movie/show, or None if the record is malformed.
+        """
+        try:
+            return self.build_movie(data)
+        except ValueError as e:
+            self.__errors.append((record_line, f"Skipped record '{data.get('ID', '?')}': {e}"))
+            return None
+
+    @staticmethod
+    def build_movie(data):
+        """
+        Builds a movie/show from a dict of fields read from the data file or the journal.
+
+        Parameters:
+            data: The "Key: value" fields of one record.
+
+        Returns:
+            BaseFilm: The movie/show described by the fields.
+
+        Raises:
+            ValueError: If a field is missing or has an invalid value, or the type is neither 'Movie' nor 'Show'.
+        """
+        missing = [key for key in Catalog_Parser.REQUIRED_FIELDS if key not in data]
+        if missing:
+            raise ValueError(f"Missing field(s): {', '.join(missing)}.")
+
+        try:
+            duration = int(data["Duration"])
+            number_of_views = int(data["Number of Views"])
+            average_rating = float(data["Average Rating"])
+        except ValueError as e:
+            raise ValueError(f"Invalid number: {e}.")
+
+        # Genres, producers, directors, dates and age restrictions repeat across many records, so one shared copy
+        # of each value is kept instead of one string per record.
+        if data["Type"] == "Movie":
+            return Movies(
+                id=data["ID"],
+                title=data["Title"],
+                genre=intern(data["Genre"]),
+                duration=duration,
+                producer=intern(data["Producer"]),
+                release_date=intern(data["Release Date"]),
+                number_of_views=number_of_views,
+                average_rating=average_rating,
+                director=intern(data["Director"]),
+                age_restrictions=intern(data["Age Restriction"])
+            )
+
+        if data["Type"] == "Show":
+            try:
+                episodes = int(data["Episodes"])
+            except KeyError:
+                raise ValueError("Missing field(s): Episodes.")
+            except ValueError as e:
+                raise ValueError(f"Invalid number: {e}.")
+
+            return Shows(
+                id=data["ID"],
+                title=data["Title"],
+                genre=intern(data["Genre"]),
+                duration=duration,
+                producer=intern(data["Producer"]),
+                release_date=intern(data["Release Date"]),
+                number_of_views=number_of_views,
+                average_rating=average_rating,
+                director=intern(data["Director"]),
+                age_restrictions=intern(data["Age Restriction"]),
+                episodes=episodes
+            )
+
+        raise ValueError(f"Unknown type '{data['Type']}'.")
+
+    @staticmethod
+    def to_record(movie):
+        """
+        Returns the fields of a movie/show as a dict with the same keys as the data file, the inverse of build_movie.
+
+        Parameters:
+            movie: The movie/show to convert.
+
+        Returns:
+            dict: The fields of the movie/show, in FIELDS order.
+        """
+        return {
+            "ID": movie.get_id(),
+            "Title": movie.get_movie_title(),
+            "Genre": movie.get_genre(),
+            "Duration": movie.get_duration(),
+            "Producer": movie.get_producer(),
+            "Release Date": movie.get_release_date(),
+            "Number of Views": movie.get_number_of_views(),
+            "Average Rating": movie.get_average_rating(),
+            "Director": movie.get_director(),
+            "Age Restriction": movie.get_age_restrictions(),
+            "Type": movie.get_type(),
+            "Episodes": movie.get_episodes(),
+        }
+
+
+class Catalog_Exchange:
+    """
+    Streaming reader and writer for catalog records in CSV or JSON Lines, used to import and export catalogs. Records
+    use the same field names as the data file (see Catalog_Parser.FIELDS), one record per row/line.
+    """
+
+    FORMATS = ("csv", "jsonl")
+
+    @staticmethod
+    def detect_format(filename, file_format=None):
+        """
+        Returns the exchange format of a file, from the explicit format if given, otherwise from its extension.
+
+        Parameters:
+            filename: The file name.
+            file_format: "csv", "jsonl" or None to guess from the extension.
+
+        Returns:
+            str: "csv" or "jsonl".
+
+        Raises:
+            ValueError: If the format is unknown or cannot be guessed.
+        """
+        if file_format is None:
+            extension = os.path.splitext(filename)[1].lower()
+            file_format = {".csv": "csv", ".jsonl": "jsonl", ".ndjson": "jsonl"}.get(extension)
+        if file_format not in Catalog_Exchange.FORMATS:
+            raise ValueError("Format must be either 'csv' or 'jsonl'.")
+        return file_format
+
+    @staticmethod
+    def read_records(file, file_format):
+        """
+        Yields the records of an open CSV or JSON Lines file one at a time, so the file is never held in memory.
+
+        Parameters:
+            file: An open text file.
+            file_format: "csv" or "jsonl".
+
+        Yields:
+            tuple: The line number the record starts on, and a dict of its fields (None if the line is not a JSON
+                object).
+        """
+        if file_format == "csv":
+            reader = csv.DictReader(file)
+            for row in reader:
+                yield reader.line_num, row
+            return
+
+        for line_number, line in enumerate(file, 1):
+            if line.strip():
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = None
+                yield line_number, record if isinstance(record, dict) else None
+
+    @staticmethod
+    def write_records(file, movies, file_format, header=True):
+        """
+        Writes movies/shows to an open file as CSV rows or JSON lines.
+
+        Parameters:
+            file: An open text file.
+            movies: An iterable of movies/shows.
+            file_format: "csv" or "jsonl".
+            header: For CSV, whether to write the header row first.
+        """
+        if file_format == "csv":
+            writer = csv.DictWriter(file, fieldnames=Catalog_Parser.FIELDS)
+            if header:
+                writer.writeheader()
+            writer.writerows(Catalog_Parser.to_record(movie) for movie in movies)
+        else:
+            file.writelines(json.dumps(Catalog_Parser.to_record(movie)) + "\n" for movie in movies)
+
+
+class Change_Journal:
+    """
+    Append-only log of catalog changes kept next to the data file. Every entry is a block of "Key: value" lines
+    (the same layout as the data file) starting with an "Action" line and ending with a blank line.
+    """
+
+    def __init__(self, filename):
+        """
+        Initializes the journal for the given file. The file is created on the first append.
+
+        Parameters:
+            filename: The file the journal entries are appended to.
+        """
+        self.__filename = filename
+        self.__size = 0
+
+    def get_filename(self):
+        """
+        Returns the name of the journal file.
+
+        Returns:
+            str: The name of the journal file.
+        """
+        return self.__filename
+
+    def size(self):
+        """
+        Returns the size of the complete entries in the journal that this object has read or written. Entries
+        appended by other processes since then are not counted until they are replayed.
+
+        Returns:
+            int: The number of bytes of complete entries in the journal.
+        """
+        return self.__size
+
+    def append(self, entries):
+        """
+        Appends entries to the journal and forces them to disk before returning. Several entries are framed by
+        "begin" and "commit" entries, so after a crash either all of them are replayed or none.
+
+        Parameters:
+            entries: A list of formatted journal entries.
+
+        Returns:
+            int: The number of bytes appended.
+        """
+        if len(entries) > 1:
+            entries = ["Action: begin\n\n", *entries, "Action: commit\n\n"]
+        data = "".join(entries).encode("utf-8")
+        with open(self.__filename, "ab") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        self.__size += len(data)
+        return len(data)
+
+    def replay(self, offset=0):
+        """
+        Reads back every complete entry in the journal. A torn entry or an unfinished group of entries at the end of
+        the file (left behind by a crash in the middle of an append) is cut off so that later appends start on a
+        clean boundary.
+
+        Parameters:
+            offset: Where to start reading; pass size() to read only the entries appended by other processes.
+
+        Returns:
+            list: One dict of fields per entry, in the order they were appended.
+        """
+        try:
+            with open(self.__filename, "rb") as file:
+                file.seek(offset)
+                content = file.read()
+        except FileNotFoundError:
+            self.__size = 0
+            return []
+
+        entries = []
+        group = None
+        complete = 0
+        position = 0
+        while True:
+            end = content.find(b"\n\n", position)
+            if end == -1:
+                break
+            data = {}
+            for line in content[position:end].decode("utf-8").split("\n"):
+                if ": " in line:
+                    key, value = line.split(": ", 1)
+                    data[key] = value.strip()
+            position = end + 2
+
+            action = data.get("Action")
+            if action == "begin":
+                group = []
+            elif action == "commit":
+                if group is not None:
+                    entries += group
+                group = None
+                complete = position
+            elif group is not None:
+                group.append(data)
+            elif action is not None:
+                entries.append(data)
+                complete = position
+
+        if complete < len(content):
+            with open(self.__filename, "r+b") as file:
+                file.truncate(offset + complete)
+        self.__size = offset + complete
+        return entries
+
+    @staticmethod
+    def format_entry(action, movie):
+        """
+        Formats the journal entry for a change.
+
+        Parameters:
+            action: The change to record ("add", "update" or "delete").
+            movie: The movie/show that was changed.
+
+        Returns:
+            str: The entry, ready to be appended.
+        """
+        if action == "add":
+            body = movie.text_file()
+        elif action == "update":
+            body = f"ID: {movie.get_id()}\nAverage Rating: {movie.get_average_rating()}\n"
+        else:
+            body = f"ID: {movie.get_id()}\n"
+        return f"Action: {action}\n{body}\n"
+
+    @staticmethod
+    def read_rating(data):
+        """
+        Reads the new rating of an "update" entry.
+
+        Parameters:
+            data: The fields of the entry.
+
+        Returns:
+            float: The rating.
+
+        Raises:
+            ValueError: If the rating is missing, not a number or not between 0 and 10.
+        """
+        try:
+            rating = float(data["Average Rating"])
+        except KeyError:
+            raise ValueError("Missing field(s): Average Rating.")
+        except ValueError as e:
+            raise ValueError(f"Invalid number: {e}.")
+        if not 0 <= rating <= 10:
+            raise ValueError("Average rating must be between 0 and 10.")
+        return rating
+
+    @staticmethod
+    def apply(movies, entries):
+        """
+        Applies replayed entries to a catalog. Every entry can be applied more than once with the same result, so a
+        journal that was already folded into the data file (a crash during compaction) is harmless. An entry with a
+        missing or invalid field is reported and skipped, like a malformed record in the data file.
+
+        Parameters:
+            movies: The mapping from ID to movie/show to change.
+            entries: The entries returned by replay.
+        """
+        for data in entries:
+            action = data.get("Action")
+            if action == "add":
+                try:
+                    movie = Catalog_Parser.build_movie(data)
+                except ValueError as e:
+                    print(f"Error while replaying journal: {e}")
+                    continue
+                movies[movie.get_id()] = movie
+            elif action == "update":
+                movie = movies.get(data.get("ID"))
+                if movie is not None:
+                    try:
+                        movie.set_movie_rating(Change_Journal.read_rating(data))
+                    except ValueError as e:
+                        print(f"Error while replaying journal: Skipped update of '{data.get('ID')}': {e}")
+            elif action == "delete":
+                movies.pop(data.get("ID"), None)
+
+    def discard_before(self, offset):
+        """
+        Drops every entry before the given offset, keeping the entries appended after it (including entries of
+        other processes that have not been replayed yet).
+
+        Parameters:
+            offset: The journal size at the moment the entries before it were folded into a snapshot.
+        """
+        try:
+            with open(self.__filename, "rb") as file:
+                file.seek(offset)
+                tail = file.read()
+        except FileNotFoundError:
+            tail = b""
+
+        temp_filename = self.__filename + ".tmp"
+        with open(temp_filename, "wb") as file:
+            file.write(tail)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_filename, self.__filename)
+        self.__size = max(self.__size - offset, 0)
+
+
+class File_Lock:
+    """
+    Advisory lock on a file next to the catalog, shared by every process that opens it. The lock is exclusive and
+    reentrant within a process: nested with-blocks (also from other threads, which wait) hold it only once.
+    """
+
+    def __init__(self, filename):
+        """
+        Initializes the lock. The lock file is created on first use.
+
+        Parameters:
+            filename: The lock file.
+        """
+        self.__filename = filename
+        self.__thread_lock = threading.RLock()
+        self.__depth = 0
+        self.__file = None
+
+    def __enter__(self):
+        self.__thread_lock.acquire()
+        if self.__depth == 0:
+            try:
+                file = open(self.__filename, "a")
+                if fcntl is not None:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+            except BaseException:
+                self.__thread_lock.release()
+                raise
+            self.__file = file
+        self.__depth += 1
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.__depth -= 1
+        if self.__depth == 0:
+            # Closing the file releases the flock.
+            self.__file.close()
+            self.__file = None
+        self.__thread_lock.release()
+
+
+class Read_Write_Lock:
+    """
+    Lock that lets any number of threads read at once while writes run alone. Writers take precedence: once a
+    writer is waiting, new readers wait until it is done, so a steady stream of reads cannot starve writes.
+
+    Both sides are reentrant. A thread holding the write lock may also read, but a thread holding only the read lock
+    cannot take the write lock (two readers upgrading would wait for each other forever).
+    """
+
+    def __init__(self):
+        """
+        Initializes the lock, unheld.
+        """
+        # The mutex guards the state below; waiting goes through the condition, which shares it.
+        self.__mutex = threading.Lock()
+        self.__condition = threading.Condition(self.__mutex)
+        # Thread ident mapped to how many times that thread holds the read lock.
+        self.__readers = {}
+        self.__writer = None
+        self.__write_depth = 0
+        self.__waiting_writers = 0
+
+    def acquire_read(self):
+        """
+        Waits until no writer holds or waits for the lock, then holds it for reading.
+        """
+        me = threading.get_ident()
+        with self.__mutex:
+            readers = self.__readers
+            depth = readers.get(me)
+            if depth is None and self.__writer != me:
+                while self.__writer is not None or self.__waiting_writers:
+                    self.__condition.wait()
+            readers[me] = (depth or 0) + 1
+
+    def release_read(self):
+        """
+        Releases one hold of the read lock.
+        """
+        me = threading.get_ident()
+        with self.__mutex:
+            readers = self.__readers
+            depth = readers[me] - 1
+            if depth:
+                readers[me] = depth
+            else:
+                del readers[me]
+                # Only writers wait for the last reader to leave.
+                if not readers and self.__waiting_writers:
+                    self.__condition.notify_all()
+
+    def acquire_write(self):
+        """
+        Waits until no other thread holds the lock, then holds it for writing.
+
+        Raises:
+            RuntimeError: If the thread holds only the read lock.
+        """
+        me = threading.get_ident()
+        with self.__mutex:
+            if self.__writer == me:
+                self.__write_depth += 1
+                return
+            if me in self.__readers:
+                raise RuntimeError("Cannot take the write lock while holding the read lock.")
+            self.__waiting_writers += 1
+            try:
+                while self.__writer is not None or self.__readers:
+                    self.__condition.wait()
+            finally:
+                self.__waiting_writers -= 1
+            self.__writer = me
+            self.__write_depth = 1
+
+    def release_write(self):
+        """
+        Releases one hold of the write lock.
+        """
+        with self.__mutex:
+            self.__write_depth -= 1
+            if self.__write_depth == 0:
+                self.__writer = None
+                self.__condition.notify_all()
+
+    @contextmanager
+    def read(self):
+        """
+        Context manager holding the read lock.
+        """
+        self.acquire_read()
+        try:
+            yield self
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        """
+        Context manager holding the write lock.
+        """
+        self.acquire_write()
+        try:
+            yield self
+        finally:
+            self.release_write()
+
+
+class Change_Feed:
+    """
+    Bounded, persisted log of the changes made to a catalog, for consumers that sync incrementally. Every add, rating
+    update and removal gets the next sequence number and is appended to the file as one JSON line:
+
+        {"seq": 42, "time": "2026-01-31T12:00:00", "action": "update", "id": "17", "record": {...}}
+
+    "record" holds the fields of the movie/show after the change (see Catalog_Parser.to_record), or null for a
+    removal. Sequence numbers increase by one per change, also across the processes sharing the catalog: appends hold
+    an advisory lock (movies_data.txt.changes.lock) and continue from the last number in the file.
+
+    Only the latest max_entries changes are guaranteed to be kept; once the log holds half as many again, the older
+    ones are dropped in one atomic rewrite. Lines are ordered by sequence number, so reading the changes since a
+    number is a binary search over the file followed by reading just those lines.
+    """
+
+    def __init__(self, filename, max_entries=100000, create=True):
+        """
+        Initializes the feed. The file is created on the first append.
+
+        Parameters:
+            filename: The file the changes are appended to.
+            max_entries: The number of latest changes that are always kept.
+            create: If False, changes are only recorded once another feed has created the file, so a session that
+                does not start the log itself still leaves no gaps in it.
+
+        Raises:
+            ValueError: If max_entries is not positive.
+        """
+        if max_entries < 1:
+            raise ValueError("The change feed must keep at least one change.")
+        self.__filename = filename
+        self.__max_entries = max_entries
+        self.__create = create
+        self.__lock = File_Lock(filename + ".lock")
+        # The signature of the file after this process last read or wrote it, with the first and last sequence
+        # numbers it holds; only re-read when another process has changed the file.
+        self.__signature = None
+        self.__first = 0
+        self.__last = 0
+
+    def get_filename(self):
+        """
+        Returns the name of the change log file.
+
+        Returns:
+            str: The name of the file.
+        """
+        return self.__filename
+
+    def append(self, changes):
+        """
+        Numbers changes and appends them to the log, forcing them to disk before returning.
+
+        Parameters:
+            changes: A list of (action, movie/show) pairs, action being "add", "update" or "delete".
+
+        Returns:
+            int: The sequence number of the last change appended, or 0 if the log was not started (see create).
+        """
+        if not self.__create and not os.path.exists(self.__filename):
+            return 0
+        with self.__lock:
+            self.__sync()
+            now = datetime.now().isoformat(timespec="seconds")
+            lines = []
+            for action, movie in changes:
+                self.__last += 1
+                lines.append(json.dumps({
+                    "seq": self.__last,
+                    "time": now,
+                    "action": action,
+                    "id": movie.get_id(),
+                    "record": Catalog_Parser.to_record(movie) if action != "delete" else None,
+                }) + "\n")
+            with open(self.__filename, "ab") as file:
+                file.write("".join(lines).encode("utf-8"))
+                file.flush()
+                os.fsync(file.fileno())
+            if not self.__first:
+                self.__first = self.__last - len(lines) + 1
+            self.__signature = Catalog_Storage.file_signature(self.__filename)
+
+            if self.__last - self.__first + 1 > self.__max_entries * 3 // 2:
+                self.__trim()
+            return self.__last
+
+    def last_sequence(self):
+        """
+        Returns the sequence number of the latest change, 0 if there is none yet.
+
+        Returns:
+            int: The sequence number.
+        """
+        with self.__lock:
+            self.__sync()
+            return self.__last
+
+    def changes_since(self, seq, limit=None):
+        """
+        Returns the changes made after a sequence number, oldest first.
+
+        Parameters:
+            seq: The sequence number of the last change the consumer has seen, 0 for everything kept.
+            limit: The maximum number of changes returned, or None for all of them.
+
+        Returns:
+            list: The changes as dicts (see the class description).
+
+        Raises:
+            ValueError: If changes right after seq have already been dropped from the log; the consumer then has to
+                read the whole catalog again and continue from last_sequence().
+        """
+        with self.__lock:
+            self.__sync()
+            first, last = self.__first, self.__last
+            if seq >= last:
+                return []
+            if seq < first - 1:
+                raise ValueError(f"Changes after {seq} are no longer kept, the oldest kept change is {first}.")
+            with open(self.__filename, "rb") as file:
+                file.seek(self.__offset_after(file, seq, os.path.getsize(self.__filename)))
+                return [json.loads(line) for line in islice(file, limit)]
+
+    def follow(self, seq, poll_interval=1.0):
+        """
+        Yields the changes made after a sequence number as they happen, checking the file every poll_interval
+        seconds. Only the file's metadata is read while nothing changes.
+
+        Parameters:
+            seq: The sequence number of the last change the consumer has seen.
+            poll_interval: Seconds between checks.
+
+        Yields:
+            dict: Every change, oldest first.
+
+        Raises:
+            ValueError: If the changes after seq have already been dropped (see changes_since).
+        """
+        while True:
+            changes = self.changes_since(seq, 1000)
+            yield from changes
+            if changes:
+                seq = changes[-1]["seq"]
+            else:
+                sleep(poll_interval)
+
+    def __sync(self):
+        """
+        Reads the first and last sequence numbers of the file again if another process changed it. Must be called
+        while holding the lock.
+        """
+        signature = Catalog_Storage.file_signature(self.__filename)
+        if signature == self.__signature:
+            return
+        self.__first = self.__last = 0
+        if signature is None or signature[1] == 0:
+            self.__signature = signature
+            return
+        with open(self.__filename, "r+b") as file:
+            size = signature[1]
+            file.seek(size - 1)
+            if file.read(1) != b"\n":
+                # An append cut short by a crash: the partial line is dropped before anything is appended after it.
+                size = self.__line_start(file, size)
+                file.truncate(size)
+            if size:
+                file.seek(0)
+                self.__first = json.loads(file.readline())["seq"]
+                file.seek(self.__line_start(file, size - 1))
+                self.__last = json.loads(file.readline())["seq"]
+        self.__signature = Catalog_Storage.file_signature(self.__filename)
+
+    @staticmethod
+    def __line_start(file, end):
+        """
+        Returns the offset just after the last newline before end (0 if there is none), reading backwards in blocks.
+        """
+        position = end
+        while position > 0:
+            start = max(position - 4096, 0)
+            file.seek(start)
+            newline = file.read(position - start).rfind(b"\n")
+            if newline >= 0:
+                return start + newline + 1
+            position = start
+        return 0
+
+    @staticmethod
+    def __offset_after(file, seq, size):
+        """
+        Finds the offset of the first line whose sequence number is greater than seq, by binary search over the line
+        starts of the file.
+
+        Returns:
+            int: The offset, or size if there is no such line.
+        """
+        # Every line before low has a number up to seq, and the line at high (if any) one above it.
+        low, high = 0, size
+        while low < high:
+            middle = (low + high) // 2
+            file.seek(middle)
+            if middle != low:
+                file.readline()
+            start = file.tell()
+            if start >= high:
+                # No line starts between middle and high: look at the line at low.
+                file.seek(low)
+                start = low
+            line = file.readline()
+            if json.loads(line)["seq"] > seq:
+                high = start
+            else:
+                low = file.tell()
+        return low
+
+    def __trim(self):
+        """
+        Drops all but the latest max_entries changes, replacing the file atomically. Must be called while holding the
+        lock.
+        """
+        keep_after = self.__last - self.__max_entries
+        with open(self.__filename, "rb") as file:
+            size = os.path.getsize(self.__filename)
+            file.seek(self.__offset_after(file, keep_after, size))
+            data = file.read(size - file.tell())
+        Catalog_Storage.replace_file(self.__filename, lambda out: out.write(data), "wb")
+        self.__first = keep_after + 1
+        self.__signature = Catalog_Storage.file_signature(self.__filename)
+
+
+class Catalog_Storage(ABC):
+    """
+    Abstract base class for the places a catalog can be kept. Movie_Manager works on the mapping returned by load and
+    hands every change back to the storage to be persisted.
+
+    A storage that can answer queries itself sets QUERY_PUSHDOWN and implements search_by_title, search_by_field,
+    find_movies, contains_title, count, page, top_movies, movies_in_range and movies_in_ranges (see
+    Sqlite_Catalog_Storage). The manager then delegates those queries to it instead of building its in-memory
+    indexes. Release date bounds reach the storage as date ordinals.
+    """
+
+    QUERY_PUSHDOWN = False
+
+    @abstractmethod
+    def load(self):
+        """
+        Loads the catalog.
+
+        Returns:
+            dict: A mapping from ID to movie/show.
+        """
+        pass
+
+    @abstractmethod
+    def save(self, movies):
+        """
+        Writes the whole catalog.
+
+        Parameters:
+            movies: The mapping from ID to movie/show returned by load.
+        """
+        pass
+
+    def persist(self, action, movie, movies):
+        """
+        Persists a single change that has already been applied to the mapping.
+
+        Parameters:
+            action: The change to persist ("add", "update" or "delete").
+            movie: The movie/show that was changed.
+            movies: The mapping from ID to movie/show returned by load.
+        """
+        self.persist_batch([(action, movie)], movies)
+
+    def persist_batch(self, changes, movies):
+        """
+        Persists a group of changes that have already been applied to the mapping, all or nothing. By default the
+        whole catalog is saved once.
+
+        Parameters:
+            changes: A list of (action, movie/show) pairs.
+            movies: The mapping from ID to movie/show returned by load.
+        """
+        self.save(movies)
+
+    def get_load_errors(self):
+        """
+        Returns the malformed records found by the last load.
+
+        Returns:
+            list: (line number, message) pairs, one per malformed line or record.
+        """
+        return []
+
+    def get_bytes_written(self):
+        """
+        Returns how many bytes the storage has written since it was created, for the metrics. Storages that cannot
+        tell report 0.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        return 0
+
+    def lock(self):
+        """
+        Returns the lock that keeps other processes from writing the catalog while it is held. Movie_Manager holds
+        it from merging the changes of other processes until its own change is persisted. By default there is no
+        lock, for storages that coordinate concurrent writers themselves.
+
+        Returns:
+            A context manager.
+        """
+        return nullcontext()
+
+    def external_changes(self):
+        """
+        Returns the changes other processes have made to the catalog since this storage last loaded, read or wrote
+        it. Call it while holding lock().
+
+        Returns:
+            list: Journal entries (see Change_Journal.replay) to apply to the mapping, empty if nothing changed, or
+            None if the catalog has to be loaded again.
+        """
+        return []
+
+    def close(self):
+        """
+        Releases the resources held by the storage.
+        """
+        pass
+
+    @staticmethod
+    def file_signature(filename):
+        """
+        Returns what identifies the current content of a file without reading it: its inode, size and modification
+        time. A file replaced by a rename gets a new inode, and one written in place a new size or time.
+
+        Parameters:
+            filename: The file to look at.
+
+        Returns:
+            tuple: The signature, or None if the file doesn't exist.
+        """
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+    @staticmethod
+    def replace_file(filename, write, mode="w"):
+        """
+        Replaces a file atomically: the content is written to a temporary file, forced to disk and renamed over the
+        original, so readers and crashes only ever see the old or the new content.
+
+        Parameters:
+            filename: The file to replace.
+            write: A function that writes the new content to the open temporary file.
+            mode: The mode used to open the temporary file.
+        """
+        temp_filename = filename + ".tmp"
+        with open(temp_filename, mode) as file:
+            write(file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_filename, filename)
+
+
+class Text_File_Storage(Catalog_Storage):
+    """
+    Stores the catalog in the "Key: value" text format written by BaseFilm.text_file, optionally with a change
+    journal next to the file.
+
+    Several processes can share the file: every read and write holds an advisory lock (movies_data.txt.lock), the
+    data file is only ever replaced atomically, and each process remembers which version of the files it has seen.
+    In journal mode the changes of other processes are merged by replaying only the journal entries they appended;
+    a rewritten data file (a full save or a compaction) means the catalog has to be loaded again.
+
+    In lazy mode the catalog is a Lazy_Text_Catalog that builds records on first access instead of parsing the
+    whole file on load.
+    """
+
+    def __init__(self, filename, journal=False, compaction_threshold=1024 * 1024, background_compaction=True,
+                 workers=None, lazy=False):
+        """
+        Initializes the storage for the given file.
+
+        Parameters:
+            filename: The file from which movie data is loaded and saved.
+            journal: If True, each change is appended to a journal next to the file instead of rewriting the file.
+            compaction_threshold: Journal size in bytes at which the journal is folded back into the file.
+            background_compaction: If True, compaction triggered by the threshold runs on a background thread.
+            workers: The number of processes that parse a large file on load, or None for one per CPU core.
+            lazy: If True, load returns a Lazy_Text_Catalog over the file and its offset index.
+        """
+        self.__filename = filename
+        self.__workers = workers
+        self.__lazy = lazy
+        self.__catalog = None
+        self.__journal = Change_Journal(filename + ".journal")
+        self.__journal_mode = journal
+        self.__compaction_threshold = compaction_threshold
+        self.__background_compaction = background_compaction
+        self.__compaction_thread = None
+        # (temporary file, journal offset, data file signature) of a snapshot written in the background, swapped in
+        # by the next write that holds the lock.
+        self.__snapshot = None
+        self.__lock = File_Lock(filename + ".lock")
+        # The versions of the data file and the journal this process has seen, and the entries of other processes
+        # read while persisting that have not been handed out by external_changes yet (None: reload needed).
+        self.__data_signature = None
+        self.__journal_inode = None
+        self.__pending = []
+        self.__load_errors = []
+        self.__bytes_written = 0
+
+    def get_filename(self):
+        """
+        Returns the name of the data file.
+
+        Returns:
+            str: The name of the data file.
+        """
+        return self.__filename
+
+    def get_bytes_written(self):
+        """
+        Returns how many bytes have been written to the data file and the journal since the storage was created.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        return self.__bytes_written
+
+    def get_load_errors(self):
+        """
+        Returns the malformed records found by the last load.
+
+        Returns:
+            list: (line number, message) pairs, one per malformed line or record.
+        """
+        return self.__load_errors
+
+    def lock(self):
+        """
+        Returns the advisory lock on the catalog files.
+
+        Returns:
+            File_Lock: The lock.
+        """
+        return self.__lock
+
+    def __remember_files(self):
+        """
+        Records the versions of the data file and the journal as this process's own.
+        """
+        self.__data_signature = self.file_signature(self.__filename)
+        journal = self.file_signature(self.__journal.get_filename())
+        self.__journal_inode = journal[0] if journal is not None else None
+
+    def __read_external(self):
+        """
+        Collects the journal entries other processes appended since this process last read or wrote the files.
+        Must be called while holding the lock.
+
+        Returns:
+            list: The pending entries of other processes, or None if the data file or the journal was replaced and
+            the catalog has to be loaded again.
+        """
+        if self.__pending is None or self.file_signature(self.__filename) != self.__data_signature:
+            self.__pending = None
+            return None
+
+        journal = self.file_signature(self.__journal.get_filename())
+        inode = journal[0] if journal is not None else None
+        if inode != self.__journal_inode:
+            # A journal that appeared where this process had none is new; any other change means it was swapped.
+            if self.__journal_inode is not None or self.__journal.size() != 0:
+                self.__pending = None
+                return None
+            self.__journal_inode = inode
+
+        if journal is not None and journal[1] > self.__journal.size():
+            self.__pending += self.__journal.replay(self.__journal.size())
+        return self.__pending
+
+    def external_changes(self):
+        """
+        Returns the changes other processes have made since this storage last loaded, read or wrote the files. Only
+        the files' metadata is read unless something changed.
+
+        Returns:
+            list: The journal entries appended by other processes, or None if the catalog has to be loaded again.
+        """
+        with self.__lock:
+            self.__install_snapshot()
+            changes = self.__read_external()
+            self.__pending = []
+            return changes
+
+    def load(self, parsed=None):
+        """
+        Streams the data file into a dict and replays the journal on top of it. If the file doesn't exist, creates an
+        empty one. A large file is parsed in parallel (see Catalog_Parser.parse_file). A record whose ID appeared
+        earlier in the file replaces the earlier one and is reported in the load errors.
+
+        Parameters:
+            parsed: The records of the data file already parsed elsewhere, as a pair of (line number, movie/show)
+                pairs and (line number, message) errors (see Sharded_Catalog_Storage); by default the file is
+                parsed here.
+
+        Returns:
+            dict: A mapping from ID to movie/show, in file order (a Lazy_Text_Catalog in lazy mode).
+        """
+        with self.__lock:
+            self.__discard_snapshot()
+            movies = self.__open_lazy() if self.__lazy else self.__parse(parsed)
+
+            entries = self.__journal.replay()
+            Change_Journal.apply(movies, entries)
+            self.__remember_files()
+            self.__pending = []
+
+            # Outside journal mode every save rewrites the file, so any leftover journal has to be folded in now or
+            # it would be replayed again on top of newer data.
+            if entries and not self.__journal_mode:
+                self.compact(movies)
+            return movies
+
+    def __parse(self, parsed=None):
+        """
+        Parses the whole data file into a dict, creating an empty file if there is none.
+
+        Parameters:
+            parsed: The records and errors of the file if it was parsed elsewhere (see load).
+
+        Returns:
+            dict: A mapping from ID to movie/show, in file order.
+        """
+        movies = {}
+        duplicates = []
+        parser = Catalog_Parser()
+        try:
+            records = parser.parse_file(self.__filename, self.__workers) if parsed is None else parsed[0]
+            for line_number, movie in records:
+                id = movie.get_id()
+                if id in movies:
+                    duplicates.append((line_number, f"Duplicate ID '{id}', replaces the earlier record."))
+                movies[id] = movie
+
+        except FileNotFoundError:
+            print("File doesn't exist. Creating an empty file.")
+            open(self.__filename, "w").close()
+
+        errors = parser.get_errors() if parsed is None else parsed[1]
+        self.__load_errors = sorted(errors + duplicates) if duplicates else errors
+        return movies
+
+    def __open_lazy(self):
+        """
+        Opens the data file as a Lazy_Text_Catalog, creating an empty file if there is none.
+
+        Returns:
+            Lazy_Text_Catalog: A mapping from ID to movie/show that builds records on access.
+        """
+        if not os.path.exists(self.__filename):
+            print("File doesn't exist. Creating an empty file.")
+            open(self.__filename, "w").close()
+        if self.__catalog is not None:
+            self.__catalog.close()
+        self.__catalog = Lazy_Text_Catalog(self.__filename)
+        self.__load_errors = self.__catalog.get_load_errors()
+        return self.__catalog
+
+    def __snapshot_of(self, movies):
+        """
+        Takes what a snapshot of the catalog is written from, with the function that writes it. A lazy catalog
+        hands out record texts, so unchanged records are copied without being built.
+
+        Returns:
+            tuple: The list of records or texts and the function writing them to an open file.
+        """
+        if isinstance(movies, Lazy_Text_Catalog):
+            return list(movies.texts()), self.write_texts
+        return list(movies.values()), self.write_records
+
+    def save(self, movies):
+        """
+        Rewrites the whole data file, atomically. In journal mode this is a compaction.
+
+        Parameters:
+            movies: The mapping from ID to movie/show.
+        """
+        if self.__journal_mode:
+            self.compact(movies)
+            return
+
+        with self.__lock:
+            records, write = self.__snapshot_of(movies)
+            self.replace_file(self.__filename, lambda file: write(file, records))
+            self.__bytes_written += os.path.getsize(self.__filename)
+            self.__index_snapshot()
+            self.__remember_files()
+
+    # Saves go through a large buffer: the cached texts are small, and one write call per record would dominate.
+    WRITE_BUFFER = 1024 * 1024
+
+    @staticmethod
+    def write_records(file, movies):
+        """
+        Writes movies/shows to an open file in the data file format, in one pass over their cached texts.
+
+        Parameters:
+            file: An open text file.
+            movies: An iterable of movies/shows.
+        """
+        file.writelines(part for movie in movies for part in (movie.text_file(), "\n"))
+
+    @staticmethod
+    def write_texts(file, texts):
+        """
+        Writes record texts (see Lazy_Text_Catalog.texts) to an open file in the data file format.
+
+        Parameters:
+            file: An open text file.
+            texts: An iterable of record texts.
+        """
+        file.writelines(part for text in texts for part in (text, "\n"))
+
+    def persist_batch(self, changes, movies):
+        """
+        Persists a group of changes. In journal mode only the changes themselves are appended, in one write;
+        otherwise the whole file is rewritten once.
+
+        Parameters:
+            changes: A list of (action, movie/show) pairs.
+            movies: The mapping from ID to movie/show.
+        """
+        if not self.__journal_mode:
+            self.save(movies)
+            return
+
+        with self.__lock:
+            self.__install_snapshot()
+            # Entries other processes appended meanwhile are read first, so the position in the journal stays
+            # right; they are handed out by the next external_changes call.
+            current = self.__read_external() is not None
+            self.__bytes_written += self.__journal.append([Change_Journal.format_entry(action, movie)
+                                                           for action, movie in changes])
+            if self.__journal_inode is None:
+                self.__journal_inode = os.stat(self.__journal.get_filename()).st_ino
+            full = current and self.__journal.size() >= self.__compaction_threshold
+
+        if full:
+            self.compact(movies, background=self.__background_compaction)
+
+    def compact(self, movies, background=False):
+        """
+        Folds the journal back into the data file: writes a fresh snapshot of the catalog to a temporary file, swaps
+        it in atomically and drops the journal entries it covers. A compaction is skipped while changes of other
+        processes are still missing from the mapping.
+
+        Parameters:
+            movies: The mapping from ID to movie/show.
+            background: If True, the snapshot is rendered and written on a background thread and swapped in by the
+                next write (or close).
+        """
+        if self.__compaction_thread is not None and self.__compaction_thread.is_alive():
+            if background:
+                return
+            # The thread never takes the lock, so it can be waited for while holding it.
+            self.__compaction_thread.join()
+
+        with self.__lock:
+            self.__discard_snapshot()
+            if self.__read_external() != []:
+                return
+            # A rating changed while the snapshot is rendered is also in the journal after this offset, and replaying
+            # it again is harmless.
+            records, write = self.__snapshot_of(movies)
+            offset = self.__journal.size()
+            temp_filename = f"{self.__filename}.{os.getpid()}.tmp"
+            if not background:
+                if self.__write_snapshot(temp_filename, records, write):
+                    self.__swap_snapshot(temp_filename, offset)
+                return
+
+            self.__compaction_thread = threading.Thread(
+                target=self.__compact, args=(temp_filename, records, write, offset, self.__data_signature),
+                daemon=True)
+            self.__compaction_thread.start()
+
+    def __compact(self, temp_filename, records, write, offset, signature):
+        """
+        Writes a snapshot on the background thread and leaves it to be swapped in.
+
+        Parameters:
+            temp_filename: The temporary file for the snapshot.
+            records: The movies/shows (or record texts) in the snapshot.
+            write: The function that writes them.
+            offset: The journal size when the snapshot was taken.
+            signature: The data file signature when the snapshot was taken.
+        """
+        if self.__write_snapshot(temp_filename, records, write):
+            self.__snapshot = (temp_filename, offset, signature)
+
+    def __write_snapshot(self, temp_filename, records, write):
+        """
+        Writes a snapshot of the catalog to a temporary file and forces it to disk.
+
+        Returns:
+            bool: True if the snapshot was written.
+        """
+        try:
+            with open(temp_filename, "w", buffering=self.WRITE_BUFFER) as file:
+                write(file, records)
+                file.flush()
+                os.fsync(file.fileno())
+            return True
+
+        except Exception as e:
+            print(f"Error while compacting movies: {e}")
+            return False
+
+    def __swap_snapshot(self, temp_filename, offset):
+        """
+        Renames a written snapshot over the data file and keeps only the journal entries appended after it was
+        taken. Must be called while holding the lock.
+        """
+        try:
+            os.replace(temp_filename, self.__filename)
+            self.__bytes_written += os.path.getsize(self.__filename)
+            self.__journal.discard_before(offset)
+            self.__index_snapshot()
+            self.__remember_files()
+
+        except Exception as e:
+            print(f"Error while compacting movies: {e}")
+
+    def __index_snapshot(self):
+        """
+        Rebuilds the offset index after this process rewrote the data file in lazy mode, so the next session opens
+        without scanning. The open catalog keeps reading the file it was opened on.
+        """
+        if self.__lazy:
+            # The snapshot holds only records that were built or indexed as valid, so they are not checked again.
+            self.__load_errors = Lazy_Text_Catalog.build_index(self.__filename, validate=False)
+
+    def __install_snapshot(self):
+        """
+        Swaps in a snapshot finished by the background thread, unless another process rewrote the files since it
+        was taken. Must be called while holding the lock.
+        """
+        if self.__snapshot is None:
+            return
+        temp_filename, offset, signature = self.__snapshot
+        self.__snapshot = None
+        if signature == self.__data_signature and self.__read_external() is not None:
+            self.__swap_snapshot(temp_filename, offset)
+        else:
+            self.__remove_file(temp_filename)
+
+    def __discard_snapshot(self):
+        """
+        Drops a background snapshot that has not been swapped in yet. Must be called while holding the lock.
+        """
+        if self.__compaction_thread is not None:
+            self.__compaction_thread.join()
+        if self.__snapshot is not None:
+            self.__remove_file(self.__snapshot[0])
+            self.__snapshot = None
+
+    @staticmethod
+    def __remove_file(filename):
+        try:
+            os.remove(filename)
+        except FileNotFoundError:
+            pass
+
+    def close(self):
+        """
+        Waits for a running background compaction to finish and swaps its snapshot in. Closes the lazy catalog.
+        """
+        if self.__compaction_thread is not None:
+            self.__compaction_thread.join()
+            with self.__lock:
+                self.__install_snapshot()
+        if self.__catalog is not None:
+            self.__catalog.close()
+            self.__catalog = None
+
+
+class Lazy_Text_Catalog(MutableMapping):
+    """
+    Mapping from ID to movie/show over a text data file that builds records only when they are accessed. An offset
+    index kept next to the file (movies_data.txt.idx) gives the byte range of every record by ID, so opening the
+    catalog costs the same no matter how many records it holds. The index is rebuilt, with a scan that builds no
+    objects, only when the data file has changed since it was written.
+
+    The most recently used records are kept in an LRU cache. A record whose rating was changed is never evicted, and
+    records added, replaced or removed are kept in memory until the file is rewritten. Records are validated when
+    they are first built; a malformed one is reported then and treated as missing.
+    """
+
+    INDEX_MAGIC = b"MOVIEIDX"
+    INDEX_VERSION = 2
+    # Magic, version, then the inode, size and modification time of the data file the index describes, the number
+    # of records and the size of the ID heap.
+    INDEX_HEADER = struct.Struct("<8sIQQqQQ")
+    CACHE_SIZE = 10000
+
+    def __init__(self, filename, cache_size=None):
+        """
+        Opens the data file and its offset index, rebuilding the index if it is missing or stale.
+
+        Parameters:
+            filename: The text data file.
+            cache_size: The number of records kept in the LRU cache (default CACHE_SIZE).
+        """
+        self.__filename = filename
+        self.__cache_size = cache_size if cache_size is not None else self.CACHE_SIZE
+        self.__cache = OrderedDict()
+        # Readers of the catalog may build records from several threads at once; this guards the cache.
+        self.__cache_lock = threading.Lock()
+        self.__pinned = {}
+        self.__overlay = {}
+        self.__hidden = set()
+        self.__broken = set()
+        self.__load_errors = []
+        self.__open()
+
+    @staticmethod
+    def index_filename(filename):
+        """
+        Returns the name of the offset index of a data file.
+
+        Parameters:
+            filename: The text data file.
+
+        Returns:
+            str: The name of the index file.
+        """
+        return filename + ".idx"
+
+    @staticmethod
+    def __layout(count):
+        """
+        Computes where the columns of an index with the given number of records start: the start and end offsets
+        and first line of every record, the offsets of the IDs in the heap and the rows in ID order.
+        """
+        layout = {}
+        offset = Lazy_Text_Catalog.INDEX_HEADER.size
+        for name, items, item_format in (("starts", count, "Q"), ("ends", count, "Q"), ("lines", count, "Q"),
+                                         ("ID", count + 1, "Q"), ("order", count, "I")):
+            length = items * struct.calcsize(item_format)
+            layout[name] = (offset, length, item_format)
+            offset += length
+        layout["heap"] = (offset, None, None)
+        return layout
+
+    @staticmethod
+    def build_index(filename, validate=True):
+        """
+        Scans a data file for the byte range and ID of every record and writes its offset index. Every record is
+        checked with Catalog_Parser, so malformed records are left out of the index, reported, and never counted
+        or listed; a repeated ID replaces the earlier record, as on a full load.
+
+        Parameters:
+            filename: The text data file.
+            validate: If False, only the ID line of each record is looked at, for a file this process has just
+                written from records that were already valid.
+
+        Returns:
+            list: (line number, message) pairs for the skipped and replaced records.
+        """
+        signature = Catalog_Storage.file_signature(filename)
+        records = []
+        rows = {}
+        errors = []
+        valid = None
+        if validate:
+            # The records that a full load would keep, by the line they start on.
+            parser = Catalog_Parser()
+            valid = {line: movie.get_id().encode("utf-8") for line, movie in parser.parse_file(filename)}
+            errors.extend(parser.get_errors())
+
+        def finish(start, end, first_line, id):
+            if valid is not None:
+                if first_line not in valid:
+                    return
+                id = valid[first_line]
+            if id is None:
+                errors.append((first_line, "Skipped record '?': Missing field(s): ID."))
+                return
+            if id in rows:
+                errors.append((first_line, f"Duplicate ID '{id.decode('utf-8')}', replaces the earlier record."))
+                # Keeps the place of the earlier record, as a dict does.
+                records[rows[id]] = (start, end, first_line, id)
+                return
+            rows[id] = len(records)
+            records.append((start, end, first_line, id))
+
+        offset = 0
+        start = None
+        with open(filename, "rb") as file:
+            for number, line in enumerate(file, 1):
+                if line.strip():
+                    if start is None:
+                        start, first_line, id = offset, number, None
+                    if id is None and line.startswith(b"ID: "):
+                        id = line[4:].strip()
+                    offset += len(line)
+                    end = offset
+                else:
+                    offset += len(line)
+                    if start is not None:
+                        finish(start, end, first_line, id)
+                        start = None
+            if start is not None:
+                finish(start, end, first_line, id)
+
+        count = len(records)
+        heap = b"".join(record[3] for record in records)
+        id_offsets = array("Q", [0])
+        for record in records:
+            id_offsets.append(id_offsets[-1] + len(record[3]))
+        order = array("I", sorted(range(count), key=lambda row: records[row][3]))
+
+        def write_file(file):
+            file.write(Lazy_Text_Catalog.INDEX_HEADER.pack(Lazy_Text_Catalog.INDEX_MAGIC,
+                                                           Lazy_Text_Catalog.INDEX_VERSION, *signature, count,
+                                                           len(heap)))
+            for column in range(3):
+                file.write(array("Q", [record[column] for record in records]).tobytes())
+            file.write(id_offsets.tobytes())
+            file.write(order.tobytes())
+            file.write(heap)
+
+        Catalog_Storage.replace_file(Lazy_Text_Catalog.index_filename(filename), write_file, "wb")
+        return errors
+
+    def __open(self):
+        """
+        Maps the data file and the index, rebuilding the index first if it does not describe the data file.
+        """
+        signature = Catalog_Storage.file_signature(self.__filename)
+        index_filename = self.index_filename(self.__filename)
+        for attempt in range(2):
+            try:
+                with open(index_filename, "rb") as file:
+                    header = file.read(self.INDEX_HEADER.size)
+                if len(header) == self.INDEX_HEADER.size:
+                    magic, version, inode, size, mtime, count, heap_size = self.INDEX_HEADER.unpack(header)
+                    if (magic, version, (inode, size, mtime)) == (self.INDEX_MAGIC, self.INDEX_VERSION, signature):
+                        break
+            except FileNotFoundError:
+                pass
+            self.__load_errors = self.build_index(self.__filename)
+        else:
+            raise ValueError(f"Could not index '{self.__filename}'.")
+
+        self.__data_file = open(self.__filename, "rb")
+        self.__data = mmap.mmap(self.__data_file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.__index_file = open(index_filename, "rb")
+        self.__index = mmap.mmap(self.__index_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.__count = count
+        self.__views = []
+        self.__columns = {}
+        for name, (offset, length, item_format) in self.__layout(count).items():
+            if name == "heap":
+                view = memoryview(self.__index)[offset:offset + heap_size]
+            else:
+                view = memoryview(self.__index)[offset:offset + length].cast(item_format)
+            self.__views.append(view)
+            self.__columns[name] = view
+
+    def close(self):
+        """
+        Unmaps and closes the data file and the index.
+        """
+        for view in self.__views:
+            view.release()
+        self.__views = []
+        if isinstance(self.__data, mmap.mmap):
+            self.__data.close()
+        self.__index.close()
+        self.__data_file.close()
+        self.__index_file.close()
+
+    def get_load_errors(self):
+        """
+        Returns the records skipped while the index was rebuilt on open.
+
+        Returns:
+            list: (line number, message) pairs; empty if the existing index was used.
+        """
+        return self.__load_errors
+
+    def __id(self, row):
+        """
+        Returns the ID of a row, as bytes.
+        """
+        offsets = self.__columns["ID"]
+        return self.__columns["heap"][offsets[row]:offsets[row + 1]].tobytes()
+
+    def find_row(self, id):
+        """
+        Finds the row of an ID with a binary search over the ID order stored in the index.
+
+        Parameters:
+            id: The ID to look up.
+
+        Returns:
+            int: The row, or None if the file has no live row with that ID.
+        """
+        key = id.encode("utf-8")
+        order = self.__columns["order"]
+        low, high = 0, self.__count
+        while low < high:
+            middle = (low + high) // 2
+            if self.__id(order[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.__count:
+            return None
+        row = order[low]
+        if self.__id(row) != key or row in self.__hidden or row in self.__broken:
+            return None
+        return row
+
+    def __raw_text(self, row):
+        """
+        Returns the text of a record as stored in the data file.
+        """
+        return str(self.__data[self.__columns["starts"][row]:self.__columns["ends"][row]], "utf-8")
+
+    def __hydrate(self, row):
+        """
+        Returns the movie/show of a row, building it on first access and keeping it in the LRU cache.
+
+        Returns:
+            BaseFilm: The movie/show, or None if the record is malformed.
+        """
+        with self.__cache_lock:
+            movie = self.__pinned.get(row)
+            if movie is not None:
+                return movie
+            cached = self.__cache.get(row)
+            if cached is not None:
+                self.__cache.move_to_end(row)
+                return cached[0]
+
+        parser = Catalog_Parser()
+        movies = [movie for _, movie in parser.parse_records(self.__raw_text(row).splitlines(True),
+                                                             self.__columns["lines"][row])]
+        if not movies:
+            for line_number, message in parser.get_errors():
+                print(f"Error while loading movies (line {line_number}): {message}")
+            self.__broken.add(row)
+            return None
+
+        movie = movies[-1]
+        with self.__cache_lock:
+            # Another thread may have built the same record meanwhile; every record has one object.
+            pinned = self.__pinned.get(row)
+            if pinned is not None:
+                return pinned
+            cached = self.__cache.get(row)
+            if cached is not None:
+                return cached[0]
+            self.__cache[row] = (movie, movie.get_average_rating())
+            if len(self.__cache) > self.__cache_size:
+                evicted_row, (evicted, rating) = self.__cache.popitem(last=False)
+                # The file still has the old rating, so a changed record has to stay in memory.
+                if evicted.get_average_rating() != rating:
+                    self.__pinned[evicted_row] = evicted
+        return movie
+
+    def __forget(self, row):
+        """
+        Hides a row whose record was replaced or removed.
+        """
+        self.__hidden.add(row)
+        self.__cache.pop(row, None)
+        self.__pinned.pop(row, None)
+
+    def __getitem__(self, id):
+        if id in self.__overlay:
+            return self.__overlay[id]
+        row = self.find_row(id)
+        movie = self.__hydrate(row) if row is not None else None
+        if movie is None:
+            raise KeyError(id)
+        return movie
+
+    def __setitem__(self, id, movie):
+        row = self.find_row(id)
+        if row is not None:
+            self.__forget(row)
+        self.__overlay[id] = movie
+
+    def __delitem__(self, id):
+        if id in self.__overlay:
+            del self.__overlay[id]
+            return
+        row = self.find_row(id)
+        if row is None:
+            raise KeyError(id)
+        self.__forget(row)
+
+    def __contains__(self, id):
+        return id in self.__overlay or self.find_row(id) is not None
+
+    def __live_rows(self):
+        hidden = self.__hidden
+        broken = self.__broken
+        return (row for row in range(self.__count) if row not in hidden and row not in broken)
+
+    def __iter__(self):
+        for row in self.__live_rows():
+            yield self.__id(row).decode("utf-8")
+        yield from list(self.__overlay)
+
+    def __len__(self):
+        return self.__count - len(self.__hidden) - len(self.__broken) + len(self.__overlay)
+
+    def values(self):
+        """
+        Yields every movie/show in file order, building the ones not in memory without going through the ID
+        search. Malformed records are reported and skipped.
+        """
+        for row in self.__live_rows():
+            movie = self.__hydrate(row)
+            if movie is not None:
+                yield movie
+        yield from list(self.__overlay.values())
+
+    def items(self):
+        """
+        Yields (ID, movie/show) pairs in file order.
+        """
+        for movie in self.values():
+            yield movie.get_id(), movie
+
+    def texts(self):
+        """
+        Yields the text of every record in the data file format, in file order. Records that were not changed are
+        copied from the file without being built.
+        """
+        cache = self.__cache
+        for row in self.__live_rows():
+            movie = self.__pinned.get(row)
+            cached = cache.get(row)
+            if movie is None and cached is not None and cached[0].get_average_rating() != cached[1]:
+                movie = cached[0]
+            if movie is not None:
+                yield movie.text_file()
+            else:
+                text = self.__raw_text(row)
+                yield text if text.endswith("\n") else text + "\n"
+        for movie in list(self.__overlay.values()):
+            yield movie.text_file()
+
+
+class Sharded_Catalog(MutableMapping):
+    """
+    Mapping from ID to movie/show split into shards by a hash of the ID. Every ID belongs to the one shard shard_of
+    picks, so a lookup, change or removal is routed to that shard alone; iteration goes through the shards in order.
+    """
+
+    def __init__(self, shards):
+        """
+        Parameters:
+            shards: The mapping from ID to movie/show of every shard, in shard order.
+        """
+        self.__shards = list(shards)
+        self.__count = len(self.__shards)
+
+    @staticmethod
+    def shard_of(id, count):
+        """
+        Returns the shard an ID belongs to. CRC-32 is used rather than hash() because it is the same in every
+        process and across runs.
+
+        Parameters:
+            id: The ID of a movie/show.
+            count: The number of shards.
+
+        Returns:
+            int: The index of the shard.
+        """
+        return zlib.crc32(str(id).encode("utf-8")) % count
+
+    def get_shard(self, index):
+        """
+        Returns the mapping of one shard.
+
+        Parameters:
+            index: The index of the shard.
+
+        Returns:
+            The mapping from ID to movie/show of the shard.
+        """
+        return self.__shards[index]
+
+    def get_shard_count(self):
+        """
+        Returns the number of shards.
+
+        Returns:
+            int: The number of shards.
+        """
+        return self.__count
+
+    def __getitem__(self, id):
+        return self.__shards[self.shard_of(id, self.__count)][id]
+
+    def get(self, id, default=None):
+        return self.__shards[self.shard_of(id, self.__count)].get(id, default)
+
+    def __setitem__(self, id, movie):
+        self.__shards[self.shard_of(id, self.__count)][id] = movie
+
+    def __delitem__(self, id):
+        del self.__shards[self.shard_of(id, self.__count)][id]
+
+    def __contains__(self, id):
+        return id in self.__shards[self.shard_of(id, self.__count)]
+
+    def __iter__(self):
+        for shard in self.__shards:
+            yield from shard
+
+    def __len__(self):
+        return sum(map(len, self.__shards))
+
+    def values(self):
+        """
+        Yields every movie/show, shard by shard.
+        """
+        for shard in self.__shards:
+            yield from shard.values()
+
+    def items(self):
+        """
+        Yields (ID, movie/show) pairs, shard by shard.
+        """
+        for shard in self.__shards:
+            yield from shard.items()
+
+
+class Sharded_Catalog_Storage(Catalog_Storage):
+    """
+    Splits the catalog into several text files by a hash of the ID (see Sharded_Catalog): movies_data.txt with 8
+    shards is kept in movies_data.000.txt to movies_data.007.txt, and movies_data.txt.shards records the number of
+    shards. Every shard is a Text_File_Storage with its own journal, so a change is persisted to the shard that
+    holds the record, and a save rewrites only the shards changed since they were last written.
+
+    The shards are parsed in parallel by a pool of worker processes on load. Writers hold one lock for the whole
+    catalog (movies_data.txt.lock), so sessions sharing the shards see each other's changes as with a single file.
+    """
+
+    DEFAULT_SHARDS = 8
+
+    def __init__(self, filename, shards=None, journal=False, compaction_threshold=1024 * 1024,
+                 background_compaction=True, workers=None, lazy=False):
+        """
+        Initializes the storage. The shard files are created on the first load.
+
+        Parameters:
+            filename: The name the shard files are derived from.
+            shards: The number of shards of a new catalog (default DEFAULT_SHARDS). An existing catalog keeps the
+                number it was created with.
+            journal: If True, each change is appended to the journal of its shard instead of rewriting the shard.
+            compaction_threshold: Journal size in bytes at which a shard's journal is folded back into the shard.
+            background_compaction: If True, compaction triggered by the threshold runs on a background thread.
+            workers: The number of processes that parse the shards on load, or None for one per CPU core.
+            lazy: If True, every shard is opened as a Lazy_Text_Catalog instead of being parsed on load.
+
+        Raises:
+            ValueError: If the catalog exists with a different number of shards, or the number is not positive.
+        """
+        self.__filename = filename
+        self.__manifest = filename + ".shards"
+        self.__new = not os.path.exists(self.__manifest)
+        if self.__new:
+            count = shards if shards is not None else self.DEFAULT_SHARDS
+        else:
+            with open(self.__manifest, "r") as file:
+                count = json.load(file)["shards"]
+            if shards is not None and shards != count:
+                raise ValueError(f"The catalog is split into {count} shards, not {shards}.")
+        if count < 1:
+            raise ValueError("The number of shards must be positive.")
+
+        self.__workers = workers
+        self.__lazy = lazy
+        self.__journal_mode = journal
+        self.__filenames = [self.shard_filename(filename, index, count) for index in range(count)]
+        self.__shards = [Text_File_Storage(name, journal, compaction_threshold, background_compaction, 1, lazy)
+                         for name in self.__filenames]
+        self.__lock = File_Lock(filename + ".lock")
+        self.__catalog = None
+        # Shards changed since they were last written, which a save has to rewrite.
+        self.__dirty = set()
+        self.__load_errors = []
+
+    @staticmethod
+    def shard_filename(filename, index, count):
+        """
+        Returns the name of one shard file: the index is inserted before the extension.
+
+        Parameters:
+            filename: The name the shard files are derived from.
+            index: The index of the shard.
+            count: The number of shards.
+
+        Returns:
+            str: For example "movies_data.003.txt".
+        """
+        root, extension = os.path.splitext(filename)
+        return f"{root}.{index:0{max(3, len(str(count - 1)))}d}{extension}"
+
+    def get_filenames(self):
+        """
+        Returns the names of the shard files, in shard order.
+
+        Returns:
+            list: The file names.
+        """
+        return list(self.__filenames)
+
+    def get_load_errors(self):
+        """
+        Returns the malformed records found by the last load. Each message names the shard file its line number
+        refers to.
+
+        Returns:
+            list: (line number, message) pairs.
+        """
+        return self.__load_errors
+
+    def get_bytes_written(self):
+        """
+        Returns how many bytes have been written to the shard files and their journals.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        return sum(shard.get_bytes_written() for shard in self.__shards)
+
+    def lock(self):
+        """
+        Returns the advisory lock on the whole catalog.
+
+        Returns:
+            File_Lock: The lock.
+        """
+        return self.__lock
+
+    def external_changes(self):
+        """
+        Returns the changes other processes have made to any shard since this storage last read or wrote it.
+
+        Returns:
+            list: The journal entries of all shards, or None if a shard was rewritten and the catalog has to be
+            loaded again.
+        """
+        changes = []
+        for shard in self.__shards:
+            shard_changes = shard.external_changes()
+            if shard_changes is None:
+                return None
+            changes += shard_changes
+        return changes
+
+    def __parse_shards(self):
+        """
+        Parses every shard file, one per worker process when there is enough to parse (see
+        Catalog_Parser.parse_chunk), and separates the records that belong to another shard.
+
+        Returns:
+            list: For every shard, the (line number, movie/show) pairs that belong to it, those that belong to
+            another shard and the (line number, message) errors.
+        """
+        count = len(self.__filenames)
+        workers = self.__workers if self.__workers is not None else os.cpu_count() or 1
+        sizes = [os.path.getsize(name) for name in self.__filenames]
+        if workers < 2 or count < 2 or sum(sizes) < Catalog_Parser.PARALLEL_MIN_BYTES:
+            parsed = []
+            for name in self.__filenames:
+                parser = Catalog_Parser()
+                with open(name, "r") as file:
+                    parsed.append((list(parser.parse_records(file)), parser.get_errors()))
+        else:
+            with ProcessPoolExecutor(min(workers, count)) as executor:
+                parsed = [([(line, Catalog_Parser.from_row(row)) for line, row in rows], errors)
+                          for rows, errors, _ in executor.map(Catalog_Parser.parse_chunk, self.__filenames,
+                                                              repeat(0), sizes)]
+
+        results = []
+        for index, (pairs, errors) in enumerate(parsed):
+            placed = []
+            misplaced = []
+            for line, movie in pairs:
+                (placed if Sharded_Catalog.shard_of(movie.get_id(), count) == index else misplaced).append(
+                    (line, movie))
+            results.append((placed, misplaced, errors))
+        return results
+
+    def load(self):
+        """
+        Loads every shard and replays its journal, creating the shard files of a new catalog. Outside lazy mode a
+        record found in the wrong shard file (one edited by hand) is moved to its shard in memory, reported in the
+        load errors and written to the right file by the next save.
+
+        Returns:
+            Sharded_Catalog: A mapping from ID to movie/show over all shards.
+        """
+        with self.__lock:
+            if self.__new:
+                print(f"Catalog doesn't exist. Creating {len(self.__filenames)} empty shard files.")
+                self.replace_file(self.__manifest, lambda file: json.dump({"shards": len(self.__filenames)}, file))
+                self.__new = False
+            for name in self.__filenames:
+                if not os.path.exists(name):
+                    open(name, "w").close()
+
+            errors = []
+            misplaced = []
+            if self.__lazy:
+                mappings = [shard.load() for shard in self.__shards]
+            else:
+                mappings = []
+                for shard, (pairs, shard_misplaced, shard_errors) in zip(self.__shards, self.__parse_shards()):
+                    mappings.append(shard.load((pairs, shard_errors)))
+                    misplaced.append(shard_misplaced)
+            for name, shard in zip(self.__filenames, self.__shards):
+                errors += [(line, f"{os.path.basename(name)}: {message}") for line, message in shard.get_load_errors()]
+
+            catalog = Sharded_Catalog(mappings)
+            self.__dirty = set()
+            for index, pairs in enumerate(misplaced):
+                for line, movie in pairs:
+                    target = Sharded_Catalog.shard_of(movie.get_id(), len(self.__filenames))
+                    errors.append((line, f"{os.path.basename(self.__filenames[index])}: Record '{movie.get_id()}' "
+                                         f"belongs to {os.path.basename(self.__filenames[target])}, moved."))
+                    catalog[movie.get_id()] = movie
+                    self.__dirty |= {index, target}
+            self.__load_errors = errors
+            self.__catalog = catalog
+            return catalog
+
+    def save(self, movies):
+        """
+        Rewrites the shards changed since they were last written (in journal mode, compacts them), in parallel
+        threads. A mapping other than the one returned by load is split into shards and replaces every shard.
+
+        Parameters:
+            movies: The mapping from ID to movie/show.
+        """
+        count = len(self.__filenames)
+        if movies is self.__catalog:
+            shards = sorted(self.__dirty)
+        else:
+            split = [{} for _ in range(count)]
+            for movie in movies.values():
+                split[Sharded_Catalog.shard_of(movie.get_id(), count)][movie.get_id()] = movie
+            movies = Sharded_Catalog(split)
+            shards = range(count)
+
+        with self.__lock:
+            if len(shards) > 1:
+                with ThreadPoolExecutor(len(shards)) as executor:
+                    list(executor.map(lambda index: self.__shards[index].save(movies.get_shard(index)), shards))
+            else:
+                for index in shards:
+                    self.__shards[index].save(movies.get_shard(index))
+            self.__dirty.difference_update(shards)
+
+    def persist_batch(self, changes, movies):
+        """
+        Persists a group of changes to the shards that hold the changed records. In journal mode they are appended
+        to the journals of those shards; otherwise only those shards are rewritten.
+
+        Parameters:
+            changes: A list of (action, movie/show) pairs.
+            movies: The Sharded_Catalog returned by load.
+        """
+        count = len(self.__filenames)
+        by_shard = {}
+        for action, movie in changes:
+            by_shard.setdefault(Sharded_Catalog.shard_of(movie.get_id(), count), []).append((action, movie))
+        with self.__lock:
+            for index, shard_changes in sorted(by_shard.items()):
+                self.__shards[index].persist_batch(shard_changes, movies.get_shard(index))
+                if self.__journal_mode:
+                    self.__dirty.add(index)
+                else:
+                    self.__dirty.discard(index)
+
+    @staticmethod
+    def from_text_file(text_filename, filename, shards=None):
+        """
+        Converts a catalog in the text format (including its journal, if any) to shard files, replacing the shards
+        already there.
+
+        Parameters:
+            text_filename: The text catalog to read.
+            filename: The name the shard files are derived from.
+            shards: The number of shards of a new catalog (default DEFAULT_SHARDS).
+        """
+        storage = Sharded_Catalog_Storage(filename, shards)
+        try:
+            storage.load()
+            storage.save(Text_File_Storage(text_filename).load())
+        finally:
+            storage.close()
+
+    def close(self):
+        """
+        Waits for the background compactions of the shards and releases them.
+        """
+        for shard in self.__shards:
+            shard.close()
+
+
+class Binary_Catalog(MutableMapping):
+    """
+    Mapping from ID to movie/show over a memory-mapped file in the binary catalog format. Records are decoded the
+    first time they are accessed. Records added, replaced or removed since the file was written are kept in memory
+    until the file is rewritten.
+    """
+
+    def __init__(self, filename):
+        """
+        Opens and maps the catalog file.
+
+        Parameters:
+            filename: The binary catalog file.
+        """
+        self.__filename = filename
+        self.__overlay = {}
+        self.__hidden = set()
+        self.__decoded = {}
+        self.__open()
+
+    def __open(self):
+        """
+        Maps the file and sets up views on its columns. Only the header is read here.
+        """
+        self.__file = open(self.__filename, "r+b")
+        self.__mmap = mmap.mmap(self.__file.fileno(), 0)
+        self.__views = []
+        magic, version, count, heap_size = Binary_Catalog_Storage.HEADER.unpack_from(self.__mmap, 0)
+        if magic != Binary_Catalog_Storage.MAGIC or version != Binary_Catalog_Storage.VERSION:
+            self.close()
+            raise ValueError(f"'{self.__filename}' is not a binary catalog file.")
+
+        self.__count = count
+        layout = Binary_Catalog_Storage.layout(count)
+        self.__columns = {}
+        for name, (offset, length, item_format) in layout.items():
+            view = memoryview(self.__mmap)[offset:offset + length].cast(item_format)
+            self.__views.append(view)
+            self.__columns[name] = view
+        heap_offset = Binary_Catalog_Storage.heap_offset(count)
+        self.__heap = memoryview(self.__mmap)[heap_offset:heap_offset + heap_size]
+        self.__views.append(self.__heap)
+
+        self.__alive = count - self.__columns["flags"].tobytes().count(1)
+
+    def close(self):
+        """
+        Unmaps and closes the file.
+        """
+        for view in self.__views:
+            view.release()
+        self.__views = []
+        self.__mmap.close()
+        self.__file.close()
+
+    def remap(self, records):
+        """
+        Re-opens the file after it was rewritten from the given records, keeping the existing objects so that
+        references handed out earlier stay valid.
+
+        Parameters:
+            records: The movies/shows the file was written from, in file order.
+        """
+        self.close()
+        self.__overlay = {}
+        self.__hidden = set()
+        self.__open()
+        self.__decoded = dict(enumerate(records))
+
+    def __string(self, column, row):
+        """
+        Decodes one string field from the heap.
+        """
+        offsets = self.__columns[column]
+        return str(self.__heap[offsets[row]:offsets[row + 1]], "utf-8")
+
+    def __decode(self, row):
+        """
+        Returns the movie/show stored in the given row, decoding it on first access.
+        """
+        movie = self.__decoded.get(row)
+        if movie is not None:
+            return movie
+
+        columns = self.__columns
+        ordinal = columns["release_ordinals"][row]
+        release_date = date.fromordinal(ordinal).isoformat() if ordinal else self.__string("Release Date", row)
+        fields = dict(
+            id=self.__string("ID", row),
+            title=self.__string("Title", row),
+            genre=intern(self.__string("Genre", row)),
+            producer=intern(self.__string("Producer", row)),
+            release_date=intern(release_date),
+            number_of_views=columns["views"][row],
+            average_rating=columns["ratings"][row],
+            director=intern(self.__string("Director", row)),
+            age_restrictions=intern(self.__string("Age Restriction", row)),
+            duration=columns["durations"][row],
+        )
+        if columns["types"][row] == 1:
+            movie = Shows(episodes=columns["episodes"][row], **fields)
+        else:
+            movie = Movies(**fields)
+        self.__decoded[row] = movie
+        return movie
+
+    def find_row(self, id, include_hidden=False):
+        """
+        Finds the row of an ID with a binary search over the ID order stored in the file.
+
+        Parameters:
+            id: The ID to look up.
+            include_hidden: If True, rows removed or replaced since the file was opened are found as well.
+
+        Returns:
+            int: The row, or None if the file has no live row with that ID.
+        """
+        key = id.encode("utf-8")
+        order = self.__columns["order"]
+        offsets = self.__columns["ID"]
+        heap = self.__heap
+        low, high = 0, self.__count
+        while low < high:
+            middle = (low + high) // 2
+            row = order[middle]
+            if heap[offsets[row]:offsets[row + 1]].tobytes() < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low == self.__count:
+            return None
+        row = order[low]
+        if heap[offsets[row]:offsets[row + 1]].tobytes() != key or self.__columns["flags"][row]:
+            return None
+        if row in self.__hidden and not include_hidden:
+            return None
+        return row
+
+    def write_rating(self, row, rating):
+        """
+        Overwrites the rating of a row in place in the file.
+
+        Parameters:
+            row: The row to update.
+            rating: The new rating.
+        """
+        self.__columns["ratings"][row] = rating
+        self.__flush("ratings", row, 8)
+
+    def write_deleted(self, row):
+        """
+        Marks a row as deleted in place in the file.
+
+        Parameters:
+            row: The row to delete.
+        """
+        self.__columns["flags"][row] = 1
+        self.__flush("flags", row, 1)
+
+    def __flush(self, column, row, item_size):
+        """
+        Forces the page holding one field of a row to disk.
+        """
+        offset = Binary_Catalog_Storage.layout(self.__count)[column][0] + row * item_size
+        page_start = offset - offset % mmap.ALLOCATIONGRANULARITY
+        self.__mmap.flush(page_start, offset + item_size - page_start)
+
+    def __getitem__(self, id):
+        if id in self.__overlay:
+            return self.__overlay[id]
+        row = self.find_row(id)
+        if row is None:
+            raise KeyError(id)
+        return self.__decode(row)
+
+    def __setitem__(self, id, movie):
+        row = self.find_row(id)
+        if row is not None:
+            self.__hidden.add(row)
+            self.__alive -= 1
+        self.__overlay[id] = movie
+
+    def __delitem__(self, id):
+        if id in self.__overlay:
+            del self.__overlay[id]
+            return
+        row = self.find_row(id)
+        if row is None:
+            raise KeyError(id)
+        self.__hidden.add(row)
+        self.__alive -= 1
+
+    def __contains__(self, id):
+        return id in self.__overlay or self.find_row(id) is not None
+
+    def __live_rows(self):
+        flags = self.__columns["flags"]
+        hidden = self.__hidden
+        return (row for row in range(self.__count) if not flags[row] and row not in hidden)
+
+    def __iter__(self):
+        for row in self.__live_rows():
+            yield self.__string("ID", row)
+        yield from list(self.__overlay)
+
+    def __len__(self):
+        return self.__alive + len(self.__overlay)
+
+    def values(self):
+        """
+        Yields every movie/show, decoding rows in file order without going through the ID search.
+        """
+        for row in self.__live_rows():
+            yield self.__decode(row)
+        yield from list(self.__overlay.values())
+
+    def items(self):
+        """
+        Yields (ID, movie/show) pairs in file order.
+        """
+        for movie in self.values():
+            yield movie.get_id(), movie
+
+
+class Binary_Catalog_Storage(Catalog_Storage):
+    """
+    Stores the catalog in a compact binary file that is memory-mapped on load. Fixed-width fields are kept in packed
+    columns (views, rating, release date as an ordinal, duration, episodes, type) and strings in a shared heap, so
+    opening the file costs the same no matter how many records it holds. Rating updates and deletes are written in
+    place; added records go to a change journal until the file is rewritten.
+
+    Writes hold an advisory lock shared with other processes. The mapping is shared with them too, so their in-place
+    changes are visible right away; any change of the file or the journal by another process makes the catalog
+    load again, which only maps the file anew.
+
+    The file uses the native byte order of the machine that wrote it.
+    """
+
+    MAGIC = b"MOVIECAT"
+    VERSION = 1
+    HEADER = struct.Struct("<8sIIQ")
+    NUMERIC_COLUMNS = (("views", "q"), ("ratings", "d"), ("release_ordinals", "i"), ("durations", "i"),
+                       ("episodes", "i"), ("types", "B"), ("flags", "B"))
+    STRING_COLUMNS = ("ID", "Title", "Genre", "Producer", "Director", "Age Restriction", "Release Date")
+
+    def __init__(self, filename, compaction_threshold=1024 * 1024):
+        """
+        Initializes the storage for the given file.
+
+        Parameters:
+            filename: The binary catalog file.
+            compaction_threshold: Journal size in bytes at which the file is rewritten.
+        """
+        self.__filename = filename
+        self.__journal = Change_Journal(filename + ".journal")
+        self.__compaction_threshold = compaction_threshold
+        self.__catalog = None
+        self.__lock = File_Lock(filename + ".lock")
+        # The signatures of the file and the journal after this process last loaded or wrote them.
+        self.__signature = None
+        self.__bytes_written = 0
+
+    @staticmethod
+    def __align(offset):
+        return (offset + 7) & ~7
+
+    @staticmethod
+    def layout(count):
+        """
+        Computes where each column of a file with the given number of records starts.
+
+        Parameters:
+            count: The number of records in the file.
+
+        Returns:
+            dict: Column name mapped to (offset, length in bytes, array format).
+        """
+        columns = [(name, count, item_format) for name, item_format in Binary_Catalog_Storage.NUMERIC_COLUMNS]
+        columns += [(name, count + 1, "Q") for name in Binary_Catalog_Storage.STRING_COLUMNS]
+        columns.append(("order", count, "I"))
+
+        layout = {}
+        offset = Binary_Catalog_Storage.__align(Binary_Catalog_Storage.HEADER.size)
+        for name, items, item_format in columns:
+            length = items * struct.calcsize(item_format)
+            layout[name] = (offset, length, item_format)
+            offset = Binary_Catalog_Storage.__align(offset + length)
+        return layout
+
+    @staticmethod
+    def heap_offset(count):
+        """
+        Returns where the string heap of a file with the given number of records starts.
+
+        Parameters:
+            count: The number of records in the file.
+
+        Returns:
+            int: The offset of the string heap.
+        """
+        offset, length, _ = Binary_Catalog_Storage.layout(count)["order"]
+        return Binary_Catalog_Storage.__align(offset + length)
+
+    @staticmethod
+    def write(filename, movies):
+        """
+        Writes movies/shows to a binary catalog file, replacing it atomically.
+
+        Parameters:
+            filename: The file to write.
+            movies: An iterable of movies/shows.
+        """
+        numeric = {name: array(item_format) for name, item_format in Binary_Catalog_Storage.NUMERIC_COLUMNS}
+        strings = {name: bytearray() for name in Binary_Catalog_Storage.STRING_COLUMNS}
+        offsets = {name: array("Q", [0]) for name in Binary_Catalog_Storage.STRING_COLUMNS}
+        ids = []
+
+        def add_string(column, value):
+            strings[column].extend(value.encode("utf-8"))
+            offsets[column].append(len(strings[column]))
+
+        for movie in movies:
+            release_date = movie.get_release_date()
+            try:
+                ordinal = date.fromisoformat(release_date).toordinal()
+                if date.fromordinal(ordinal).isoformat() != release_date:
+                    ordinal = 0
+            except (TypeError, ValueError):
+                ordinal = 0
+
+            numeric["views"].append(movie.get_number_of_views())
+            numeric["ratings"].append(movie.get_average_rating())
+            numeric["release_ordinals"].append(ordinal)
+            numeric["durations"].append(movie.get_duration())
+            numeric["episodes"].append(int(movie.get_episodes()) if movie.get_type() == "Show" else -1)
+            numeric["types"].append(1 if movie.get_type() == "Show" else 0)
+            numeric["flags"].append(0)
+
+            ids.append(movie.get_id().encode("utf-8"))
+            add_string("ID", movie.get_id())
+            add_string("Title", movie.get_movie_title())
+            add_string("Genre", movie.get_genre())
+            add_string("Producer", movie.get_producer())
+            add_string("Director", movie.get_director())
+            add_string("Age Restriction", movie.get_age_restrictions())
+            add_string("Release Date", "" if ordinal else str(release_date))
+
+        # Each string column is stored as one contiguous run of the heap, so its offsets are shifted by where the
+        # run starts.
+        heap = bytearray()
+        for name in Binary_Catalog_Storage.STRING_COLUMNS:
+            base = len(heap)
+            if base:
+                offsets[name] = array("Q", (offset + base for offset in offsets[name]))
+            heap.extend(strings.pop(name))
+
+        count = len(ids)
+        order = array("I", sorted(range(count), key=ids.__getitem__))
+        columns = dict(numeric, order=order, **offsets)
+        layout = Binary_Catalog_Storage.layout(count)
+
+        def write_file(file):
+            file.write(Binary_Catalog_Storage.HEADER.pack(Binary_Catalog_Storage.MAGIC,
+                                                          Binary_Catalog_Storage.VERSION, count, len(heap)))
+            for name, (offset, _, _) in layout.items():
+                file.write(b"\0" * (offset - file.tell()))
+                file.write(columns[name].tobytes())
+            file.write(b"\0" * (Binary_Catalog_Storage.heap_offset(count) - file.tell()))
+            file.write(heap)
+
+        Catalog_Storage.replace_file(filename, write_file, mode="wb")
+
+    @staticmethod
+    def from_text_file(text_filename, binary_filename):
+        """
+        Converts a catalog in the text format (including its journal, if any) to the binary format.
+
+        Parameters:
+            text_filename: The text catalog to read.
+            binary_filename: The binary catalog to write.
+        """
+        Binary_Catalog_Storage.write(binary_filename, Text_File_Storage(text_filename).load().values())
+
+    @staticmethod
+    def to_text_file(binary_filename, text_filename):
+        """
+        Converts a catalog in the binary format (including its journal, if any) to the text format.
+
+        Parameters:
+            binary_filename: The binary catalog to read.
+            text_filename: The text catalog to write.
+        """
+        storage = Binary_Catalog_Storage(binary_filename)
+        try:
+            movies = storage.load()
+            Catalog_Storage.replace_file(text_filename,
+                                         lambda file: Text_File_Storage.write_records(file, movies.values()))
+        finally:
+            storage.close()
+
+    def load(self):
+        """
+        Maps the file and replays the journal of records added since it was written. If the file doesn't exist,
+        creates an empty one.
+
+        Returns:
+            Binary_Catalog: A mapping from ID to movie/show that decodes records on access.
+        """
+        with self.__lock:
+            if not os.path.exists(self.__filename):
+                print("File doesn't exist. Creating an empty file.")
+                self.write(self.__filename, [])
+
+            if self.__catalog is not None:
+                self.__catalog.close()
+            self.__catalog = Binary_Catalog(self.__filename)
+            Change_Journal.apply(self.__catalog, self.__journal.replay())
+            self.__signature = self.__files()
+            return self.__catalog
+
+    def __files(self):
+        """
+        Returns the signatures of the file and the journal.
+        """
+        return self.file_signature(self.__filename), self.file_signature(self.__journal.get_filename())
+
+    def lock(self):
+        """
+        Returns the advisory lock on the catalog files.
+
+        Returns:
+            File_Lock: The lock.
+        """
+        return self.__lock
+
+    def external_changes(self):
+        """
+        Tells whether another process changed the file or the journal since this storage last loaded or wrote them.
+
+        Returns:
+            list: An empty list if nothing changed, or None if the catalog has to be loaded again.
+        """
+        with self.__lock:
+            return [] if self.__files() == self.__signature else None
+
+    def save(self, movies):
+        """
+        Rewrites the whole file and clears the journal.
+
+        Parameters:
+            movies: The mapping from ID to movie/show.
+        """
+        with self.__lock:
+            records = list(movies.values())
+            self.write(self.__filename, records)
+            self.__bytes_written += os.path.getsize(self.__filename)
+            self.__journal.discard_before(self.__journal.size())
+            if movies is self.__catalog:
+                self.__catalog.remap(records)
+            self.__signature = self.__files()
+
+    def persist_batch(self, changes, movies):
+        """
+        Persists a group of changes. A single rating update or delete of a record stored in the file is written in
+        place while the journal is empty; everything else is appended to the journal in one write, so the journal
+        always holds the latest changes in order.
+
+        Parameters:
+            changes: A list of (action, movie/show) pairs.
+            movies: The mapping from ID to movie/show.
+        """
+        if movies is not self.__catalog:
+            self.save(movies)
+            return
+
+        with self.__lock:
+            # A change by another process that this one has not loaded yet stays visible to external_changes.
+            current = self.__files() == self.__signature
+            if not (len(changes) == 1 and self.__journal.size() == 0 and self.__write_in_place(*changes[0])):
+                self.__bytes_written += self.__journal.append([Change_Journal.format_entry(action, movie)
+                                                               for action, movie in changes])
+            if not current:
+                return
+            if self.__journal.size() >= self.__compaction_threshold:
+                self.save(movies)
+            self.__signature = self.__files()
+
+    def __write_in_place(self, action, movie):
+        """
+        Writes a rating update or delete directly into the file.
+
+        Parameters:
+            action: The change ("add", "update" or "delete").
+            movie: The movie/show that was changed.
+
+        Returns:
+            bool: True if the change was written, False if it has to go to the journal.
+        """
+        if action == "update":
+            row = self.__catalog.find_row(movie.get_id())
+            if row is not None:
+                self.__catalog.write_rating(row, movie.get_average_rating())
+                self.__bytes_written += 8
+                return True
+
+        elif action == "delete":
+            row = self.__catalog.find_row(movie.get_id(), include_hidden=True)
+            if row is not None:
+                self.__catalog.write_deleted(row)
+                self.__bytes_written += 1
+                return True
+
+        return False
+
+    def get_bytes_written(self):
+        """
+        Returns how many bytes have been written to the file and the journal since the storage was created.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        return self.__bytes_written
+
+    def close(self):
+        """
+        Unmaps the file.
+        """
+        if self.__catalog is not None:
+            self.__catalog.close()
+            self.__catalog = None
+
+
+class Sqlite_Catalog(MutableMapping):
+    """
+    Mapping from ID to movie/show backed by an SQLite table. Nothing is cached: every lookup reads the row and
+    builds a fresh object, so the catalog does not have to fit in memory. Writes through the mapping are part of the
+    connection's open transaction until the storage commits them.
+    """
+
+    COLUMNS = ("id, title, genre, producer, release_date, views, rating, director, age_restriction, duration, type, "
+               "episodes")
+
+    def __init__(self, connection):
+        """
+        Initializes the mapping over an open connection whose schema has been created.
+
+        Parameters:
+            connection: The sqlite3 connection.
+        """
+        self.__connection = connection
+        self.__genre_tokens = Field_Index(split=True).tokens
+
+    @staticmethod
+    def build_movie(row):
+        """
+        Builds a movie/show from a row selected with COLUMNS.
+
+        Parameters:
+            row: The selected row.
+
+        Returns:
+            BaseFilm: The movie/show.
+        """
+        return Catalog_Parser.from_row(row)
+
+    def select(self, where="1", parameters=(), order="seq", limit=None):
+        """
+        Returns the movies/shows matching an SQL condition.
+
+        Parameters:
+            where: The condition, with ? placeholders.
+            parameters: The values of the placeholders.
+            order: The ORDER BY clause.
+            limit: The maximum number of movies/shows, or None for all of them.
+
+        Returns:
+            list: The matching movies/shows.
+        """
+        sql = f"SELECT {self.COLUMNS} FROM movies WHERE {where} ORDER BY {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)}"
+        return [self.build_movie(row) for row in self.__connection.execute(sql, parameters)]
+
+    def write(self, movie, new=False):
+        """
+        Inserts a movie/show, or updates the row with the same ID in place so it keeps its position in the catalog.
+
+        Parameters:
+            movie: The movie/show to write.
+            new: True if no row has this ID yet, which saves looking for one.
+        """
+        episodes = movie.get_episodes() if movie.get_type() == "Show" else None
+        values = (movie.get_movie_title(), Title_Index.normalize(movie.get_movie_title()), movie.get_genre(),
+                  movie.get_duration(), movie.get_producer(), movie.get_producer().strip().lower(),
+                  movie.get_release_date(), movie.get_number_of_views(), movie.get_average_rating(),
+                  movie.get_director(), movie.get_director().strip().lower(), movie.get_age_restrictions(),
+                  movie.get_type(), episodes, movie.get_id())
+        connection = self.__connection
+        cursor = None if new else connection.execute(
+            "UPDATE movies SET title = ?, title_key = ?, genre = ?, duration = ?, producer = ?, producer_key = ?, "
+            "release_date = ?, views = ?, rating = ?, director = ?, director_key = ?, age_restriction = ?, type = ?, "
+            "episodes = ? WHERE id = ?", values)
+        if cursor is not None and cursor.rowcount:
+            seq = connection.execute("SELECT seq FROM movies WHERE id = ?", (movie.get_id(),)).fetchone()[0]
+            connection.execute("DELETE FROM genres WHERE seq = ?", (seq,))
+        else:
+            seq = connection.execute(
+                "INSERT INTO movies (title, title_key, genre, duration, producer, producer_key, release_date, views, "
+                "rating, director, director_key, age_restriction, type, episodes, id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", values).lastrowid
+        connection.executemany("INSERT OR IGNORE INTO genres (token, seq) VALUES (?, ?)",
+                               [(token, seq) for token in self.__genre_tokens(movie.get_genre())])
+
+    def __getitem__(self, id):
+        row = self.__connection.execute(f"SELECT {self.COLUMNS} FROM movies WHERE id = ?", (id,)).fetchone()
+        if row is None:
+            raise KeyError(id)
+        return self.build_movie(row)
+
+    def __setitem__(self, id, movie):
+        self.write(movie)
+
+    def __delitem__(self, id):
+        row = self.__connection.execute("SELECT seq FROM movies WHERE id = ?", (id,)).fetchone()
+        if row is None:
+            raise KeyError(id)
+        self.__connection.execute("DELETE FROM genres WHERE seq = ?", row)
+        self.__connection.execute("DELETE FROM movies WHERE seq = ?", row)
+
+    def __contains__(self, id):
+        return self.__connection.execute("SELECT 1 FROM movies WHERE id = ?", (id,)).fetchone() is not None
+
+    def __iter__(self):
+        for (id,) in self.__connection.execute("SELECT id FROM movies ORDER BY seq"):
+            yield id
+
+    def __len__(self):
+        return self.__connection.execute("SELECT COUNT(*) FROM movies").fetchone()[0]
+
+    def values(self):
+        """
+        Yields every movie/show in catalog order, reading the table once instead of looking up each ID.
+        """
+        for row in self.__connection.execute(f"SELECT {self.COLUMNS} FROM movies ORDER BY seq"):
+            yield self.build_movie(row)
+
+    def items(self):
+        """
+        Yields (ID, movie/show) pairs in catalog order.
+        """
+        for movie in self.values():
+            yield movie.get_id(), movie
+
+
+class Sqlite_Catalog_Storage(Catalog_Storage):
+    """
+    Stores the catalog in an SQLite database (WAL mode). The catalog stays on disk: Movie_Manager works on an
+    Sqlite_Catalog and hands searches, pagination, rankings and range filters to SQL, where indexes on the ID, title,
+    genre, director, producer, type, rating, views, release date and duration answer them. Each group of changes is
+    one transaction.
+    """
+
+    QUERY_PUSHDOWN = True
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS movies (
+            seq INTEGER PRIMARY KEY,
+            id TEXT NOT NULL UNIQUE,
+            title TEXT NOT NULL,
+            title_key TEXT NOT NULL,
+            genre TEXT NOT NULL,
+            duration INTEGER NOT NULL,
+            producer TEXT NOT NULL,
+            producer_key TEXT NOT NULL,
+            release_date TEXT NOT NULL,
+            views INTEGER NOT NULL,
+            rating REAL NOT NULL,
+            director TEXT NOT NULL,
+            director_key TEXT NOT NULL,
+            age_restriction TEXT NOT NULL,
+            type TEXT NOT NULL,
+            episodes INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS genres (
+            token TEXT NOT NULL,
+            seq INTEGER NOT NULL,
+            PRIMARY KEY (token, seq)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS genres_seq ON genres (seq);
+        CREATE INDEX IF NOT EXISTS movies_title ON movies (title_key);
+        CREATE INDEX IF NOT EXISTS movies_director ON movies (director_key);
+        CREATE INDEX IF NOT EXISTS movies_producer ON movies (producer_key);
+        CREATE INDEX IF NOT EXISTS movies_type ON movies (type);
+        CREATE INDEX IF NOT EXISTS movies_rating ON movies (rating, id);
+        CREATE INDEX IF NOT EXISTS movies_views ON movies (views, id);
+        CREATE INDEX IF NOT EXISTS movies_type_rating ON movies (type, rating, id);
+        CREATE INDEX IF NOT EXISTS movies_type_views ON movies (type, views, id);
+        CREATE INDEX IF NOT EXISTS movies_release_date ON movies (release_date, id);
+        CREATE INDEX IF NOT EXISTS movies_duration ON movies (duration, id);
+    """
+    # Columns behind the rankings and range filters. Release dates are stored as YYYY-MM-DD text, which sorts in
+    # date order.
+    RANKING_COLUMNS = {"rating": "rating", "views": "views", "release_date": "release_date", "duration": "duration"}
+
+    def __init__(self, filename):
+        """
+        Initializes the storage for the given database file. The file is opened on load.
+
+        Parameters:
+            filename: The SQLite database file.
+        """
+        self.__filename = filename
+        self.__connection = None
+        self.__catalog = None
+
+    @staticmethod
+    def from_text_file(text_filename, database_filename):
+        """
+        Converts a catalog in the text format (including its journal, if any) to an SQLite database, replacing the
+        catalog already in the database.
+
+        Parameters:
+            text_filename: The text catalog to read.
+            database_filename: The database to write.
+        """
+        storage = Sqlite_Catalog_Storage(database_filename)
+        try:
+            storage.load()
+            storage.save(Text_File_Storage(text_filename).load())
+        finally:
+            storage.close()
+
+    def load(self):
+        """
+        Opens the database, creating it and its schema if needed.
+
+        Returns:
+            Sqlite_Catalog: A mapping from ID to movie/show that reads rows on access.
+        """
+        if self.__connection is None:
+            self.__connection = sqlite3.connect(self.__filename, check_same_thread=False)
+            self.__connection.execute("PRAGMA journal_mode=WAL")
+            self.__connection.executescript(self.SCHEMA)
+        self.__catalog = Sqlite_Catalog(self.__connection)
+        return self.__catalog
+
+    def save(self, movies):
+        """
+        Commits the catalog. A mapping other than the one returned by load replaces the whole table, in one
+        transaction.
+
+        Parameters:
+            movies: The mapping from ID to movie/show.
+        """
+        with self.__connection:
+            if movies is not self.__catalog:
+                self.__connection.execute("DELETE FROM genres")
+                self.__connection.execute("DELETE FROM movies")
+                for movie in movies.values():
+                    self.__catalog.write(movie, new=True)
+
+    def persist_batch(self, changes, movies):
+        """
+        Persists a group of changes in one transaction. Adds and deletes were already written through the mapping;
+        updates are written here. If anything fails the whole group is rolled back.
+
+        Parameters:
+            changes: A list of (action, movie/show) pairs.
+            movies: The mapping from ID to movie/show.
+        """
+        if movies is not self.__catalog:
+            self.save(movies)
+            return
+
+        with self.__connection:
+            for action, movie in changes:
+                if action == "update":
+                    self.__catalog.write(movie)
+
+    def close(self):
+        """
+        Commits pending writes, refreshes the query planner statistics if needed and closes the database.
+        """
+        if self.__connection is not None:
+            self.__connection.commit()
+            self.__connection.execute("PRAGMA optimize")
+            self.__connection.close()
+            self.__connection = None
+            self.__catalog = None
+
+    def search_by_title(self, text):
+        """
+        Finds the movies/shows whose title contains the given text, ignoring case.
+
+        Parameters:
+            text: The text to search for.
+
+        Returns:
+            list: The matching movies/shows, in catalog order.
+        """
+        return self.__catalog.select("instr(title_key, ?) > 0", (Title_Index.normalize(text),))
+
+    def search_by_field(self, field, text):
+        """
+        Finds the movies/shows with a genre, director or producer containing the given text, ignoring case.
+
+        Parameters:
+            field: "genre", "director" or "producer".
+            text: The text to search for.
+
+        Returns:
+            list: The matching movies/shows, in catalog order.
+
+        Raises:
+            ValueError: If the field is unknown.
+        """
+        if field not in ("genre", "director", "producer"):
+            raise ValueError("Field must be 'genre', 'director' or 'producer'.")
+        if field == "genre":
+            # Each comma-separated part must be found in a genre of the movie/show, as with Field_Index.
+            parts = Field_Index(split=True).tokens(text) or [""]
+            condition = "seq IN (SELECT seq FROM genres WHERE instr(token, ?) > 0)"
+            return self.__catalog.select(" AND ".join([condition] * len(parts)), parts)
+        return self.__catalog.select(f"instr({field}_key, ?) > 0", (text.strip().lower(),))
+
+    def find_movies(self, genre=None, director=None, producer=None, match_all=True):
+        """
+        Finds movies/shows by exact genre, director and producer, ignoring case.
+
+        Parameters:
+            genre: A genre, or comma-separated genres. Each genre is its own criterion.
+            director: The name of a director.
+            producer: The name of a producer.
+            match_all: If True, a movie/show must match every criterion (AND); otherwise any criterion (OR).
+
+        Returns:
+            list: The matching movies/shows, in catalog order.
+        """
+        conditions = []
+        parameters = []
+        if genre is not None:
+            for token in Field_Index(split=True).tokens(genre):
+                conditions.append("seq IN (SELECT seq FROM genres WHERE token = ?)")
+                parameters.append(token)
+        if director is not None:
+            conditions.append("director_key = ?")
+            parameters.append(director.strip().lower())
+        if producer is not None:
+            conditions.append("producer_key = ?")
+            parameters.append(producer.strip().lower())
+
+        if not conditions:
+            return []
+        return self.__catalog.select((" AND " if match_all else " OR ").join(conditions), parameters)
+
+    def contains_title(self, title):
+        """
+        Checks whether a movie/show has the given title, ignoring case and surrounding whitespace.
+
+        Parameters:
+            title: The title to look for.
+
+        Returns:
+            bool: True if the title is taken.
+        """
+        return self.__connection.execute("SELECT 1 FROM movies WHERE title_key = ?",
+                                         (Title_Index.normalize(title),)).fetchone() is not None
+
+    def count(self, types):
+        """
+        Returns the number of movies or shows.
+
+        Parameters:
+            types: 'Movie' or 'Show'.
+
+        Returns:
+            int: The number of movies/shows of that type.
+        """
+        return self.__connection.execute("SELECT COUNT(*) FROM movies WHERE type = ?", (types,)).fetchone()[0]
+
+    def page(self, types, cursor, size):
+        """
+        Returns one page of movies or shows, in catalog order. The cursor is the position of the first record of the
+        page, so a deep page is an index seek rather than an OFFSET scan.
+
+        Parameters:
+            types: 'Movie' or 'Show'.
+            cursor: The cursor returned with the previous page, or None for the first page.
+            size: The maximum number of movies/shows on the page.
+
+        Returns:
+            tuple: The movies/shows on the page and the cursor of the next page (None after the last page).
+        """
+        rows = self.__connection.execute(
+            f"SELECT seq, {Sqlite_Catalog.COLUMNS} FROM movies WHERE type = ? AND seq >= ? ORDER BY seq LIMIT ?",
+            (types, 0 if cursor is None else cursor, size + 1)).fetchall()
+        next_cursor = rows.pop()[0] if len(rows) > size else None
+        return [Sqlite_Catalog.build_movie(row[1:]) for row in rows], next_cursor
+
+    def top_movies(self, by, n, types, lowest):
+        """
+        Returns the highest (or lowest) ranked movies/shows by average rating or number of views.
+
+        Parameters:
+            by: "rating" or "views".
+            n: The number of movies/shows to return.
+            types: 'Movie' or 'Show' to rank one type only, or None to rank both together.
+            lowest: If True, returns the lowest ranked instead of the highest.
+
+        Returns:
+            list: Up to n movies/shows, best first (worst first with lowest). Ties follow the ranking direction:
+                descending ID best first, ascending ID worst first (IDs compare as text).
+        """
+        column = self.RANKING_COLUMNS[by]
+        direction = "ASC" if lowest else "DESC"
+        where, parameters = ("type = ?", (types,)) if types else ("1", ())
+        return self.__catalog.select(where, parameters, f"{column} {direction}, id {direction}", n)
+
+    def movies_in_range(self, by, low, high, types):
+        """
+        Returns the movies/shows whose average rating, number of views, release date or duration lies within a
+        range.
+
+        Parameters:
+            by: "rating", "views", "release_date" or "duration".
+            low: The smallest value included, or None for no lower bound (a date ordinal for release dates).
+            high: The largest value included, or None for no upper bound.
+            types: 'Movie' or 'Show' to include one type only, or None for both.
+
+        Returns:
+            list: The matching movies/shows, from the lowest value up. Ties are ordered by ID.
+        """
+        return self.movies_in_ranges({by: (low, high)}, types)
+
+    def movies_in_ranges(self, ranges, types):
+        """
+        Returns the movies/shows that lie within several ranges at once. SQLite picks the index to walk.
+
+        Parameters:
+            ranges: A dict from ranking key to a (low, high) pair; None leaves a side open. Release dates are date
+                ordinals.
+            types: 'Movie' or 'Show' to include one type only, or None for both.
+
+        Returns:
+            list: The matching movies/shows, ordered by the value of the first range and then by ID.
+        """
+        conditions = []
+        parameters = []
+        for by, (low, high) in ranges.items():
+            column = self.RANKING_COLUMNS[by]
+            for bound, operator in ((low, ">="), (high, "<=")):
+                if bound is not None:
+                    conditions.append(f"{column} {operator} ?")
+                    parameters.append(date.fromordinal(bound).isoformat() if by == "release_date" else bound)
+        if types:
+            conditions.append("type = ?")
+            parameters.append(types)
+        order = self.RANKING_COLUMNS[next(iter(ranges))]
+        return self.__catalog.select(" AND ".join(conditions) or "1", parameters, f"{order}, id")
+
+
+class Title_Index:
+    """
+    Character-trigram inverted index over normalized titles. Every trigram maps to the positions of the titles that
+    contain it, so a substring search only checks the titles in the shortest posting list of its trigrams instead of
+    every title in the catalog.
+
+    Titles are indexed as they were when the movie/show was added; renaming a record directly with set_movie_title
+    is not picked up.
+    """
+
+    def __init__(self, movies=()):
+        """
+        Builds the index over the given movies/shows.
+
+        Parameters:
+            movies: An iterable of movies/shows to index.
+        """
+        self.__titles = []
+        self.__ids = []
+        self.__positions = {}
+        self.__postings = {}
+        self.__removed = 0
+        self.__last_scanned = 0
+        for movie in movies:
+            self.add(movie.get_id(), movie.get_movie_title())
+
+    @staticmethod
+    def normalize(title):
+        """
+        Returns the form of a title used for matching.
+
+        Parameters:
+            title: The title to normalize.
+
+        Returns:
+            str: The title without surrounding whitespace, in lower case.
+        """
+        return title.strip().lower()
+
+    @staticmethod
+    def __trigrams(title):
+        return {title[i:i + 3] for i in range(len(title) - 2)}
+
+    def add(self, id, title):
+        """
+        Adds a title to the index, replacing the title previously indexed for the same ID.
+
+        Parameters:
+            id: The ID of the movie/show.
+            title: The title of the movie/show.
+        """
+        self.remove(id)
+        title = self.normalize(title)
+        position = len(self.__titles)
+        self.__titles.append(title)
+        self.__ids.append(id)
+        self.__positions[id] = position
+        postings = self.__postings
+        for trigram in self.__trigrams(title):
+            posting = postings.get(trigram)
+            if posting is None:
+                posting = postings[trigram] = array("I")
+            posting.append(position)
+
+    def remove(self, id):
+        """
+        Removes the title of an ID from the index. The slot is only marked as free; the index is rebuilt once more
+        than half of its slots are free.
+
+        Parameters:
+            id: The ID of the movie/show.
+        """
+        position = self.__positions.pop(id, None)
+        if position is None:
+            return
+
+        self.__titles[position] = None
+        self.__ids[position] = None
+        self.__removed += 1
+        if self.__removed > 1024 and self.__removed * 2 > len(self.__titles):
+            entries = [(id, title) for id, title in zip(self.__ids, self.__titles) if id is not None]
+            self.__init__()
+            for id, title in entries:
+                self.add(id, title)
+
+    def __candidates(self, text):
+        """
+        Returns the positions that can contain the normalized text: the shortest posting list among its trigrams, or
+        every position for texts shorter than a trigram.
+        """
+        if len(text) < 3:
+            return range(len(self.__titles))
+
+        postings = []
+        for trigram in self.__trigrams(text):
+            posting = self.__postings.get(trigram)
+            if posting is None:
+                return ()
+            postings.append(posting)
+        return min(postings, key=len)
+
+    def search(self, text):
+        """
+        Finds the titles containing the given text, ignoring case.
+
+        Parameters:
+            text: The text to search for.
+
+        Returns:
+            list: The IDs of the matching movies/shows, in the order they were added.
+        """
+        text = self.normalize(text)
+        titles = self.__titles
+        candidates = self.__candidates(text)
+        self.__last_scanned = len(candidates)
+        return [self.__ids[position] for position in candidates
+                if titles[position] is not None and text in titles[position]]
+
+    def get_last_scanned(self):
+        """
+        Returns how many titles the last search had to check, for the metrics.
+
+        Returns:
+            int: The number of candidate titles of the last search.
+        """
+        return self.__last_scanned
+
+    def contains_title(self, title):
+        """
+        Checks whether a title is already in the index, ignoring case and surrounding whitespace.
+
+        Parameters:
+            title: The title to look for.
+
+        Returns:
+            bool: True if a movie/show with that title is indexed.
+        """
+        title = self.normalize(title)
+        return any(self.__titles[position] == title for position in self.__candidates(title))
+
+
+class Field_Index:
+    """
+    Inverted index from the normalized values of one field (genre, director or producer) to the IDs of the
+    movies/shows that have them. Comma-separated values such as "Action, Comedy" can be split into one token per
+    value. Posting lists are dicts used as ordered sets, so they keep catalog order.
+    """
+
+    def __init__(self, split=False):
+        """
+        Initializes an empty index.
+
+        Parameters:
+            split: If True, values are split on commas into separate tokens.
+        """
+        self.__split = split
+        self.__postings = {}
+
+    def tokens(self, value):
+        """
+        Returns the normalized tokens of a field value.
+
+        Parameters:
+            value: The field value.
+
+        Returns:
+            list: The lower-cased tokens, without surrounding whitespace or empty tokens.
+        """
+        parts = value.split(",") if self.__split else [value]
+        return [token for token in (part.strip().lower() for part in parts) if token]
+
+    def add(self, id, value):
+        """
+        Indexes the value of a movie/show.
+
+        Parameters:
+            id: The ID of the movie/show.
+            value: The field value of the movie/show.
+        """
+        for token in self.tokens(value):
+            posting = self.__postings.get(token)
+            if posting is None:
+                posting = self.__postings[token] = {}
+            posting[id] = None
+
+    def remove(self, id, value):
+        """
+        Removes the value of a movie/show from the index.
+
+        Parameters:
+            id: The ID of the movie/show.
+            value: The field value the movie/show was indexed with.
+        """
+        for token in self.tokens(value):
+            posting = self.__postings.get(token)
+            if posting is not None:
+                posting.pop(id, None)
+                if not posting:
+                    del self.__postings[token]
+
+    def lookup(self, token):
+        """
+        Returns the IDs indexed under one token.
+
+        Parameters:
+            token: The token to look up; it is normalized first.
+
+        Returns:
+            dict: The matching IDs as an ordered set. Must not be modified.
+        """
+        return self.__postings.get(token.strip().lower(), {})
+
+    def search(self, text):
+        """
+        Finds the IDs whose tokens contain the given text. Only the distinct tokens are scanned, not the records. With
+        split values the text is split the same way, and each of its parts must be found in a token of the ID, so
+        "action, comedy" finds the titles listed under both genres.
+
+        Parameters:
+            text: The text to search for, ignoring case.
+
+        Returns:
+            dict: The matching IDs as an ordered set.
+        """
+        matches = None
+        for part in self.tokens(text) or [""]:
+            found = {}
+            for token, posting in self.__postings.items():
+                if part in token:
+                    found.update(posting)
+            matches = found if matches is None else {id: None for id in matches if id in found}
+        return matches
+
+
+class Type_Partition:
+    """
+    The IDs of one type of film (Movie or Show) in catalog order, for pagination. Every entry gets an increasing key
+    that serves as the pagination cursor: finding where a page starts is a binary search over the keys, so a deep
+    page costs the same as the first one, and cursors stay valid while entries are added and removed.
+    """
+
+    def __init__(self):
+        """
+        Initializes an empty partition.
+        """
+        self.__keys = array("Q")
+        self.__ids = []
+        self.__positions = {}
+        self.__next_key = 0
+        self.__removed = 0
+
+    def __len__(self):
+        return len(self.__positions)
+
+    def add(self, id):
+        """
+        Appends an ID to the partition.
+
+        Parameters:
+            id: The ID of the movie/show.
+        """
+        if id in self.__positions:
+            return
+        self.__positions[id] = len(self.__ids)
+        self.__keys.append(self.__next_key)
+        self.__ids.append(id)
+        self.__next_key += 1
+
+    def remove(self, id):
+        """
+        Removes an ID from the partition. Its slot is only marked as free until more than half of the slots are
+        free; then the free slots are dropped, keeping the keys of the remaining entries.
+
+        Parameters:
+            id: The ID of the movie/show.
+        """
+        position = self.__positions.pop(id, None)
+        if position is None:
+            return
+
+        self.__ids[position] = None
+        self.__removed += 1
+        if self.__removed > 1024 and self.__removed * 2 > len(self.__ids):
+            live = [position for position, id in enumerate(self.__ids) if id is not None]
+            self.__keys = array("Q", (self.__keys[position] for position in live))
+            self.__ids = [self.__ids[position] for position in live]
+            self.__positions = {id: position for position, id in enumerate(self.__ids)}
+            self.__removed = 0
+
+    def page(self, cursor, size):
+        """
+        Returns one page of IDs.
+
+        Parameters:
+            cursor: The cursor returned with the previous page, or None for the first page.
+            size: The maximum number of IDs on the page.
+
+        Returns:
+            tuple: The IDs on the page and the cursor of the next page (None after the last page).
+        """
+        ids = self.__ids
+        position = bisect_left(self.__keys, cursor) if cursor is not None else 0
+        page = []
+        while position < len(ids):
+            id = ids[position]
+            if id is not None:
+                if len(page) == size:
+                    return page, self.__keys[position]
+                page.append(id)
+            position += 1
+        return page, None
+
+
+class Sorted_Index:
+    """
+    Sorted collection of (key, ID) pairs, kept as a list of sorted buckets of bounded size. Adding or removing a pair
+    is a binary search over the bucket maxima plus an insert into one small bucket, so the cost grows with the log
+    of the size of the index rather than with the size itself. Iterating from either end yields the smallest or
+    largest keys without sorting anything. A Fenwick tree over the bucket sizes gives the number of pairs before any
+    bucket in logarithmic time, so ranges are counted without summing the buckets.
+    """
+
+    BUCKET_SIZE = 512
+
+    def __init__(self, pairs=()):
+        """
+        Builds the index from (key, ID) pairs.
+
+        Parameters:
+            pairs: An iterable of (key, ID) pairs in any order.
+        """
+        pairs = sorted(pairs)
+        size = self.BUCKET_SIZE
+        self.__buckets = [pairs[start:start + size] for start in range(0, len(pairs), size)]
+        self.__maxes = [bucket[-1] for bucket in self.__buckets]
+        self.__length = len(pairs)
+        self.__build_tree()
+
+    def __len__(self):
+        return self.__length
+
+    def __build_tree(self):
+        """
+        Rebuilds the Fenwick tree of bucket sizes, after buckets were split or dropped and their positions shifted.
+        """
+        tree = [0] + [len(bucket) for bucket in self.__buckets]
+        for node in range(1, len(tree)):
+            parent = node + (node & -node)
+            if parent < len(tree):
+                tree[parent] += tree[node]
+        self.__tree = tree
+
+    def __resize(self, index, delta):
+        """
+        Records that the bucket at the given position grew or shrank by delta pairs.
+        """
+        node = index + 1
+        while node < len(self.__tree):
+            self.__tree[node] += delta
+            node += node & -node
+
+    def __count_before(self, index):
+        """
+        Returns the number of pairs in the buckets before the given position.
+        """
+        count = 0
+        while index:
+            count += self.__tree[index]
+            index -= index & -index
+        return count
+
+    def add(self, key, id):
+        """
+        Adds a pair to the index.
+
+        Parameters:
+            key: The sort key.
+            id: The ID of the movie/show.
+        """
+        pair = (key, id)
+        self.__length += 1
+        if not self.__buckets:
+            self.__buckets.append([pair])
+            self.__maxes.append(pair)
+            self.__build_tree()
+            return
+
+        index = min(bisect_left(self.__maxes, pair), len(self.__buckets) - 1)
+        bucket = self.__buckets[index]
+        insort(bucket, pair)
+        self.__maxes[index] = bucket[-1]
+        if len(bucket) > 2 * self.BUCKET_SIZE:
+            half = len(bucket) // 2
+            self.__buckets[index:index + 1] = [bucket[:half], bucket[half:]]
+            self.__maxes[index:index + 1] = [bucket[half - 1], bucket[-1]]
+            # At most once every BUCKET_SIZE additions, so the rebuild adds little to each.
+            self.__build_tree()
+        else:
+            self.__resize(index, 1)
+
+    def remove(self, key, id):
+        """
+        Removes a pair from the index if it is present.
+
+        Parameters:
+            key: The sort key the pair was added with.
+            id: The ID of the movie/show.
+        """
+        pair = (key, id)
+        index = bisect_left(self.__maxes, pair)
+        if index == len(self.__buckets):
+            return
+        bucket = self.__buckets[index]
+        position = bisect_left(bucket, pair)
+        if position == len(bucket) or bucket[position] != pair:
+            return
+
+        del bucket[position]
+        self.__length -= 1
+        if bucket:
+            self.__maxes[index] = bucket[-1]
+            self.__resize(index, -1)
+        else:
+            del self.__buckets[index]
+            del self.__maxes[index]
+            self.__build_tree()
+
+    def __iter__(self):
+        for bucket in self.__buckets:
+            yield from bucket
+
+    def range(self, low=None, high=None):
+        """
+        Yields the pairs whose key lies within a range, in order. Finding the first pair is a binary search, so the
+        cost follows the number of pairs yielded.
+
+        Parameters:
+            low: The smallest key included, or None to start from the smallest key.
+            high: The largest key included, or None to go up to the largest key.
+
+        Yields:
+            tuple: The (key, ID) pairs within the range.
+        """
+        index = 0 if low is None else bisect_left(self.__maxes, (low,))
+        for bucket in islice(self.__buckets, index, None):
+            start = 0 if low is None else bisect_left(bucket, (low,))
+            for pair in islice(bucket, start, None):
+                if high is not None and pair[0] > high:
+                    return
+                yield pair
+            low = None
+
+    def count_range(self, low=None, high=None):
+        """
+        Counts the pairs whose key lies within a range without visiting them: a binary search and a Fenwick tree
+        lookup for each bound.
+
+        Parameters:
+            low: The smallest key included, or None for no lower bound.
+            high: The largest key included, or None for no upper bound.
+
+        Returns:
+            int: The number of pairs within the range.
+        """
+        return max(self.__rank(high, True) - self.__rank(low, False), 0)
+
+    def __rank(self, key, inclusive):
+        """
+        Returns how many pairs have a key below the given key (up to and including it if inclusive). None stands
+        for no bound.
+        """
+        if key is None:
+            return self.__length if inclusive else 0
+        search = bisect_right if inclusive else bisect_left
+        first = itemgetter(0)
+        index = search(self.__maxes, key, key=first)
+        rank = self.__count_before(index)
+        if index < len(self.__buckets):
+            rank += search(self.__buckets[index], key, key=first)
+        return rank
+
+    def __reversed__(self):
+        for bucket in reversed(self.__buckets):
+            yield from reversed(bucket)
+
+
+class Catalog_Analytics:
+    """
+    Column store of the numeric fields of a catalog for grouped reports: count, total and mean views, mean and
+    view-weighted rating and duration percentiles per genre, director, release year or type.
+
+    Every record is a row in parallel columns, with directors, years and types stored as integer codes. Genres are
+    split like those of the genre index ("Action, Comedy" is in both Action and Comedy) and kept in a separate table
+    of (row, genre code) pairs, so a title counts once in each of its genres. With NumPy installed the columns are
+    NumPy arrays and the group-by is vectorized (bincount and lexsort); without it the same reports are computed by a
+    loop over the columns. Changes are queued and applied to the columns in one go before the next report, so keeping
+    the columns current costs next to nothing per change.
+    """
+
+    GROUP_KEYS = ("genre", "director", "year", "type")
+    # Column name mapped to its array type code; NumPy arrays get the matching dtype.
+    COLUMNS = {"director": "i", "year": "i", "type": "i", "views": "q", "rating": "d", "duration": "d", "live": "b"}
+    # One item per genre of a row: the row number and the genre code.
+    GENRE_COLUMNS = {"row": "q", "code": "i"}
+
+    def __init__(self, movies=()):
+        """
+        Builds the columns from movies/shows.
+
+        Parameters:
+            movies: An iterable of movies/shows.
+        """
+        self.__labels = {key: [] for key in self.GROUP_KEYS}
+        self.__codes = {key: {} for key in self.GROUP_KEYS}
+        self.__years = {}
+        self.__genre_tokens = Field_Index(split=True)
+        self.__genre_codes = {}
+        movies = list(movies)
+        self.__rows = {movie.get_id(): row for row, movie in enumerate(movies)}
+        self.__size = len(movies)
+        self.__dead = 0
+        self.__pending = []
+        rows, genres = self.__new_rows(movies, 0)
+        self.__columns = self.__to_columns(rows)
+        self.__genres = self.__to_columns(genres)
+
+    def add(self, movie):
+        """
+        Queues a movie/show added to the catalog.
+
+        Parameters:
+            movie: The movie/show.
+        """
+        self.__pending.append(("add", movie))
+
+    def update_rating(self, movie):
+        """
+        Queues the new rating of a movie/show.
+
+        Parameters:
+            movie: The movie/show whose rating changed.
+        """
+        self.__pending.append(("update", movie.get_id(), movie.get_average_rating()))
+
+    def remove(self, id):
+        """
+        Queues the removal of a movie/show.
+
+        Parameters:
+            id: The ID of the movie/show.
+        """
+        self.__pending.append(("delete", id))
+
+    def __code(self, key, value, label=None):
+        """
+        Returns the integer code of a group value, assigning the next code to a new value. The label shown for the
+        group is the value itself unless given.
+        """
+        codes = self.__codes[key]
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(codes)
+            self.__labels[key].append(value if label is None else label)
+        return code
+
+    def __genres_of(self, genre):
+        """
+        Returns the codes of the genres listed in a genre field, each once. Genres are matched by their tokens, so
+        they are labelled as first spelled.
+        """
+        codes = self.__genre_codes.get(genre)
+        if codes is None:
+            codes = []
+            for part in genre.split(","):
+                for token in self.__genre_tokens.tokens(part):
+                    code = self.__code("genre", token, part.strip())
+                    if code not in codes:
+                        codes.append(code)
+            self.__genre_codes[genre] = codes
+        return codes
+
+    def __new_rows(self, movies, first_row):
+        """
+        Collects the fields of new movies/shows in arrays, one item per movie/show, and their genres in arrays with
+        one item per genre.
+
+        Parameters:
+            movies: The new movies/shows.
+            first_row: The row number of the first of them.
+
+        Returns:
+            tuple: Column name mapped to an array, for the rows and for the genres.
+        """
+        rows = {name: array(type_code) for name, type_code in self.COLUMNS.items()}
+        genres = {name: array(type_code) for name, type_code in self.GENRE_COLUMNS.items()}
+        code = self.__code
+        years = self.__years
+        for row, movie in enumerate(movies, first_row):
+            ordinal = movie.get_release_ordinal()
+            year = years.get(ordinal)
+            if year is None:
+                year = years[ordinal] = date.fromordinal(ordinal).year if ordinal else 0
+            for genre in self.__genres_of(movie.get_genre()):
+                genres["row"].append(row)
+                genres["code"].append(genre)
+            rows["director"].append(code("director", movie.get_director()))
+            rows["year"].append(code("year", year))
+            rows["type"].append(code("type", movie.get_type()))
+            rows["views"].append(movie.get_number_of_views())
+            rows["rating"].append(movie.get_average_rating())
+            rows["duration"].append(movie.get_duration())
+            rows["live"].append(1)
+        return rows, genres
+
+    @staticmethod
+    def __to_columns(rows):
+        """
+        Converts arrays of items to the column type in use: NumPy arrays if NumPy is installed, arrays otherwise.
+        """
+        if numpy is None:
+            return rows
+        return {name: numpy.array(values, dtype=bool if name == "live" else values.typecode)
+                for name, values in rows.items()}
+
+    def __apply_pending(self):
+        """
+        Applies the queued changes: new rows are appended in one go, rating updates and removals are written into
+        the existing rows. Once more than half of the rows are removed ones, the columns are compacted.
+        """
+        if not self.__pending:
+            return
+        pending, self.__pending = self.__pending, []
+        first_new = self.__size
+        added = []
+        ratings = {}
+        removed = []
+        for action, *change in pending:
+            if action == "update":
+                row = self.__rows.get(change[0])
+                # New rows read their rating from the movie/show when they are appended.
+                if row is not None and row < first_new:
+                    ratings[row] = change[1]
+                continue
+            id = change[0].get_id() if action == "add" else change[0]
+            row = self.__rows.pop(id, None)
+            if row is not None:
+                removed.append(row)
+                ratings.pop(row, None)
+            if action == "add":
+                self.__rows[id] = self.__size
+                self.__size += 1
+                added.append(change[0])
+
+        rows, genres = self.__new_rows(added, first_new)
+        for row in removed:
+            if row >= first_new:
+                rows["live"][row - first_new] = 0
+        old_ratings = list(ratings.items())
+        old_removed = [row for row in removed if row < first_new]
+        self.__dead += len(removed)
+
+        columns = self.__columns
+        if numpy is not None:
+            if old_ratings:
+                indexes, values = zip(*old_ratings)
+                columns["rating"][list(indexes)] = values
+            if old_removed:
+                columns["live"][old_removed] = False
+            if added:
+                for table, new in ((columns, rows), (self.__genres, genres)):
+                    new = self.__to_columns(new)
+                    for name in table:
+                        table[name] = numpy.concatenate((table[name], new[name]))
+        else:
+            for row, rating in old_ratings:
+                columns["rating"][row] = rating
+            for row in old_removed:
+                columns["live"][row] = 0
+            for table, new in ((columns, rows), (self.__genres, genres)):
+                for name in table:
+                    table[name].extend(new[name])
+
+        if self.__dead > self.__size // 2:
+            self.__compact()
+
+    def __compact(self):
+        """
+        Drops the rows of removed movies/shows and renumbers the others.
+        """
+        columns = self.__columns
+        genres = self.__genres
+        if numpy is not None:
+            live = columns["live"]
+            positions = numpy.cumsum(live) - 1
+            self.__rows = {id: int(positions[row]) for id, row in self.__rows.items()}
+            self.__columns = {name: values[live] for name, values in columns.items()}
+            kept = live[genres["row"]]
+            self.__genres = {"row": positions[genres["row"][kept]], "code": genres["code"][kept]}
+        else:
+            live = [row for row, alive in enumerate(columns["live"]) if alive]
+            positions = {row: position for position, row in enumerate(live)}
+            self.__rows = {id: positions[row] for id, row in self.__rows.items()}
+            self.__columns = {name: array(values.typecode, [values[row] for row in live])
+                              for name, values in columns.items()}
+            kept = [pair for pair in zip(genres["row"], genres["code"]) if pair[0] in positions]
+            self.__genres = {"row": array(genres["row"].typecode, [positions[row] for row, _ in kept]),
+                             "code": array(genres["code"].typecode, [code for _, code in kept])}
+        self.__size = len(self.__rows)
+        self.__dead = 0
+
+    def group_by(self, key, types=None, percentiles=(50, 90)):
+        """
+        Computes the aggregates of each group of movies/shows.
+
+        Parameters:
+            key: "genre", "director", "year" (of the release date) or "type". A movie/show that lists several
+                genres counts in each of them.
+            types: 'Movie' or 'Show' to include one type only, or None for both.
+            percentiles: The duration percentiles to compute, between 0 and 100 (linear interpolation, as in
+                numpy.percentile).
+
+        Returns:
+            dict: Group label mapped to a dict with "count", "views" (total), "mean_views", "mean_rating",
+            "weighted_rating" (weighted by views; None if the group has no views) and "duration_pN" for each
+            percentile N. Labels are in sorted order; groups without records are left out.
+
+        Raises:
+            ValueError: If the key, the type or a percentile is invalid.
+        """
+        if key not in self.GROUP_KEYS:
+            raise ValueError(f"Group must be one of: {', '.join(self.GROUP_KEYS)}.")
+        if types not in (None, "Movie", "Show"):
+            raise ValueError("Type must be either 'Movie' or 'Show'.")
+        if any(not 0 <= percentile <= 100 for percentile in percentiles):
+            raise ValueError("Percentiles must be between 0 and 100.")
+
+        self.__apply_pending()
+        type_code = self.__codes["type"].get(types) if types else None
+        if types and type_code is None:
+            return {}
+        if numpy is not None:
+            groups = self.__group_numpy(key, type_code, percentiles)
+        else:
+            groups = self.__group_python(key, type_code, percentiles)
+
+        labels = self.__labels[key]
+        report = {}
+        for code in sorted(groups, key=lambda code: labels[code]):
+            count, views, rating_sum, weighted_sum, durations = groups[code]
+            stats = {
+                "count": count,
+                "views": views,
+                "mean_views": views / count,
+                "mean_rating": rating_sum / count,
+                "weighted_rating": weighted_sum / views if views else None,
+            }
+            for percentile, value in zip(percentiles, durations):
+                stats[f"duration_p{percentile:g}"] = value
+            report[labels[code]] = stats
+        return report
+
+    def __group_numpy(self, key, type_code, percentiles):
+        """
+        Computes the raw sums of each group with NumPy.
+
+        Returns:
+            dict: Group code mapped to (count, views, rating sum, view-weighted rating sum, duration percentiles).
+        """
+        columns = self.__columns
+        if key == "genre":
+            rows = self.__genres["row"]
+            kept = columns["live"][rows]
+            if type_code is not None:
+                kept &= columns["type"][rows] == type_code
+            # Row numbers rather than a mask, so a row with several genres is picked once for each.
+            selected = rows[kept]
+            codes = self.__genres["code"][kept]
+        else:
+            selected = columns["live"]
+            if type_code is not None:
+                selected = selected & (columns["type"] == type_code)
+            codes = columns[key][selected]
+        views = columns["views"][selected].astype(numpy.float64)
+        ratings = columns["rating"][selected]
+        size = len(self.__labels[key])
+        counts = numpy.bincount(codes, minlength=size)
+        view_sums = numpy.bincount(codes, weights=views, minlength=size)
+        rating_sums = numpy.bincount(codes, weights=ratings, minlength=size)
+        weighted_sums = numpy.bincount(codes, weights=views * ratings, minlength=size)
+
+        # Sorting by group and then duration puts every group's durations next to each other, in order.
+        durations = columns["duration"][selected]
+        durations = durations[numpy.lexsort((durations, codes))]
+        present = numpy.flatnonzero(counts)
+        starts = (numpy.cumsum(counts) - counts)[present]
+        lasts = counts[present] - 1
+        values = []
+        for percentile in percentiles:
+            position = lasts * (percentile / 100)
+            lower = numpy.floor(position).astype(numpy.int64)
+            upper = numpy.minimum(lower + 1, lasts)
+            low_values = durations[starts + lower]
+            values.append(low_values + (durations[starts + upper] - low_values) * (position - lower))
+
+        return {int(code): (int(counts[code]), int(view_sums[code]), float(rating_sums[code]),
+                            float(weighted_sums[code]), [float(column[index]) for column in values])
+                for index, code in enumerate(present)}
+
+    def __group_python(self, key, type_code, percentiles):
+        """
+        Computes the raw sums of each group with a loop over the columns.
+
+        Returns:
+            dict: Group code mapped to (count, views, rating sum, view-weighted rating sum, duration percentiles).
+        """
+        columns = self.__columns
+        if key == "genre":
+            column = [columns[name] for name in ("type", "views", "rating", "duration", "live")]
+            entries = ((code, *(values[row] for values in column))
+                       for row, code in zip(self.__genres["row"], self.__genres["code"]))
+        else:
+            entries = zip(columns[key], columns["type"], columns["views"], columns["rating"], columns["duration"],
+                          columns["live"])
+        sums = {}
+        durations = {}
+        for code, kind, views, rating, duration, live in entries:
+            if not live or (type_code is not None and kind != type_code):
+                continue
+            group = sums.get(code)
+            if group is None:
+                group = sums[code] = [0, 0, 0.0, 0.0]
+                durations[code] = []
+            group[0] += 1
+            group[1] += views
+            group[2] += rating
+            group[3] += views * rating
+            durations[code].append(duration)
+
+        groups = {}
+        for code, (count, views, rating_sum, weighted_sum) in sums.items():
+            values = sorted(durations[code])
+            group_percentiles = []
+            for percentile in percentiles:
+                position = (count - 1) * percentile / 100
+                lower = int(position)
+                upper = min(lower + 1, count - 1)
+                group_percentiles.append(values[lower] + (values[upper] - values[lower]) * (position - lower))
+            groups[code] = (count, views, rating_sum, weighted_sum, group_percentiles)
+        return groups
+
+
+class Movie_Metrics:
+    """
+    Collects statistics about Movie_Manager operations: how often each ran, a histogram of how long it took, how
+    many records it returned or processed and how many bytes it wrote to the storage. Snapshots are plain dicts;
+    they can also be exported in the Prometheus text format to a file or over HTTP.
+    """
+
+    # Upper bounds of the latency histogram buckets, in seconds.
+    BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        """
+        Initializes empty statistics.
+        """
+        self.__operations = {}
+        self.__lock = threading.Lock()
+
+    def observe(self, operation, seconds, records=0, bytes_written=0):
+        """
+        Records one run of an operation.
+
+        Parameters:
+            operation: The name of the operation.
+            seconds: How long it took.
+            records: How many records it returned or processed.
+            bytes_written: How many bytes it wrote to the storage.
+        """
+        with self.__lock:
+            stats = self.__operations.get(operation)
+            if stats is None:
+                stats = self.__operations[operation] = {"count": 0, "seconds": 0.0, "records": 0,
+                                                        "bytes_written": 0, "buckets": [0] * (len(self.BUCKETS) + 1)}
+            stats["count"] += 1
+            stats["seconds"] += seconds
+            stats["records"] += records
+            stats["bytes_written"] += bytes_written
+            stats["buckets"][bisect_left(self.BUCKETS, seconds)] += 1
+
+    def snapshot(self):
+        """
+        Returns a copy of the statistics collected so far.
+
+        Returns:
+            dict: Operation name mapped to its count, total seconds, records, bytes written and latency histogram.
+                The histogram maps each bucket bound (and "+Inf") to the number of runs that took at most that long.
+        """
+        with self.__lock:
+            snapshot = {}
+            for operation, stats in self.__operations.items():
+                cumulative = 0
+                histogram = {}
+                for bound, count in zip(self.BUCKETS + ("+Inf",), stats["buckets"]):
+                    cumulative += count
+                    histogram[bound] = cumulative
+                snapshot[operation] = {"count": stats["count"], "seconds": stats["seconds"],
+                                       "records": stats["records"], "bytes_written": stats["bytes_written"],
+                                       "histogram": histogram}
+            return snapshot
+
+    def to_prometheus(self):
+        """
+        Formats the statistics in the Prometheus text exposition format.
+
+        Returns:
+            str: The metrics, one sample per line.
+        """
+        snapshot = self.snapshot()
+        lines = ["# HELP movie_manager_operation_seconds Time spent in Movie_Manager operations.",
+                 "# TYPE movie_manager_operation_seconds histogram"]
+        for operation, stats in snapshot.items():
+            for bound, count in stats["histogram"].items():
+                lines.append(f'movie_manager_operation_seconds_bucket{{operation="{operation}",le="{bound}"}} {count}')
+            lines.append(f'movie_manager_operation_seconds_sum{{operation="{operation}"}} {stats["seconds"]}')
+            lines.append(f'movie_manager_operation_seconds_count{{operation="{operation}"}} {stats["count"]}')
+        for name, key, help_text in (("records", "records", "Records returned or processed by operations."),
+                                     ("bytes_written", "bytes_written", "Bytes written to the storage.")):
+            lines.append(f"# HELP movie_manager_{name}_total {help_text}")
+            lines.append(f"# TYPE movie_manager_{name}_total counter")
+            for operation, stats in snapshot.items():
+                lines.append(f'movie_manager_{name}_total{{operation="{operation}"}} {stats[key]}')
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, filename):
+        """
+        Writes the metrics in the Prometheus text format to a file, replacing it atomically so a collector (such as
+        the node exporter's textfile collector) never reads a half-written file.
+
+        Parameters:
+            filename: The file to write.
+        """
+        text = self.to_prometheus()
+        Catalog_Storage.replace_file(filename, lambda file: file.write(text))
+
+    def serve_prometheus(self, port, host="127.0.0.1"):
+        """
+        Serves the metrics in the Prometheus text format at /metrics from a background thread.
+
+        Parameters:
+            port: The port to listen on (0 picks a free one).
+            host: The address to listen on.
+
+        Returns:
+            ThreadingHTTPServer: The running server; call shutdown() on it to stop serving.
+        """
+        metrics = self
+
+        class Metrics_Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Metrics_Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+        return server
+
+
+class Movie_Manager:
+    """
+    Manages a collection of movies, including adding, removing, and updating movies. It also allows searching and saving the movie list to a file.
+    """
+
+    def __instrumented(operation, records=None, storage_writes=False):
+        """
+        Decorator that records each call of a method in the metrics when they are enabled. With metrics disabled the
+        only cost is one attribute check per call.
+
+        Parameters:
+            operation: The name the calls are recorded under.
+            records: A function (manager, arguments, result) returning how many records the call returned or
+                processed.
+            storage_writes: If True, the bytes the storage wrote during the call are recorded too.
+        """
+        def decorate(method):
+            @wraps(method)
+            def wrapper(self, *args, **kwargs):
+                metrics = self.__metrics
+                if metrics is None:
+                    return method(self, *args, **kwargs)
+
+                written = self.__storage.get_bytes_written() if storage_writes else 0
+                start = perf_counter()
+                result = method(self, *args, **kwargs)
+                seconds = perf_counter() - start
+                count = records(self, args, result) if records is not None else 0
+                if storage_writes:
+                    written = self.__storage.get_bytes_written() - written
+                metrics.observe(operation, seconds, count, written)
+                return result
+            return wrapper
+        return decorate
+
+    def __synchronized(method):
+        """
+        Decorator for methods that change the catalog: they run while holding the storage lock, after the changes of
+        other processes sharing the catalog have been merged, so that no session works on stale data or overwrites
+        the changes of another. Within the process they hold the write lock, so they run alone.
+        """
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.__changing():
+                return method(self, *args, **kwargs)
+        return wrapper
+
+    def __reading(method):
+        """
+        Decorator for methods that only read the catalog: any number of them run at once from different threads,
+        but never while a change is being made.
+        """
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            self.__lock.acquire_read()
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                self.__lock.release_read()
+        return wrapper
+
+    def __init__(self, filename=None, journal=False, compaction_threshold=1024 * 1024, background_compaction=True,
+                 storage=None, dispatcher=None, workers=None, metrics=False, lazy=False, change_feed=None):
+        """
+        Initializes the Movie Manager with a filename to load and save movies.
+
+        Parameters:
+            filename: The file from which movie data is loaded and saved.
+            journal: If True, each change is appended to a journal next to the file instead of rewriting the file.
+            compaction_threshold: Journal size in bytes at which the journal is folded back into the file.
+            background_compaction: If True, compaction triggered by the threshold runs on a background thread.
+            storage: A Catalog_Storage to use instead of the text file (the other arguments are then ignored).
+            dispatcher: The Observer_Dispatcher that delivers notifications; by default observers are called
+                right away. Pass an Async_Observer_Dispatcher to deliver them from a worker thread.
+            workers: The number of processes that parse a large text file on load, or None for one per CPU core.
+            metrics: If True, operations are timed and counted; see metrics().
+            lazy: If True, the text file is opened through its offset index and records are built on first access
+                (see Lazy_Text_Catalog), so opening takes the same time for any size of catalog.
+            change_feed: A file name or Change_Feed that every add, rating update and removal is recorded in with a
+                sequence number, for consumers that sync incrementally (see changes_since()); None records nothing.
+        """
+        self.__metrics = Movie_Metrics() if metrics else None
+        self.__feed = Change_Feed(change_feed) if isinstance(change_feed, str) else change_feed
+        # Readers share the catalog, changes take it alone; the write lock is always taken before the storage lock.
+        self.__lock = Read_Write_Lock()
+        # Serializes building the indexes on first use, which happens under the shared read lock.
+        self.__build_lock = threading.RLock()
+        if storage is None:
+            storage = Text_File_Storage(filename, journal, compaction_threshold, background_compaction, workers,
+                                        lazy)
+        self.__storage = storage
+        # Movies/shows keyed by ID. Dicts keep insertion order, so this doubles as the ordered catalog
+        # and as the ID index used for constant time lookups, updates and removals.
+        self.__movies = {}
+        # Built on first use, so opening a catalog does not pay for indexes a session never needs.
+        self.__title_index = None
+        self.__field_indexes = None
+        self.__partitions = None
+        self.__rankings = {}
+        self.__analytics = None
+        # Dispatch table: the observers subscribed to each action. Tuples are rebuilt on (un)subscribe, so a change
+        # only touches the observers interested in it and never copies the list.
+        self.__subscriptions = {action: () for action in Movie_Action}
+        self.__dispatcher = dispatcher if dispatcher is not None else Observer_Dispatcher()
+        # The notifications of the change in progress on each thread, sent once its locks are released.
+        self.__notifications = threading.local()
+        self.load_movies()
+
+    def add_observer(self, observer):
+        """
+        Adds an observer to the list of observers for notifications. The observer is notified about every action.
+
+        Parameters:
+            observer: The observer to be added.
+        """
+        self.subscribe(observer)
+
+    def subscribe(self, observer, actions=None):
+        """
+        Subscribes an observer to the given actions. It is only notified about changes of those kinds.
+
+        Parameters:
+            observer: The observer to be added.
+            actions: The Movie_Action values (or their numbers) to notify it about, or None for every action.
+
+        Raises:
+            ValueError: If an action is unknown.
+        """
+        for action in self.__actions(actions):
+            if observer not in self.__subscriptions[action]:
+                self.__subscriptions[action] += (observer,)
+
+    def unsubscribe(self, observer, actions=None):
+        """
+        Stops notifying an observer about the given actions.
+
+        Parameters:
+            observer: The observer to be removed.
+            actions: The Movie_Action values (or their numbers) to stop notifying it about, or None for every action.
+
+        Raises:
+            ValueError: If an action is unknown.
+        """
+        for action in self.__actions(actions):
+            self.__subscriptions[action] = tuple(subscriber for subscriber in self.__subscriptions[action]
+                                                 if subscriber is not observer)
+
+    @staticmethod
+    def __actions(actions):
+        """
+        Converts the actions given to subscribe/unsubscribe into Movie_Action values.
+
+        Parameters:
+            actions: An action, an iterable of actions, or None for every action.
+
+        Returns:
+            list: The Movie_Action values.
+
+        Raises:
+            ValueError: If an action is unknown.
+        """
+        if actions is None:
+            return list(Movie_Action)
+        if isinstance(actions, int):
+            actions = (actions,)
+        return [Movie_Action(action) for action in actions]
+
+    def metrics(self):
+        """
+        Returns a snapshot of the operation metrics: per operation, the number of calls, the total seconds, a
+        latency histogram, the records returned or processed and the bytes written to the storage. Observer
+        notifications are recorded as "observer_dispatch".
+
+        Returns:
+            dict: The metrics (see Movie_Metrics.snapshot), or an empty dict if metrics are not enabled.
+        """
+        return self.__metrics.snapshot() if self.__metrics is not None else {}
+
+    def write_metrics(self, filename):
+        """
+        Writes the metrics in the Prometheus text format to a file.
+
+        Parameters:
+            filename: The file to write.
+
+        Raises:
+            ValueError: If metrics are not enabled.
+        """
+        if self.__metrics is None:
+            raise ValueError("Metrics are not enabled.")
+        self.__metrics.write_prometheus(filename)
+
+    def serve_metrics(self, port, host="127.0.0.1"):
+        """
+        Serves the metrics in the Prometheus text format at http://host:port/metrics from a background thread.
+
+        Parameters:
+            port: The port to listen on (0 picks a free one).
+            host: The address to listen on.
+
+        Returns:
+            ThreadingHTTPServer: The running server; call shutdown() on it to stop serving.
+
+        Raises:
+            ValueError: If metrics are not enabled.
+        """
+        if self.__metrics is None:
+            raise ValueError("Metrics are not enabled.")
+        return self.__metrics.serve_prometheus(port, host)
+
+    def serve(self, port=8000, host="127.0.0.1", threads=8):
+        """
+        Serves lookups, searches, pagination and rating updates as JSON over HTTP from a background thread (see
+        Catalog_Request_Handler for the requests). Queries from different clients run in parallel; rating updates
+        run one at a time.
+
+        Parameters:
+            port: The port to listen on (0 picks a free one).
+            host: The address to listen on.
+            threads: The number of worker threads, which is also the number of connections served at once.
+
+        Returns:
+            Catalog_Server: The running server; call shutdown() and then server_close() on it to stop serving.
+        """
+        server = Catalog_Server(self, (host, port), threads)
+        threading.Thread(target=server.serve_forever, name="catalog-server", daemon=True).start()
+        return server
+
+    @__reading
+    def get_by_id(self, id):
+        """
+        Looks up a movie/show by its ID.
+
+        Parameters:
+            id: The ID of the movie/show to look up.
+
+        Returns:
+            BaseFilm: The matching movie/show, or None if no movie/show has that ID.
+        """
+        return self.__movies.get(id)
+
+    def get_load_errors(self):
+        """
+        Returns the malformed records found by the last load_movies call.
+
+        Returns:
+            list: (line number, message) pairs, one per malformed line or record.
+        """
+        return self.__storage.get_load_errors()
+
+    @contextmanager
+    def __changing(self):
+        """
+        Holds the write lock and the storage lock for a change, after merging the changes of other processes. The
+        observers are notified once both locks are released, so a slow observer holds up no writer in any process
+        and one that reads the catalog cannot deadlock with a writer waiting for room in the dispatcher's queue.
+        """
+        if getattr(self.__notifications, "pending", None) is not None:
+            # Nested in a change on this thread, which sends the notifications when it ends.
+            with self.__lock.write(), self.__storage.lock():
+                self.refresh()
+                yield
+            return
+
+        pending = self.__notifications.pending = []
+        try:
+            with self.__lock.write(), self.__storage.lock():
+                self.refresh()
+                yield
+        finally:
+            self.__notifications.pending = None
+            for notify, args in pending:
+                notify(*args)
+
+    def __notify_after_change(self, notify, *args):
+        """
+        Sends a notification once the change in progress on this thread has released its locks, or right away
+        outside a change.
+        """
+        pending = getattr(self.__notifications, "pending", None)
+        if pending is None:
+            notify(*args)
+        else:
+            pending.append((notify, args))
+
+    @__instrumented("observer_dispatch", lambda self, args, result: 1)
+    def notify_observer(self, movie, action):
+        """
+        Notifies the observers subscribed to the action about a change to a movie.
+
+        Parameters:
+            movie: The movie that was updated.
+            action: The Movie_Action (or its number) describing the change.
+
+        Raises:
+            ValueError: If the action is unknown.
+        """
+        action = Movie_Action(action)
+        observers = self.__subscriptions[action]
+        if observers:
+            self.__dispatcher.dispatch(observers, movie, action)
+
+    @__instrumented("observer_dispatch", lambda self, args, result: len(args[0]))
+    def notify_observer_batch(self, movies, action):
+        """
+        Notifies the observers subscribed to the action once about the same change applied to many movies.
+
+        Parameters:
+            movies: The movies that were changed.
+            action: The Movie_Action (or its number) describing the change.
+
+        Raises:
+            ValueError: If the action is unknown.
+        """
+        action = Movie_Action(action)
+        observers = self.__subscriptions[action]
+        if observers:
+            self.__dispatcher.dispatch(observers, movies, action, batch=True)
+
+    def flush(self, timeout=None):
+        """
+        Waits until every notification sent so far has reached the observers.
+
+        Parameters:
+            timeout: The maximum number of seconds to wait, or None to wait as long as needed.
+
+        Returns:
+            bool: True if everything was delivered.
+        """
+        return self.__dispatcher.flush(timeout)
+
+    @__instrumented("load_movies", lambda self, args, result: len(self.__movies), storage_writes=True)
+    def load_movies(self):
+        """
+        Loads movie data from the storage. For the text file, creates an empty one if the file doesn't exist.
+
+        The text file is streamed line by line, so memory use does not grow with the size of the file beyond the
+        records themselves. Malformed records are skipped and reported with their line numbers.
+        """
+        with self.__lock.write():
+            try:
+                self.__movies = self.__storage.load()
+
+            except Exception as e:
+                print(f"Error while loading movies: {e}")
+
+            self.__title_index = None
+            self.__field_indexes = None
+            self.__partitions = None
+            self.__rankings = {}
+            self.__analytics = None
+
+        for line_number, message in self.__storage.get_load_errors():
+            print(f"Error while loading movies (line {line_number}): {message}")
+
+    def refresh(self):
+        """
+        Brings the catalog up to date with the changes other processes made to its files. Nothing is read if the
+        files are unchanged. With the text file journal only the new journal entries are merged, keeping the
+        indexes; otherwise the catalog is loaded again. Observers are not notified about these changes.
+
+        Returns:
+            bool: True if the catalog changed.
+        """
+        with self.__lock.write(), self.__storage.lock():
+            changes = self.__storage.external_changes()
+            if changes is None:
+                self.load_movies()
+                return True
+            for data in changes:
+                self.__merge_change(data)
+            return bool(changes)
+
+    def __merge_change(self, data):
+        """
+        Applies a journal entry written by another process, keeping the indexes up to date.
+
+        Parameters:
+            data: The fields of the entry (see Change_Journal.replay).
+        """
+        action = data.get("Action")
+        movie = self.__movies.get(data.get("ID"))
+        if action == "add":
+            try:
+                new_movie = Catalog_Parser.build_movie(data)
+            except ValueError as e:
+                print(f"Error while merging changes: {e}")
+                return
+            if movie is not None:
+                self.__unindex_movie(movie)
+            self.__movies[new_movie.get_id()] = new_movie
+            self.__index_movie(new_movie)
+
+        elif movie is None:
+            return
+
+        elif action == "update":
+            try:
+                rating = Change_Journal.read_rating(data)
+            except ValueError as e:
+                print(f"Error while merging changes: Skipped update of '{data.get('ID')}': {e}")
+                return
+            old_rating = movie.get_average_rating()
+            movie.set_movie_rating(rating)
+            self.__reindex_rating(movie, old_rating)
+
+        elif action == "delete":
+            del self.__movies[movie.get_id()]
+            self.__unindex_movie(movie)
+
+    def __get_title_index(self):
+        """
+        Returns the title index, building it on first use.
+
+        Returns:
+            Title_Index: The trigram index over the titles in the catalog.
+        """
+        if self.__title_index is None:
+            with self.__build_lock:
+                if self.__title_index is None:
+                    self.__title_index = Title_Index(self.__movies.values())
+        return self.__title_index
+
+    def __get_field_indexes(self):
+        """
+        Returns the genre, director and producer indexes, building them on first use.
+
+        Returns:
+            dict: Field name mapped to its Field_Index.
+        """
+        if self.__field_indexes is None:
+            with self.__build_lock:
+                if self.__field_indexes is None:
+                    indexes = {"genre": Field_Index(split=True), "director": Field_Index(), "producer": Field_Index()}
+                    for movie in self.__movies.values():
+                        self.__add_to_field_indexes(indexes, movie)
+                    self.__field_indexes = indexes
+        return self.__field_indexes
+
+    @staticmethod
+    def __add_to_field_indexes(indexes, movie):
+        id = movie.get_id()
+        indexes["genre"].add(id, movie.get_genre())
+        indexes["director"].add(id, movie.get_director())
+        indexes["producer"].add(id, movie.get_producer())
+
+    def __get_partitions(self):
+        """
+        Returns the Movie and Show partitions, building them on first use.
+
+        Returns:
+            dict: Type mapped to its Type_Partition.
+        """
+        if self.__partitions is None:
+            with self.__build_lock:
+                if self.__partitions is None:
+                    partitions = {"Movie": Type_Partition(), "Show": Type_Partition()}
+                    for movie in self.__movies.values():
+                        partitions[movie.get_type()].add(movie.get_id())
+                    self.__partitions = partitions
+        return self.__partitions
+
+    # Sort key of each ranking and range filter, read from a movie/show. Release dates are ranked by their ordinal.
+    RANKING_KEYS = {"rating": BaseFilm.get_average_rating, "views": BaseFilm.get_number_of_views,
+                    "release_date": BaseFilm.get_release_ordinal, "duration": BaseFilm.get_duration}
+
+    def __get_rankings(self, by):
+        """
+        Returns the rankings, building the rankings of each type by the given key on first use. Only the keys that
+        have been queried are built and kept up to date.
+
+        Parameters:
+            by: A key of RANKING_KEYS.
+
+        Returns:
+            dict: (ranking, type) mapped to a Sorted_Index of (value, ID) pairs.
+        """
+        if (by, "Movie") not in self.__rankings:
+            with self.__build_lock:
+                if (by, "Movie") not in self.__rankings:
+                    key = self.RANKING_KEYS[by]
+                    pairs = {"Movie": [], "Show": []}
+                    for movie in self.__movies.values():
+                        pairs[movie.get_type()].append((key(movie), movie.get_id()))
+                    # Swapped in as a whole, so concurrent readers never see one type ranked and not the other.
+                    rankings = dict(self.__rankings)
+                    for types, type_pairs in pairs.items():
+                        rankings[by, types] = Sorted_Index(type_pairs)
+                    self.__rankings = rankings
+        return self.__rankings
+
+    def __undo_adds(self, movies):
+        """
+        Takes movies/shows that were added but could not be saved back out of the catalog and its indexes.
+
+        Parameters:
+            movies: The movies/shows that were added.
+        """
+        for movie in movies:
+            # A storage that writes through the mapping (SQLite) has already rolled the rows back.
+            self.__movies.pop(movie.get_id(), None)
+            self.__unindex_movie(movie)
+
+    def __undo_removals(self):
+        """
+        Puts movies/shows that were removed but could not be saved back. Re-adding them would move them to the end
+        of the catalog order, so the catalog is loaded again from the storage, which still holds them in place.
+        """
+        self.load_movies()
+
+    def __undo_ratings(self, movies, old_ratings):
+        """
+        Restores the ratings of movies/shows whose new ratings could not be saved.
+
+        Parameters:
+            movies: The movies/shows whose rating changed.
+            old_ratings: Their ratings before the change, in the same order.
+        """
+        for movie, old_rating in zip(movies, old_ratings):
+            new_rating = movie.get_average_rating()
+            movie.set_movie_rating(old_rating)
+            self.__reindex_rating(movie, new_rating)
+
+    def __index_movie(self, movie):
+        """
+        Adds a movie/show to the indexes that have been built.
+
+        Parameters:
+            movie: The movie/show that was added to the catalog.
+        """
+        if self.__title_index is not None:
+            self.__title_index.add(movie.get_id(), movie.get_movie_title())
+        if self.__field_indexes is not None:
+            self.__add_to_field_indexes(self.__field_indexes, movie)
+        if self.__partitions is not None:
+            self.__partitions[movie.get_type()].add(movie.get_id())
+        for (by, types), ranking in self.__rankings.items():
+            if types == movie.get_type():
+                ranking.add(self.RANKING_KEYS[by](movie), movie.get_id())
+        if self.__analytics is not None:
+            self.__analytics.add(movie)
+
+    def __unindex_movie(self, movie):
+        """
+        Removes a movie/show from the indexes that have been built.
+
+        Parameters:
+            movie: The movie/show that was removed from the catalog.
+        """
+        if self.__title_index is not None:
+            self.__title_index.remove(movie.get_id())
+        if self.__field_indexes is not None:
+            id = movie.get_id()
+            self.__field_indexes["genre"].remove(id, movie.get_genre())
+            self.__field_indexes["director"].remove(id, movie.get_director())
+            self.__field_indexes["producer"].remove(id, movie.get_producer())
+        if self.__partitions is not None:
+            self.__partitions[movie.get_type()].remove(movie.get_id())
+        for (by, types), ranking in self.__rankings.items():
+            if types == movie.get_type():
+                ranking.remove(self.RANKING_KEYS[by](movie), movie.get_id())
+        if self.__analytics is not None:
+            self.__analytics.remove(movie.get_id())
+
+    def __reindex_rating(self, movie, old_rating):
+        """
+        Moves a movie/show to its new place in the rating ranking and updates its rating in the analytics after its
+        rating changed.
+
+        Parameters:
+            movie: The movie/show whose rating changed.
+            old_rating: The rating it had before.
+        """
+        ranking = self.__rankings.get(("rating", movie.get_type()))
+        if ranking is not None:
+            ranking.remove(old_rating, movie.get_id())
+            ranking.add(movie.get_average_rating(), movie.get_id())
+        if self.__analytics is not None:
+            self.__analytics.update_rating(movie)
+
+    @__instrumented("search_by_title", lambda self, args, result: self.__title_scanned(result))
+    @__reading
+    def search_by_title(self, text):
+        """
+        Finds the movies/shows whose title contains the given text, ignoring case.
+
+        Parameters:
+            text: The text to search for.
+
+        Returns:
+            list: The matching movies/shows, in catalog order.
+        """
+        if self.__storage.QUERY_PUSHDOWN:
+            return self.__storage.search_by_title(text)
+        return [self.__movies[id] for id in self.__get_title_index().search(text)]
+
+    def __title_scanned(self, result):
+        """
+        Returns how many records the last title search checked: the trigram candidates in memory, or the matches
+        when the search ran in the storage.
+        """
+        if self.__storage.QUERY_PUSHDOWN or self.__title_index is None:
+            return len(result)
+        return self.__title_index.get_last_scanned()
+
+    @__instrumented("search_by_field", lambda self, args, result: len(result))
+    @__reading
+    def search_by_field(self, field, text):
+        """
+        Finds the movies/shows with a genre, director or producer containing the given text, ignoring case. Only the
+        distinct values of the field are scanned, not the catalog.
+
+        Parameters:
+            field: "genre", "director" or "producer".
+            text: The text to search for. For genres, each comma-separated part must be found in a genre of the
+                movie/show.
+
+        Returns:
+            list: The matching movies/shows.
+
+        Raises:
+            ValueError: If the field is unknown.
+        """
+        if field not in ("genre", "director", "producer"):
+            raise ValueError("Field must be 'genre', 'director' or 'producer'.")
+        if self.__storage.QUERY_PUSHDOWN:
+            return self.__storage.search_by_field(field, text)
+        return [self.__movies[id] for id in self.__get_field_indexes()[field].search(text)]
+
+    @__instrumented("find_movies", lambda self, args, result: len(result))
+    @__reading
+    def find_movies(self, genre=None, director=None, producer=None, match_all=True):
+        """
+        Finds movies/shows by exact genre, director and producer (ignoring case) using the inverted indexes. The cost
+        follows the size of the posting lists involved, not the size of the catalog.
+
+        Parameters:
+            genre: A genre, or comma-separated genres such as "Action, Comedy". Each genre is its own criterion.
+            director: The name of a director.
+            producer: The name of a producer.
+            match_all: If True, a movie/show must match every criterion (AND); otherwise any criterion (OR).
+
+        Returns:
+            list: The matching movies/shows. With match_all they are in catalog order; otherwise grouped by
+            criterion.
+        """
+        if self.__storage.QUERY_PUSHDOWN:
+            return self.__storage.find_movies(genre, director, producer, match_all)
+
+        indexes = self.__get_field_indexes()
+        postings = []
+        if genre is not None:
+            tokens = indexes["genre"].tokens(genre)
+            postings += [indexes["genre"].lookup(token) for token in tokens]
+        if director is not None:
+            postings.append(indexes["director"].lookup(director))
+        if producer is not None:
+            postings.append(indexes["producer"].lookup(producer))
+
+        if not postings:
+            return []
+
+        if match_all:
+            postings.sort(key=len)
+            smallest, others = postings[0], postings[1:]
+            ids = [id for id in smallest if all(id in posting for posting in others)]
+        else:
+            matches = {}
+            for posting in postings:
+                matches.update(posting)
+            ids = matches
+        return [self.__movies[id] for id in ids]
+
+    @__reading
+    def count(self, types=None):
+        """
+        Returns the number of movies/shows in the catalog.
+
+        Parameters:
+            types: 'Movie' or 'Show' to count one type only, or None to count both.
+
+        Returns:
+            int: The number of movies/shows.
+        """
+        if types is None:
+            return len(self.__movies)
+        if self.__storage.QUERY_PUSHDOWN:
+            return self.__storage.count(types)
+        return len(self.__get_partitions()[types])
+
+    @__instrumented("page", lambda self, args, result: len(result[0]))
+    @__reading
+    def page(self, types, cursor=None, size=10):
+        """
+        Returns one page of movies or shows, in catalog order. Only the page itself is built, so every page costs the
+        same however deep it is.
+
+        Parameters:
+            types: 'Movie' or 'Show'.
+            cursor: The cursor returned with the previous page, or None for the first page. Cursors stay valid while
+                the catalog changes, but not across reloads.
+            size: The maximum number of movies/shows on the page, at least 1.
+
+        Returns:
+            tuple: The movies/shows on the page and the cursor of the next page (None after the last page).
+
+        Raises:
+            ValueError: If the type is neither 'Movie' nor 'Show', or the size is less than 1.
+        """
+        if types not in self.TYPES:
+            raise ValueError("Type must be either 'Movie' or 'Show'.")
+        if size < 1:
+            # An empty page would hand back its own cursor, and a caller paging until the end would never stop.
+            raise ValueError("Page size must be at least 1.")
+        if self.__storage.QUERY_PUSHDOWN:
+            return self.__storage.page(types, cursor, size)
+
+        partitions = self.__get_partitions()
+        ids, next_cursor = partitions[types].page(cursor, size)
+        return [self.__movies[id] for id in ids], next_cursor
+
+    @__instrumented("top_movies", lambda self, args, result: len(result))
+    @__reading
+    def top_movies(self, by="rating", n=50, types=None, lowest=False):
+        """
+        Returns the highest (or lowest) ranked movies/shows by average rating, number of views, release date (newest
+        first) or duration. The rankings are kept sorted as the catalog changes, so only the returned records are
+        visited.
+
+        Parameters:
+            by: "rating", "views", "release_date" or "duration".
+            n: The number of movies/shows to return.
+            types: 'Movie' or 'Show' to rank one type only, or None to rank both together.
+            lowest: If True, returns the lowest ranked instead of the highest.
+
+        Returns:
+            list: Up to n movies/shows, best first (worst first with lowest). Ties follow the ranking direction:
+                descending ID best first, ascending ID worst first (IDs compare as text).
+
+        Raises:
+            ValueError: If the ranking or the type is unknown.
+        """
+        self.__check_ranking(by, types)
+        if self.__storage.QUERY_PUSHDOWN:
+            return self.__storage.top_movies(by, n, types, lowest)
+
+        rankings = self.__get_rankings(by)
+        selected = [rankings[by, types]] if types else [rankings[by, "Movie"], rankings[by, "Show"]]
+        if lowest:
+            pairs = merge(*selected)
+        else:
+            pairs = merge(*(reversed(ranking) for ranking in selected), reverse=True)
+        return [self.__movies[id] for _, id in islice(pairs, n)]
+
+    @__instrumented("movies_in_range", lambda self, args, result: len(result))
+    @__reading
+    def movies_in_range(self, by="rating", low=None, high=None, types=None):
+        """
+        Returns the movies/shows whose average rating, number of views, release date or duration lies within a
+        range, using the rankings, so only the matching records are visited.
+
+        Parameters:
+            by: "rating", "views", "release_date" or "duration".
+            low: The smallest value included, or None for no lower bound. Release dates are given as YYYY-MM-DD
+                strings or dates.
+            high: The largest value included, or None for no upper bound.
+            types: 'Movie' or 'Show' to include one type only, or None for both.
+
+        Returns:
+            list: The matching movies/shows, from the lowest value up. Ties are ordered by ID.
+
+        Raises:
+            ValueError: If the ranking or the type is unknown, or a release date is invalid.
+        """
+        self.__check_ranking(by, types)
+        low, high = self.__range_bounds(by, (low, high))
+        if self.__storage.QUERY_PUSHDOWN:
+            return self.__storage.movies_in_range(by, low, high, types)
+
+        rankings = self.__get_rankings(by)
+        selected = [rankings[by, types]] if types else [rankings[by, "Movie"], rankings[by, "Show"]]
+        pairs = merge(*(ranking.range(low, high) for ranking in selected))
+        return [self.__movies[id] for _, id in pairs]
+
+    @__instrumented("movies_in_ranges", lambda self, args, result: len(result))
+    @__reading
+    def movies_in_ranges(self, ranges, types=None):
+        """
+        Returns the movies/shows that lie within several ranges at once, for example released 2015-2020, under two
+        hours and rated 8 or more:
+
+            movies_in_ranges({"release_date": ("2015-01-01", "2020-12-31"), "duration": (None, 119),
+                              "rating": (8, None)})
+
+        The rankings count how many records each range matches with a binary search per bound. Only the range
+        matching the fewest records is walked, and the other ranges are checked on its records, so the cost follows
+        the log of the catalog size plus the size of the narrowest range.
+
+        Parameters:
+            ranges: A dict from "rating", "views", "release_date" or "duration" to a (low, high) pair. Both bounds
+                are included and None leaves a side open. Release dates are given as YYYY-MM-DD strings or dates.
+            types: 'Movie' or 'Show' to include one type only, or None for both.
+
+        Returns:
+            list: The matching movies/shows, ordered by the value of the first range and then by ID.
+
+        Raises:
+            ValueError: If no range is given, a key or the type is unknown, or a release date is invalid.
+        """
+        if not ranges:
+            raise ValueError("At least one range is needed.")
+        for by in ranges:
+            self.__check_ranking(by, types)
+        ranges = {by: self.__range_bounds(by, bounds) for by, bounds in ranges.items()}
+        if self.__storage.QUERY_PUSHDOWN:
+            return self.__storage.movies_in_ranges(ranges, types)
+
+        selected_types = (types,) if types else ("Movie", "Show")
+        counts = {}
+        for by, (low, high) in ranges.items():
+            rankings = self.__get_rankings(by)
+            counts[by] = sum(rankings[by, each].count_range(low, high) for each in selected_types)
+        narrowest = min(counts, key=counts.get)
+        low, high = ranges[narrowest]
+        checks = [(self.RANKING_KEYS[by], low_bound, high_bound)
+                  for by, (low_bound, high_bound) in ranges.items() if by != narrowest]
+
+        matches = []
+        for each in selected_types:
+            for _, id in self.__rankings[narrowest, each].range(low, high):
+                movie = self.__movies[id]
+                for key, low_bound, high_bound in checks:
+                    value = key(movie)
+                    if ((low_bound is not None and value < low_bound)
+                            or (high_bound is not None and value > high_bound)):
+                        break
+                else:
+                    matches.append(movie)
+
+        first = self.RANKING_KEYS[next(iter(ranges))]
+        matches.sort(key=lambda movie: (first(movie), movie.get_id()))
+        return matches
+
+    @__instrumented("group_report", lambda self, args, result: sum(stats["count"] for stats in result.values()))
+    @__reading
+    def group_report(self, by, types=None, percentiles=(50, 90)):
+        """
+        Returns aggregates of the catalog grouped by genre, director, release year or type: the number of
+        movies/shows, their total and mean views, mean and view-weighted rating and duration percentiles.
+
+        The numeric fields are kept in a column store (see Catalog_Analytics) built on first use and updated with
+        every change afterwards, so repeated reports do not walk the movie/show objects again.
+
+        Parameters:
+            by: "genre", "director", "year" or "type".
+            types: 'Movie' or 'Show' to include one type only, or None for both.
+            percentiles: The duration percentiles to compute, between 0 and 100.
+
+        Returns:
+            dict: Group label mapped to a dict of aggregates, in label order; see Catalog_Analytics.group_by.
+
+        Raises:
+            ValueError: If the group, the type or a percentile is invalid.
+        """
+        # The analytics apply their queued changes when reporting, so reports run one at a time.
+        with self.__build_lock:
+            if self.__analytics is None:
+                self.__analytics = Catalog_Analytics(self.__movies.values())
+            return self.__analytics.group_by(by, types, percentiles)
+
+    @__instrumented("changes_since", lambda self, args, result: len(result))
+    def changes_since(self, seq=0, limit=1000):
+        """
+        Returns the changes made after a sequence number, oldest first, so a consumer can catch up without reading
+        the whole catalog: it keeps the "seq" of the last change it applied and asks for the ones after it.
+
+        Parameters:
+            seq: The sequence number of the last change the consumer has seen, 0 for every change kept.
+            limit: The maximum number of changes returned, or None for all of them.
+
+        Returns:
+            list: The changes as dicts with "seq", "time", "action", "id" and "record"; see Change_Feed.
+
+        Raises:
+            ValueError: If the change feed is not enabled, or the changes after seq are no longer kept (the consumer
+                then reads the whole catalog again and continues from last_change_sequence()).
+        """
+        if self.__feed is None:
+            raise ValueError("The change feed is not enabled.")
+        return self.__feed.changes_since(seq, limit)
+
+    def last_change_sequence(self):
+        """
+        Returns the sequence number of the latest change, 0 if there is none yet.
+
+        Returns:
+            int: The sequence number.
+
+        Raises:
+            ValueError: If the change feed is not enabled.
+        """
+        if self.__feed is None:
+            raise ValueError("The change feed is not enabled.")
+        return self.__feed.last_sequence()
+
+    def follow_changes(self, seq=0, poll_interval=1.0):
+        """
+        Yields the changes made after a sequence number as they happen, including those of other processes.
+
+        Parameters:
+            seq: The sequence number of the last change the consumer has seen.
+            poll_interval: Seconds between checks for new changes.
+
+        Yields:
+            dict: Every change, oldest first.
+
+        Raises:
+            ValueError: If the change feed is not enabled, or the changes after seq are no longer kept.
+        """
+        if self.__feed is None:
+            raise ValueError("The change feed is not enabled.")
+        yield from self.__feed.follow(seq, poll_interval)
+
+    def __check_ranking(self, by, types):
+        """
+        Checks the ranking key and type of a ranking or range query.
+
+        Raises:
+            ValueError: If the ranking or the type is unknown.
+        """
+        if by not in self.RANKING_KEYS:
+            raise ValueError(f"Ranking must be one of: {', '.join(self.RANKING_KEYS)}.")
+        if types not in (None, "Movie", "Show"):
+            raise ValueError("Type must be either 'Movie' or 'Show'.")
+
+    @staticmethod
+    def __range_bounds(by, bounds):
+        """
+        Converts the bounds of a range to the values the rankings are sorted by: release dates become ordinals.
+
+        Parameters:
+            by: The ranking key.
+            bounds: A (low, high) pair; None leaves a side open.
+
+        Returns:
+            tuple: The converted (low, high) pair.
+
+        Raises:
+            ValueError: If the bounds are not a pair, or a release date is invalid.
+        """
+        try:
+            low, high = bounds
+        except (TypeError, ValueError):
+            raise ValueError(f"The range of '{by}' must be a (low, high) pair.")
+        if by == "release_date":
+            low = BaseFilm.release_ordinal(low) if low is not None else None
+            high = BaseFilm.release_ordinal(high) if high is not None else None
+        return low, high
+
+    def __title_exists(self, title):
+        """
+        Checks whether a movie/show already has the given title, ignoring case and surrounding whitespace.
+
+        Parameters:
+            title: The title to look for.
+
+        Returns:
+            bool: True if the title is taken.
+        """
+        if self.__storage.QUERY_PUSHDOWN:
+            return self.__storage.contains_title(title)
+        return self.__get_title_index().contains_title(title)
+
+    def __persist(self, action, movie, undo):
+        """
+        Hands a single change to the storage. In journal mode only the change itself is appended, otherwise the
+        whole file is rewritten.
+
+        Parameters:
+            action: The change to persist ("add", "update" or "delete").
+            movie: The movie/show that was changed.
+            undo: Takes the change back out of the catalog and its indexes if it could not be saved.
+
+        Raises:
+            Exception: Whatever the storage raised if the change could not be saved (see __persist_batch).
+        """
+        self.__persist_batch([(action, movie)], undo)
+
+    @__instrumented("persist", lambda self, args, result: len(args[0]), storage_writes=True)
+    def __persist_batch(self, changes, undo):
+        """
+        Hands a group of changes to the storage, to be persisted together. If the storage fails, undo is called
+        before the error is passed on, so the catalog in memory keeps matching what was saved and the caller can
+        skip announcing the changes.
+
+        Parameters:
+            changes: A list of (action, movie/show) pairs, already applied to the catalog and its indexes.
+            undo: Takes the changes back out of the catalog and its indexes.
+
+        Raises:
+            Exception: Whatever the storage raised (OSError for the text and binary files, sqlite3.Error for
+                SQLite); nothing was saved.
+        """
+        try:
+            self.__storage.persist_batch(changes, self.__movies)
+
+        except Exception:
+            undo()
+            raise
+
+        # Still under the write and storage locks, so the sequence numbers follow the order the changes were saved
+        # in, also across processes.
+        if self.__feed is not None:
+            try:
+                self.__feed.append(changes)
+
+            except Exception as e:
+                print(f"Error while recording changes: {e}")
+
+    # Values accepted by add_movie_from_input and the bulk API.
+    AGE_RESTRICTIONS = ("PG-13", "R", "18+", "21+")
+    TYPES = ("Movie", "Show")
+
+    @staticmethod
+    def validate_movie(movie):
+        """
+        Checks the fields of a movie/show against the rules add_movie_from_input enforces. Uniqueness of the ID and
+        the title is checked separately, since it depends on the catalog.
+
+        Parameters:
+            movie: The movie/show to check.
+
+        Returns:
+            list: A description of every problem found; empty if the movie/show is valid.
+        """
+        problems = []
+        # bool is a subclass of int, but True and False are not numbers a record can be saved and read back with.
+        duration = movie.get_duration()
+        if isinstance(duration, bool) or not isinstance(duration, int) or duration <= 0:
+            problems.append("Duration must be a positive number!")
+        try:
+            datetime.strptime(movie.get_release_date(), "%Y-%m-%d")
+        except (TypeError, ValueError):
+            problems.append("Invalid date format! Please use 'YYYY-MM-DD'.")
+        views = movie.get_number_of_views()
+        if isinstance(views, bool) or not isinstance(views, int) or views < 0:
+            problems.append("Number of views must not be negative.")
+        rating = movie.get_average_rating()
+        if isinstance(rating, bool) or not isinstance(rating, (int, float)) or not (0 <= rating <= 10):
+            problems.append("Average rating must be between 0 and 10!")
+        if movie.get_age_restrictions() not in Movie_Manager.AGE_RESTRICTIONS:
+            problems.append("Invalid age restriction! Please choose from 'PG-13', 'R', '18+', or '21+'.")
+        if movie.get_type() not in Movie_Manager.TYPES:
+            problems.append("Invalid type! Please choose either 'Movie' or 'Show'.")
+        elif movie.get_type() == "Show":
+            episodes = movie.get_episodes()
+            if isinstance(episodes, bool) or not isinstance(episodes, int) or episodes < 1:
+                problems.append("Episodes must be at least 1!")
+        return problems
+
+    @staticmethod
+    def __raise_problems(problems):
+        """
+        Raises a ValueError listing the problems found while validating a batch, if any.
+
+        Parameters:
+            problems: A list of problem descriptions.
+
+        Raises:
+            ValueError: If the list is not empty. Nothing in the batch has been applied.
+        """
+        if problems:
+            shown = "\n".join(problems[:20])
+            more = f"\n... and {len(problems) - 20} more." if len(problems) > 20 else ""
+            raise ValueError(f"Batch rejected, {len(problems)} problem(s):\n{shown}{more}")
+
+    @__instrumented("bulk_add", lambda self, args, result: result)
+    @__synchronized
+    def bulk_add(self, movies):
+        """
+        Adds many movies/shows at once. Every record is validated first; if any is invalid nothing is added.
+        Otherwise all of them are added, persisted in one go and announced to the observers as one batch.
+
+        Parameters:
+            movies: An iterable of movies/shows.
+
+        Returns:
+            int: The number of movies/shows added.
+
+        Raises:
+            ValueError: If a record is invalid, or its ID or title is already taken.
+            OSError: If the batch could not be saved (sqlite3.Error with SQLite); nothing is added then.
+        """
+        movies = list(movies)
+        self.__raise_problems([f"'{movie.get_id()}': {problem}"
+                               for movie, problems in self.__check_new_movies(movies) for problem in problems])
+        return self.__add_batch(movies)
+
+    def __check_new_movies(self, movies, validated=False):
+        """
+        Validates movies/shows about to be added, including the uniqueness of their IDs and titles against the
+        catalog and against each other.
+
+        Parameters:
+            movies: A list of movies/shows.
+            validated: If True, the fields were already checked with validate_movie and only uniqueness is checked.
+
+        Returns:
+            list: (movie/show, problems) pairs, one per movie/show; the problems list is empty if it can be added.
+        """
+        checked = []
+        ids = set()
+        titles = set()
+        for movie in movies:
+            id = movie.get_id()
+            title = Title_Index.normalize(movie.get_movie_title())
+            problems = [] if validated else self.validate_movie(movie)
+            if id in ids or id in self.__movies:
+                problems.append("ID already exists!")
+            if title in titles or self.__title_exists(title):
+                problems.append("Title already exists!")
+            if not problems:
+                ids.add(id)
+                titles.add(title)
+            checked.append((movie, problems))
+        return checked
+
+    def __add_batch(self, movies):
+        """
+        Adds validated movies/shows, persists them in one go and announces them to the observers as one batch.
+
+        Parameters:
+            movies: A list of movies/shows that passed __check_new_movies.
+
+        Returns:
+            int: The number of movies/shows added.
+
+        Raises:
+            Exception: Whatever the storage raised if the batch could not be saved; nothing was added then.
+        """
+        if not movies:
+            return 0
+        for movie in movies:
+            self.__movies[movie.get_id()] = movie
+            self.__index_movie(movie)
+        self.__persist_batch([("add", movie) for movie in movies], lambda: self.__undo_adds(movies))
+        self.__notify_after_change(self.notify_observer_batch, movies, Movie_Action.ADDED)
+        return len(movies)
+
+    @__instrumented("import_records", lambda self, args, result: sum(result))
+    def import_records(self, records, chunk_size=10000, on_error=None, workers=1):
+        """
+        Adds movies/shows from a stream of records, such as Catalog_Exchange.read_records produces. Records are
+        handled in chunks: each chunk is validated with the same rules as bulk_add, its valid records are added and
+        persisted in one go, and the invalid ones are skipped. Only a few chunks are held in memory at a time.
+
+        Parameters:
+            records: An iterable of (line number, dict of fields) pairs; the fields use the data file names.
+            chunk_size: The number of records validated and persisted together.
+            on_error: Called with (line number, message) for every skipped record; by default they are printed.
+            workers: The number of processes that build and validate chunks, or None for one per CPU core. The
+                chunks are still added in input order, and IDs and titles are checked against everything added
+                before them.
+
+        Returns:
+            tuple: The number of movies/shows added and the number of records skipped.
+
+        Raises:
+            ValueError: If the chunk size is less than 1.
+            OSError: If a chunk could not be saved (sqlite3.Error with SQLite). The chunks before it stay added,
+                the failed chunk and the rest of the records are not.
+        """
+        if chunk_size < 1:
+            raise ValueError("Chunk size must be at least 1.")
+        if on_error is None:
+            on_error = lambda line_number, message: print(f"Line {line_number}: {message}")
+
+        added = 0
+        skipped = 0
+        records = iter(records)
+        chunks = iter(lambda: list(islice(records, chunk_size)), [])
+        for checked in self.__check_chunks(chunks, workers):
+            movies = []
+            line_numbers = []
+            for line_number, movie, problems in checked:
+                if movie is None:
+                    on_error(line_number, problems[0])
+                    skipped += 1
+                elif problems:
+                    on_error(line_number, f"'{movie.get_id()}': {' '.join(problems)}")
+                    skipped += 1
+                else:
+                    movies.append(movie)
+                    line_numbers.append(line_number)
+
+            # Each chunk is checked against, and added to, the latest catalog under the storage lock.
+            with self.__changing():
+                valid = []
+                for line_number, (movie, problems) in zip(line_numbers,
+                                                          self.__check_new_movies(movies, validated=True)):
+                    if problems:
+                        on_error(line_number, f"'{movie.get_id()}': {' '.join(problems)}")
+                        skipped += 1
+                    else:
+                        valid.append(movie)
+                added += self.__add_batch(valid)
+        return added, skipped
+
+    @staticmethod
+    def __check_chunks(chunks, workers):
+        """
+        Runs Catalog_Parser.check_records over chunks of import records, in worker processes if more than one
+        worker is asked for. At most two chunks per worker are in flight, so memory stays bounded.
+
+        Parameters:
+            chunks: An iterable of lists of (line number, dict of fields) pairs.
+            workers: The number of worker processes, or None for one per CPU core.
+
+        Yields:
+            list: The checked records of each chunk, in input order.
+        """
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers < 2:
+            for chunk in chunks:
+                yield Catalog_Parser.check_records(chunk)
+            return
+
+        with ProcessPoolExecutor(workers) as executor:
+            pending = deque()
+            for chunk in chunks:
+                pending.append(executor.submit(Catalog_Parser.check_records, chunk, True))
+                if len(pending) >= workers * 2:
+                    yield Movie_Manager.__from_rows(pending.popleft().result())
+            while pending:
+                yield Movie_Manager.__from_rows(pending.popleft().result())
+
+    @staticmethod
+    def __from_rows(checked):
+        """
+        Turns the rows in checked import records back into movies/shows.
+
+        Parameters:
+            checked: (line number, row, problems) triples from Catalog_Parser.check_records.
+
+        Returns:
+            list: (line number, movie/show, problems) triples.
+        """
+        return [(line_number, None if row is None else Catalog_Parser.from_row(row), problems)
+                for line_number, row, problems in checked]
+
+    def export_records(self, file, file_format, types=None, chunk_size=10000):
+        """
+        Writes the catalog to an open file as CSV or JSON Lines, one page at a time.
+
+        Parameters:
+            file: An open text file.
+            file_format: "csv" or "jsonl".
+            types: 'Movie' or 'Show' to export one type only, or None to export both (movies first).
+            chunk_size: The number of movies/shows written per page.
+
+        Returns:
+            int: The number of movies/shows written.
+        """
+        written = 0
+        header = True
+        for selected in self.TYPES if types is None else (types,):
+            cursor = None
+            while True:
+                movies, cursor = self.page(selected, cursor, chunk_size)
+                Catalog_Exchange.write_records(file, movies, file_format, header=header)
+                header = False
+                written += len(movies)
+                if cursor is None:
+                    break
+        return written
+
+    @__instrumented("bulk_update_ratings", lambda self, args, result: result)
+    @__synchronized
+    def bulk_update_ratings(self, ratings):
+        """
+        Updates the ratings of many movies/shows at once. Every update is validated first; if any is invalid
+        nothing is changed. Otherwise all ratings are updated, persisted in one go and announced as one batch.
+
+        Parameters:
+            ratings: A dict from ID to new rating, or an iterable of (ID, rating) pairs.
+
+        Returns:
+            int: The number of movies/shows updated.
+
+        Raises:
+            ValueError: If an ID is unknown or a rating is not between 0 and 10.
+            OSError: If the batch could not be saved (sqlite3.Error with SQLite); no rating is changed then.
+        """
+        ratings = dict(ratings)
+        problems = []
+        for id, rating in ratings.items():
+            if id not in self.__movies:
+                problems.append(f"'{id}': No movie/show found with this ID.")
+            if isinstance(rating, bool) or not isinstance(rating, (int, float)) or not (0 <= rating <= 10):
+                problems.append(f"'{id}': Average rating must be between 0 and 10.")
+        self.__raise_problems(problems)
+
+        movies = []
+        old_ratings = []
+        for id, rating in ratings.items():
+            movie = self.__movies[id]
+            old_rating = movie.get_average_rating()
+            movie.set_movie_rating(rating)
+            self.__reindex_rating(movie, old_rating)
+            movies.append(movie)
+            old_ratings.append(old_rating)
+        self.__persist_batch([("update", movie) for movie in movies],
+                             lambda: self.__undo_ratings(movies, old_ratings))
+        self.__notify_after_change(self.notify_observer_batch, movies, Movie_Action.RATING_UPDATED)
+        return len(movies)
+
+    @__instrumented("bulk_remove", lambda self, args, result: result)
+    @__synchronized
+    def bulk_remove(self, ids):
+        """
+        Removes many movies/shows at once. Every ID is checked first; if any is unknown nothing is removed.
+        Otherwise all of them are removed, persisted in one go and announced as one batch.
+
+        Parameters:
+            ids: An iterable of IDs.
+
+        Returns:
+            int: The number of movies/shows removed.
+
+        Raises:
+            ValueError: If an ID is unknown.
+            OSError: If the batch could not be saved (sqlite3.Error with SQLite); nothing is removed then.
+        """
+        ids = list(dict.fromkeys(ids))
+        self.__raise_problems([f"'{id}': Movie/Show with this ID not found." for id in ids if id not in self.__movies])
+
+        movies = []
+        for id in ids:
+            movie = self.__movies.pop(id)
+            self.__unindex_movie(movie)
+            movies.append(movie)
+        self.__persist_batch([("delete", movie) for movie in movies], self.__undo_removals)
+        self.__notify_after_change(self.notify_observer_batch, movies, Movie_Action.DELETED)
+        return len(movies)
+
+    def close(self):
+        """
+        Delivers pending notifications, waits for pending background work of the storage and releases it.
+        """
+        self.__dispatcher.close()
+        self.__storage.close()
+
+    @__instrumented("save_movies", lambda self, args, result: len(self.__movies), storage_writes=True)
+    @__synchronized
+    def save_movies(self):
+        """
+        Saves the current list of movies to the file.
+        """
+        try:
+            self.__storage.save(self.__movies)
+
+        except Exception as e:
+            print(f"Error while saving movies: {e}")
+
+    def search_movies(self):
+        """
+        Allows the user to search for movies by title, genre, director or producer and displays the results.
+        """
+        while True:
+            search_criteria = input("\nSearch by (1) Title, (2) Genre, (3) Director or (4) Producer? "
+                                    "(Enter 1-4, or 'quit' to exit): ").lower()
+            if search_criteria == "1":
+                search_input = input("Enter the title to search for: ").strip().lower()
+                results = self.search_by_title(search_input)
+            elif search_criteria == "2":
+                search_input = input("Enter the genre to search for: ").strip().lower()
+                results = self.search_by_field("genre", search_input)
+            elif search_criteria == "3":
+                search_input = input("Enter the director to search for: ").strip().lower()
+                results = self.search_by_field("director", search_input)
+            elif search_criteria == "4":
+                search_input = input("Enter the producer to search for: ").strip().lower()
+                results = self.search_by_field("producer", search_input)
+            elif search_criteria == "quit":
+                print("Exiting search.")
+                break
+            else:
+                print("Invalid input! Please enter 1, 2, 3, 4 or 'quit'.")
+                continue
+
+            if results:
+                print("\n--- Search Results ---")
+                for movie in results:
+                    print(movie.text_file())
+            else:
+                print("No results found. Try again.")
+
+    def add_movie_from_input(self):
+        """
+        Prompts the user to input information about a new movie and adds it to the list.
+        """
+        while True:
+            id = input("Enter Movie ID: ")
+            if id in self.__movies:
+                print("ID already exists!")
+                continue
+            break
+
+        # INPUT TITLE
+        while True:
+            title = input("Enter Title: ").strip()
+            new_title = title.lower()
+
+            if self.__title_exists(new_title):
+                print("Title already exists!")
+                continue
+            break
+
+        # INPUT GENRE
+        genre = input("Enter Genre: ")
+
+        # INPUT DURATION
+        while True:
+            try:
+                duration = int(input("Enter Duration (in minutes): "))
+                if duration <= 0:
+                    print("Duration must be a positive number!")
+                    continue
+
+            except ValueError:
+                print("Invalid input for duration!")
+                continue
+            break
+
+        # INPUT PRODUCER
+        producer = input("Enter Producer: ")
+
+        # INPUT RELEASE DATE
+        while True:
+            release_date = input("Enter Release Date (YYYY-MM-DD): ").strip()
+            try:
+                datetime.strptime(release_date, "%Y-%m-%d")
+            except ValueError:
+                print("Invalid date format! Please use 'YYYY-MM-DD'.")
+                continue
+            break
+
+        # INPUT NUMBER OF VIEWS
+        while True:
+            try:
+                number_of_views = int(input("Enter Number of Views: "))
+                if number_of_views < 0:
+                    print("Number of views must not be negative.")
+                    continue
+            except ValueError:
+                print("Invalid input for number of views! Please enter a number.")
+                continue
+            break
+
+        # INPUT AVERAGE RATING
+        while True:
+            try:
+                average_rating = float(input("Enter Average Rating (0-10): "))
+                if not (0 <= average_rating <= 10):
+                    print("Average rating must be between 0 and 10!")
+                    continue
+            except ValueError:
+                print("Invalid input for average rating! Please enter a number.")
+                continue
+            break
+
+        # INPUT DIRECTOR
+        director = input("Enter Director: ")
+
+        # INPUT AGE RESTRICTIONS
+        while True:
+            age_restrictions = input("Enter Age Restriction (PG-13, R, 18+, 21+): ").strip()
+            if age_restrictions not in self.AGE_RESTRICTIONS:
+                print("Invalid age restriction! Please choose from 'PG-13', 'R', '18+', or '21+'.")
+                continue
+            break
+
+        # INPUT TYPE (MOVIE OR SHOW)
+        while True:
+            type_of_movie = input("Enter Type (Movie or Show): ").capitalize()
+            if type_of_movie not in self.TYPES:
+                print("Invalid type! Please choose either 'Movie' or 'Show'.")
+                continue
+            break
+
+        if type_of_movie == "Movie":
+            new_movie = Movies(
+                id=id,
+                title=title,
+                genre=genre,
+                producer=producer,
+                release_date=release_date,
+                number_of_views=number_of_views,
+                average_rating=average_rating,
+                director=director,
+                age_restrictions=age_restrictions,
+                duration=duration
+            )
+
+        else:
+            try:
+                episodes = int(input("Enter Number of Episodes: "))
+                if episodes < 1:
+                    print("Episodes must be at least 1!")
+                    return
+
+            except ValueError:
+                print("Invalid input for episodes!")
+                return
+
+            new_movie = Shows(
+                id=id,
+                title=title,
+                genre=genre,
+                producer=producer,
+                release_date=release_date,
+                number_of_views=number_of_views,
+                average_rating=average_rating,
+                director=director,
+                age_restrictions=age_restrictions,
+                duration=duration,
+                episodes=episodes
+            )
+
+        # Another session may have taken the ID or title while the details were typed in.
+        with self.__changing():
+            for movie, problems in self.__check_new_movies([new_movie], validated=True):
+                if problems:
+                    print(" ".join(problems))
                     return
-            print(f"Movie/Show with ID '{id}' not found.")
+            self.__movies[id] = new_movie
+            self.__index_movie(new_movie)
+            try:
+                self.__persist("add", new_movie, lambda: self.__undo_adds([new_movie]))
+            except Exception as e:
+                print(f"Error while saving movies: {e}")
+                return
+        self.notify_observer(new_movie, Movie_Action.ADDED)
+        print(f"Movie/Show '{title}' added successfully!")
+
+    @__instrumented("update_movie_rating", lambda self, args, result: 1)
+    @__synchronized
+    def update_movie_rating(self, id, new_rating):
+        """
+        Updates the rating of an existing movie/show.
+
+        Parameters:
+            id: The ID of the movie/show to update.
+            new_rating: The new rating for the movie/show (between 0 and 10).
+        """
+        try:
+            if not (0 <= new_rating <= 10):
+                raise ValueError("Average rating must be between 0 and 10.")
+
+            movie = self.__movies.get(id)
+            if movie is None:
+                print(f"No movie/show found with ID '{id}'.")
+                return
+
+            old_rating = movie.get_average_rating()
+            movie.set_movie_rating(new_rating)
+            self.__reindex_rating(movie, old_rating)
+            try:
+                self.__persist("update", movie, lambda: self.__undo_ratings([movie], [old_rating]))
+            except Exception as e:
+                print(f"Error while saving movies: {e}")
+                return
+            self.__notify_after_change(self.notify_observer, movie, Movie_Action.RATING_UPDATED)
+            print(f"Rating for Movie/Show '{movie.get_movie_title()}' updated to {new_rating}.")
+
+        except ValueError as e:
+            print(f"Error: {e}")
+
+    @__instrumented("remove_movie", lambda self, args, result: 1)
+    @__synchronized
+    def remove_movie(self, id):
+        """
+        Removes a movie/show from the list.
+
+        Parameters:
+            id: The ID of the movie/show to remove.
+        """
+        try:
+            movie = self.__movies.pop(id, None)
+            if movie is None:
+                print(f"Movie/Show with ID '{id}' not found.")
+                return
+
+            self.__unindex_movie(movie)
+            try:
+                self.__persist("delete", movie, self.__undo_removals)
+            except Exception as e:
+                print(f"Error while saving movies: {e}")
+                return
+            print(f"Movie/Show '{movie.get_movie_title()}' has been deleted.")
+            self.__notify_after_change(self.notify_observer, movie, Movie_Action.DELETED)
 
         except Exception as e:
             print(f"Error: {e}")
@@ -643,16 +6542,34 @@ class Movie_Manager:
         """
         Lists all movies with pagination.
         """
+        self.__list_pages("Movie", "Movies")
+
+    def list_shows(self):
+        """
+        Lists all shows with pagination.
+        """
+        self.__list_pages("Show", "Shows")
+
+    def __list_pages(self, types, heading):
+        """
+        Shows the movies or shows page by page, letting the user move between pages.
+
+        Parameters:
+            types: 'Movie' or 'Show'.
+            heading: The name of the list shown in the page header.
+        """
         page = 1
         items_per_page = 10
-        total_pages = (len(self.__movies) + items_per_page - 1) // items_per_page
+        total_pages = max(1, (self.count(types) + items_per_page - 1) // items_per_page)
+        # cursors[n] is the cursor of page n + 1, collected while paging forward so 'prev' can go back.
+        cursors = [None]
 
         while True:
-            print(f"\n--- List of Movies (Page {page}/{total_pages}) ---")
-            movies = [movie for movie in self.__movies if movie.get_type() == "Movie"]
-            start = (page - 1) * items_per_page
-            end = start + items_per_page
-            for movie in movies[start:end]:
+            print(f"\n--- List of {heading} (Page {page}/{total_pages}) ---")
+            movies, next_cursor = self.page(types, cursors[page - 1], items_per_page)
+            if len(cursors) == page:
+                cursors.append(next_cursor)
+            for movie in movies:
                 print(movie.text_file())
 
             if total_pages == 1:
@@ -668,76 +6585,486 @@ class Movie_Manager:
             else:
                 print("Invalid input. Please try again.")
 
-    def list_shows(self):
+
+class Catalog_Request_Handler(BaseHTTPRequestHandler):
+    """
+    Answers the JSON requests of a Catalog_Server:
+
+        GET  /movies/ID                               The movie/show with that ID.
+        GET  /movies?type=Movie&cursor=C&size=N       One page of movies or shows and the cursor of the next one.
+        GET  /search?title=TEXT&limit=N               Movies/shows whose title contains TEXT.
+        GET  /search?genre=G&director=D&producer=P    Movies/shows matching all (or with any=1, any) of the fields.
+        GET  /changes?since=SEQ&limit=N               The changes after sequence number SEQ and the latest number.
+        POST /movies/ID/rating  {"rating": 8.5}       Updates the rating.
+
+    Records use the field names of the data file. Errors are answered as {"error": message} with status 400 for an
+    invalid request and 404 for an unknown path or ID. Connections are kept alive between requests.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Seconds an idle kept-alive connection may hold a worker thread.
+    timeout = 30
+    # Headers and body are separate writes; without TCP_NODELAY the body waits for the client's delayed ACK.
+    disable_nagle_algorithm = True
+    MAX_PAGE_SIZE = 1000
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [unquote(part) for part in url.path.strip("/").split("/")]
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        self.__answer(lambda: self.__get(parts, query))
+
+    def do_POST(self):
+        parts = [unquote(part) for part in urlsplit(self.path).path.strip("/").split("/")]
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        self.__answer(lambda: self.__post(parts, body))
+
+    def __get(self, parts, query):
         """
-        Lists all shows with pagination.
+        Returns the status and the JSON document answering a GET request.
         """
-        page = 1
-        items_per_page = 10
-        total_pages = (len(self.__movies) + items_per_page - 1) // items_per_page
+        manager = self.server.manager
+        if len(parts) == 2 and parts[0] == "movies":
+            movie = manager.get_by_id(parts[1])
+            if movie is None:
+                return 404, {"error": f"No movie/show found with ID '{parts[1]}'."}
+            return 200, Catalog_Parser.to_record(movie)
 
-        while True:
-            print(f"\n--- List of Shows (Page {page}/{total_pages}) ---")
-            shows = [movie for movie in self.__movies if movie.get_type() == "Show"]
-            start = (page - 1) * items_per_page
-            end = start + items_per_page
-            for movie in shows[start:end]:
-                print(movie.text_file())
-
-            if total_pages == 1:
-                break
+        if parts == ["movies"]:
+            size = self.__number(query, "size", 50)
+            if not 1 <= size <= self.MAX_PAGE_SIZE:
+                raise ValueError(f"Page size must be between 1 and {self.MAX_PAGE_SIZE}.")
+            movies, next_cursor = manager.page(query.get("type", "Movie"), self.__number(query, "cursor", None), size)
+            return 200, {"records": [Catalog_Parser.to_record(movie) for movie in movies], "cursor": next_cursor}
 
-            choose = input("\nEnter 'next' for next page, 'prev' for previous page, or 'quit' to quit: ").lower()
-            if choose == "next" and page < total_pages:
-                page += 1
-            elif choose == "page" and page > 1:
-                page -= 1
-            elif choose == "quit":
-                break
+        if parts == ["search"]:
+            limit = self.__number(query, "limit", 50)
+            if limit < 0:
+                raise ValueError("'limit' must not be negative.")
+            if "title" in query:
+                movies = manager.search_by_title(query["title"])
+            elif query.keys() & {"genre", "director", "producer"}:
+                movies = manager.find_movies(query.get("genre"), query.get("director"), query.get("producer"),
+                                             query.get("any") not in ("1", "true"))
             else:
-                print("Invalid input. Please try again.")
-                
+                raise ValueError("Search needs title, genre, director or producer.")
+            return 200, {"records": [Catalog_Parser.to_record(movie) for movie in movies[:limit]],
+                         "total": len(movies)}
+
+        if parts == ["changes"]:
+            limit = self.__number(query, "limit", self.MAX_PAGE_SIZE)
+            if not 1 <= limit <= self.MAX_PAGE_SIZE:
+                raise ValueError(f"'limit' must be between 1 and {self.MAX_PAGE_SIZE}.")
+            changes = manager.changes_since(self.__number(query, "since", 0), limit)
+            # Clients continue from the last change they received; last_seq tells them whether more are waiting.
+            return 200, {"changes": changes, "last_seq": manager.last_change_sequence()}
+
+        return 404, {"error": "Not found."}
+
+    def __post(self, parts, body):
+        """
+        Returns the status and the JSON document answering a POST request.
+        """
+        manager = self.server.manager
+        if len(parts) != 3 or parts[0] != "movies" or parts[2] != "rating":
+            return 404, {"error": "Not found."}
+        try:
+            rating = json.loads(body)["rating"]
+        except (ValueError, KeyError, TypeError):
+            raise ValueError('The body must be a JSON object like {"rating": 8.5}.')
+        # JSON true and false arrive as bool, which Python counts as an int.
+        if isinstance(rating, bool) or not isinstance(rating, (int, float)):
+            raise ValueError("The rating must be a number.")
+        if manager.get_by_id(parts[1]) is None:
+            return 404, {"error": f"No movie/show found with ID '{parts[1]}'."}
+        manager.bulk_update_ratings({parts[1]: rating})
+        return 200, {"ID": parts[1], "Average Rating": rating}
+
+    @staticmethod
+    def __number(query, name, default):
+        """
+        Reads a whole number from the query string.
+
+        Raises:
+            ValueError: If the parameter is not a whole number.
+        """
+        if name not in query:
+            return default
+        try:
+            return int(query[name])
+        except ValueError:
+            raise ValueError(f"'{name}' must be a whole number.")
+
+    def __answer(self, handle):
+        """
+        Runs a request handler and sends its answer as JSON, turning errors into error answers.
+        """
+        try:
+            status, document = handle()
+        except ValueError as e:
+            status, document = 400, {"error": str(e)}
+        except Exception as e:
+            print(f"Error while serving {self.command} {self.path}: {e}")
+            status, document = 500, {"error": "Internal error."}
+        body = json.dumps(document).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Catalog_Server(HTTPServer):
+    """
+    Local JSON-over-HTTP service answering lookups, searches, pagination and rating updates on a Movie_Manager (see
+    Catalog_Request_Handler). Connections are handled by a fixed pool of worker threads. Queries run in parallel
+    under the manager's read lock, and rating updates are serialized by its write lock.
+
+    A kept-alive connection holds its worker until it is closed or stays idle for
+    Catalog_Request_Handler.timeout seconds, so the pool size is also the number of clients served at once.
+    """
+
+    def __init__(self, manager, address=("127.0.0.1", 8000), threads=8):
+        """
+        Binds the server. Call serve_forever() to start answering requests.
+
+        Parameters:
+            manager: The Movie_Manager to serve.
+            address: The (host, port) pair to listen on; port 0 picks a free one.
+            threads: The number of worker threads.
+        """
+        super().__init__(address, Catalog_Request_Handler)
+        self.manager = manager
+        self.__pool = ThreadPoolExecutor(threads, thread_name_prefix="catalog-server")
+        self.__connections = set()
+        self.__connections_lock = threading.Lock()
+
+    def get_url(self):
+        """
+        Returns the base URL the server answers on.
+
+        Returns:
+            str: For example "http://127.0.0.1:8000".
+        """
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def process_request(self, request, client_address):
+        with self.__connections_lock:
+            self.__connections.add(request)
+        self.__pool.submit(self.__process, request, client_address)
+
+    def __process(self, request, client_address):
+        """
+        Handles one connection on a worker thread.
+        """
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            with self.__connections_lock:
+                self.__connections.discard(request)
+            self.shutdown_request(request)
+
+    def server_close(self):
+        """
+        Stops listening, closes the open connections and waits for the requests in progress to finish.
+        """
+        super().server_close()
+        with self.__connections_lock:
+            connections = list(self.__connections)
+        for request in connections:
+            try:
+                request.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        self.__pool.shutdown(wait=True)
+
+
 #MAIN FUNCTION
-manager = Movie_Manager("movies_data.txt")
-observer = Observer_Notification()
-manager.add_observer(observer)
-
-while True:
-    print("\n--- Movie Manager ---")
-    print("1. Add Movie/Show from Input")
-    print("2. Update Movie/Show Rating")
-    print("3. List Movies")
-    print("4. List Shows")
-    print("5. Remove Movie/Show")
-    print("6. Search Movies/Shows")
-    print("7. Exit")
-    choice = input("Enter your choice: ")
-
-    if choice == "1":
-        manager.add_movie_from_input()
-
-    elif choice == "2":
-        id = input("Enter Movie/Show ID to update rating: ")
-        new_rating = float(input("Enter new rating (0-10): "))
-        manager.update_movie_rating(id, new_rating)
-
-    elif choice == "3":
-        manager.list_movies()
-
-    elif choice == "4":
-        manager.list_shows()
-
-    elif choice == "5":
-        id = input("Enter Movie/Show ID to remove: ")
-        manager.remove_movie(id)
-
-    elif choice == "6":
-        manager.search_movies()
-
-    elif choice == "7":
-        print("Exiting program. Goodbye!")
-        break
+def main():
+    # The menu records its changes in the change log once the batch commands have started it (--change-feed).
+    manager = Movie_Manager("movies_data.txt", change_feed=Change_Feed("movies_data.txt.changes", create=False))
+    observer = Observer_Notification()
+    manager.add_observer(observer)
+
+    while True:
+        print("\n--- Movie Manager ---")
+        print("1. Add Movie/Show from Input")
+        print("2. Update Movie/Show Rating")
+        print("3. List Movies")
+        print("4. List Shows")
+        print("5. Remove Movie/Show")
+        print("6. Search Movies/Shows")
+        print("7. Exit")
+        choice = input("Enter your choice: ")
+        # Pick up what other sessions changed while this one waited for input.
+        manager.refresh()
+
+        if choice == "1":
+            manager.add_movie_from_input()
+
+        elif choice == "2":
+            id = input("Enter Movie/Show ID to update rating: ")
+            new_rating = float(input("Enter new rating (0-10): "))
+            manager.update_movie_rating(id, new_rating)
+
+        elif choice == "3":
+            manager.list_movies()
+
+        elif choice == "4":
+            manager.list_shows()
+
+        elif choice == "5":
+            id = input("Enter Movie/Show ID to remove: ")
+            manager.remove_movie(id)
+
+        elif choice == "6":
+            manager.search_movies()
+
+        elif choice == "7":
+            print("Exiting program. Goodbye!")
+            manager.close()
+            break
+
+        else:
+            print("Invalid choice. Please try again.")
+
+
+def positive_int(text):
+    """
+    Converts a command line argument to a whole number of at least 1.
 
+    Parameters:
+        text: The argument.
+
+    Returns:
+        int: The number.
+
+    Raises:
+        argparse.ArgumentTypeError: If the argument is not a whole number of at least 1.
+    """
+    try:
+        number = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"'{text}' is not a whole number.")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {number}.")
+    return number
+
+
+def run_command(argv=None):
+    """
+    Runs the catalog without the interactive menu, for scripts and scheduled jobs.
+
+    Subcommands:
+        import FILE   Adds the records of a CSV or JSON Lines file; invalid records are reported and skipped.
+        export FILE   Writes the catalog to a CSV or JSON Lines file.
+        query         Prints the movies/shows matching a title, genre/director/producer or ranking.
+        stats         Prints the size of the catalog and a few aggregates as JSON, or with --by the aggregates of
+                      each genre, director, release year or type.
+        serve         Answers JSON queries and rating updates over HTTP until interrupted (see Catalog_Server).
+        changes       Prints the changes recorded after a sequence number as JSON lines, and with --follow keeps
+                      printing new ones (see Change_Feed).
+
+    Parameters:
+        argv: The command line arguments, without the program name; sys.argv is used if None.
+
+    Returns:
+        int: The exit status: 0 on success, 1 if records were skipped or the command failed.
+    """
+    parser = argparse.ArgumentParser(prog="Main file.py", description="Movie Manager batch commands.")
+    parser.add_argument("--data", default="movies_data.txt", help="The catalog file (default: movies_data.txt).")
+    parser.add_argument("--storage", choices=("text", "binary", "sqlite", "sharded"), default="text",
+                        help="The format of the catalog file (default: text). With sharded, --data names the shard "
+                             "files (movies_data.000.txt, ...).")
+    parser.add_argument("--shards", type=int, default=None,
+                        help="The number of shard files of a new sharded catalog (default: 8).")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Processes that parse and validate large inputs (default: one per CPU core).")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="Write the operation metrics to FILE in the Prometheus text format when done.")
+    parser.add_argument("--change-feed", action="store_true",
+                        help="Start the change log next to the catalog (DATA.changes), for the changes command and "
+                             "GET /changes. Once it exists, every session records its changes in it.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Add the records of a CSV or JSON Lines file.")
+    import_parser.add_argument("file")
+    import_parser.add_argument("--format", choices=Catalog_Exchange.FORMATS)
+    import_parser.add_argument("--chunk-size", type=positive_int, default=10000)
+
+    export_parser = commands.add_parser("export", help="Write the catalog to a CSV or JSON Lines file.")
+    export_parser.add_argument("file", help="The output file, or - for standard output.")
+    export_parser.add_argument("--format", choices=Catalog_Exchange.FORMATS)
+    export_parser.add_argument("--type", choices=Movie_Manager.TYPES)
+    export_parser.add_argument("--chunk-size", type=positive_int, default=10000)
+
+    query_parser = commands.add_parser("query", help="Print the matching movies/shows.")
+    query_parser.add_argument("--title", help="Text contained in the title.")
+    query_parser.add_argument("--genre")
+    query_parser.add_argument("--director")
+    query_parser.add_argument("--producer")
+    query_parser.add_argument("--any", action="store_true", help="Match any of genre/director/producer.")
+    query_parser.add_argument("--top", choices=Movie_Manager.RANKING_KEYS,
+                              help="Rank by rating, views, release date (newest first) or duration.")
+    query_parser.add_argument("--range", nargs=3, action="append", metavar=("KEY", "LOW", "HIGH"),
+                              help="Only records with rating, views, release_date or duration between LOW and HIGH "
+                                   "(inclusive; - for no bound). Can be repeated.")
+    query_parser.add_argument("--type", choices=Movie_Manager.TYPES)
+    query_parser.add_argument("--limit", type=positive_int, default=50)
+    query_parser.add_argument("--format", choices=Catalog_Exchange.FORMATS, default="jsonl")
+
+    stats_parser = commands.add_parser("stats", help="Print catalog statistics as JSON.")
+    stats_parser.add_argument("--by", choices=Catalog_Analytics.GROUP_KEYS,
+                              help="Print the count, views, ratings and duration percentiles of each group.")
+    stats_parser.add_argument("--type", choices=Movie_Manager.TYPES, help="With --by, only group this type.")
+
+    serve_parser = commands.add_parser("serve", help="Serve JSON queries and rating updates over HTTP.")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=8000, help="The port to listen on (0 picks a free one).")
+    serve_parser.add_argument("--threads", type=int, default=8, help="Worker threads (default: 8).")
+
+    changes_parser = commands.add_parser("changes", help="Print the changes made after a sequence number.")
+    changes_parser.add_argument("--since", type=int, default=0,
+                                help="The sequence number of the last change already seen (default: 0).")
+    changes_parser.add_argument("--limit", type=int, default=None)
+    changes_parser.add_argument("--follow", action="store_true", help="Keep printing new changes until interrupted.")
+    args = parser.parse_args(argv)
+    if args.command == "query" and args.top and (args.title is not None or args.genre or args.director or
+                                                 args.producer or args.range):
+        # A ranking covers the whole catalog (of one type); filtering it would return fewer than --limit records.
+        parser.error("--top cannot be combined with --title, --genre, --director, --producer or --range.")
+
+    # Without --change-feed, changes are still recorded once the log exists, so it never has gaps.
+    feed = Change_Feed(args.data + ".changes", create=args.change_feed)
+    if args.command == "changes":
+        # Read from the change log alone; the catalog itself is not loaded.
+        try:
+            changes = feed.follow(args.since) if args.follow else feed.changes_since(args.since, args.limit)
+            for change in islice(changes, args.limit):
+                print(json.dumps(change), flush=args.follow)
+        except KeyboardInterrupt:
+            pass
+        except (OSError, ValueError) as e:
+            print(f"Error while running changes: {e}", file=sys.stderr)
+            return 1
+        return 0
+
+    if args.storage == "binary":
+        storage = Binary_Catalog_Storage(args.data)
+    elif args.storage == "sqlite":
+        storage = Sqlite_Catalog_Storage(args.data)
+    elif args.storage == "sharded":
+        try:
+            storage = Sharded_Catalog_Storage(args.data, args.shards, journal=True, workers=args.workers)
+        except (OSError, ValueError) as e:
+            print(f"Error while opening the catalog: {e}", file=sys.stderr)
+            return 1
     else:
-        print("Invalid choice. Please try again.")
+        storage = None
+    manager = Movie_Manager(args.data, journal=True, storage=storage, workers=args.workers,
+                            metrics=args.metrics is not None, change_feed=feed)
+    try:
+        if args.command == "import":
+            file_format = Catalog_Exchange.detect_format(args.file, args.format)
+            on_error = lambda line_number, message: print(f"{args.file}:{line_number}: {message}", file=sys.stderr)
+            with open(args.file, "r", newline="") as file:
+                added, skipped = manager.import_records(Catalog_Exchange.read_records(file, file_format),
+                                                        args.chunk_size, on_error, args.workers)
+            print(f"Imported {added} record(s), skipped {skipped}.")
+            return 1 if skipped else 0
+
+        if args.command == "export":
+            if args.file == "-":
+                written = manager.export_records(sys.stdout, args.format or "jsonl", args.type, args.chunk_size)
+            else:
+                file_format = Catalog_Exchange.detect_format(args.file, args.format)
+                with open(args.file, "w", newline="") as file:
+                    written = manager.export_records(file, file_format, args.type, args.chunk_size)
+            print(f"Exported {written} record(s).", file=sys.stderr)
+            return 0
+
+        if args.command == "query":
+            ranges = {key: tuple(None if bound == "-" else bound if key == "release_date" else float(bound)
+                                 for bound in (low, high))
+                      for key, low, high in args.range or ()}
+            if args.top:
+                movies = manager.top_movies(args.top, args.limit, args.type)
+            else:
+                in_ranges = manager.movies_in_ranges(ranges, args.type) if ranges else None
+                if args.title is not None:
+                    movies = manager.search_by_title(args.title)
+                elif args.genre or args.director or args.producer:
+                    movies = manager.find_movies(args.genre, args.director, args.producer, not args.any)
+                elif in_ranges is not None:
+                    movies = in_ranges
+                else:
+                    parser.error("query needs --title, --genre, --director, --producer, --range or --top.")
+                if in_ranges is not None and movies is not in_ranges:
+                    ids = {movie.get_id() for movie in in_ranges}
+                    movies = [movie for movie in movies if movie.get_id() in ids]
+                movies = [movie for movie in movies if args.type in (None, movie.get_type())][:args.limit]
+            Catalog_Exchange.write_records(sys.stdout, movies, args.format)
+            return 0
+
+        if args.command == "serve":
+            server = Catalog_Server(manager, (args.host, args.port), args.threads)
+            print(f"Serving the catalog at {server.get_url()}", flush=True)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+            finally:
+                server.server_close()
+            return 0
+
+        if args.by:
+            print(json.dumps(manager.group_report(args.by, args.type), indent=2))
+            return 0
+
+        total_rating = 0.0
+        total_views = 0
+        for types in Movie_Manager.TYPES:
+            cursor = None
+            while True:
+                movies, cursor = manager.page(types, cursor, 10000)
+                for movie in movies:
+                    total_rating += movie.get_average_rating()
+                    total_views += movie.get_number_of_views()
+                if cursor is None:
+                    break
+        total = manager.count()
+        print(json.dumps({
+            "records": total,
+            "movies": manager.count("Movie"),
+            "shows": manager.count("Show"),
+            "average_rating": round(total_rating / total, 2) if total else None,
+            "total_views": total_views,
+            "load_errors": len(manager.get_load_errors()),
+        }, indent=2))
+        return 0
+
+    except (OSError, ValueError, sqlite3.Error) as e:
+        print(f"Error while running {args.command}: {e}", file=sys.stderr)
+        return 1
+
+    finally:
+        manager.close()
+        if args.metrics is not None:
+            try:
+                manager.write_metrics(args.metrics)
+            except OSError as e:
+                print(f"Error while writing the metrics: {e}", file=sys.stderr)
+
 
+if __name__ == "__main__":
+    # With arguments the batch commands run; without, the interactive menu.
+    if len(sys.argv) > 1:
+        sys.exit(run_command())
+    main()
@@ -0,0 +1,9 @@
+"""
+Benchmarks for the Movie Manager.
+
+- catalog: generates synthetic catalogs in the movies_data.txt format.
+- harness: loads the module under test and measures time and memory.
+- bench_suite: times loading, saving, searching, lookups and pagination, and reports JSON that can be compared
+  between runs.
+- bench_load: measures how loading scales with the size of the catalog.
+"""
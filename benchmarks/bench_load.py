@@ -0,0 +1,92 @@
+"""
+Measures how Movie_Manager.load_movies scales with the size of the catalog file.
+
+Each size is generated into a temporary movies_data.txt and loaded in a fresh interpreter, so the reported peak RSS
+belongs to that load alone.
+
+With --format binary or sqlite the catalog is converted first and opened through Binary_Catalog_Storage or
+Sqlite_Catalog_Storage.
+
+Usage:
+    python -m benchmarks.bench_load [--sizes 10000 100000 1000000] [--module "Main file.py"] [--format text|binary|sqlite]
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.catalog import write_catalog
+from benchmarks.harness import load_module, peak_rss_kb
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STORAGES = {"binary": ("Binary_Catalog_Storage", ".bin"), "sqlite": ("Sqlite_Catalog_Storage", ".db")}
+CONVERT = ("from benchmarks.harness import load_module; import sys; "
+           "getattr(load_module(sys.argv[1]), sys.argv[2]).from_text_file(sys.argv[3], sys.argv[4])")
+
+
+def measure(module_path, filename, file_format):
+    """
+    Loads the catalog once and prints the load time and peak RSS as JSON. Runs in the child interpreter.
+
+    Parameters:
+        module_path: The path of the Movie Manager module.
+        filename: The catalog file to load.
+        file_format: "text", "binary" or "sqlite".
+    """
+    module = load_module(module_path)
+    rss_before = peak_rss_kb()
+    start = time.perf_counter()
+    if file_format in STORAGES:
+        module.Movie_Manager(storage=getattr(module, STORAGES[file_format][0])(filename))
+    else:
+        module.Movie_Manager(filename)
+    seconds = time.perf_counter() - start
+    print(json.dumps({
+        "seconds": seconds,
+        "rss_before_kb": rss_before,
+        "peak_rss_kb": peak_rss_kb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--module", default=os.path.join(ROOT, "Main file.py"))
+    parser.add_argument("--format", choices=["text", "binary", "sqlite"], default="text")
+    parser.add_argument("--child", nargs=3, metavar=("MODULE", "FILE", "FORMAT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure(*args.child)
+        return
+
+    print(f"{'records':>10} {'file MB':>8} {'load s':>8} {'rec/s':>10} {'peak RSS MB':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            filename = os.path.join(directory, f"movies_{size}.txt")
+            write_catalog(filename, size)
+            if args.format in STORAGES:
+                storage, extension = STORAGES[args.format]
+                text_filename, filename = filename, filename[:-4] + extension
+                # Converted in its own interpreter: peak RSS carries over into child processes, so the parent
+                # has to stay small.
+                subprocess.run([sys.executable, "-c", CONVERT, args.module, storage, text_filename, filename],
+                               check=True, cwd=ROOT)
+                os.remove(text_filename)
+            output = subprocess.run([sys.executable, "-m", "benchmarks.bench_load", "--child", args.module, filename,
+                                     args.format], check=True, capture_output=True, text=True, cwd=ROOT).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            print(f"{size:>10} {os.path.getsize(filename) / 2 ** 20:>8.1f} {result['seconds']:>8.2f} "
+                  f"{size / result['seconds']:>10.0f} {result['peak_rss_kb'] / 1024:>12.1f}")
+            os.remove(filename)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Load-tests the JSON query server (python "Main file.py" serve) and reports requests per second and latency
+percentiles, overall and per kind of request.
+
+Without --url a synthetic catalog is generated and served by a fresh server process on a free port, which is stopped
+afterwards. Every client thread keeps one connection open and sends a mix of ID lookups, title and genre searches,
+page walks and, with --write-ratio, rating updates, for --duration seconds. Each kind of request is sent once before
+the clock starts, so the indexes built on first use are not part of the measurement.
+
+The clients run in this process and the server in another; on a machine with few cores they compete for the CPU.
+
+Usage:
+    python -m benchmarks.bench_server [--size 100000] [--clients 8] [--threads 8] [--duration 10] [--write-ratio 0.05]
+    python -m benchmarks.bench_server --url http://127.0.0.1:8000 --size 100000 [--output results.json]
+"""
+
+import argparse
+import http.client
+import json
+import math
+import os
+import random
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote, urlsplit
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.catalog import ADJECTIVES, GENRES, write_catalog
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Relative weight of each kind of read request; rating updates are mixed in by --write-ratio.
+READ_MIX = {"lookup": 50, "search_title": 15, "search_genre": 10, "page": 25}
+
+
+class Client:
+    """
+    One simulated client: a kept-alive connection that sends random requests and records their latencies.
+    """
+
+    def __init__(self, url, size, write_ratio, seed):
+        """
+        Parameters:
+            url: The base URL of the server.
+            size: The number of records in the served catalog (IDs are 0 to size - 1).
+            write_ratio: The fraction of requests that are rating updates.
+            seed: Seed for choosing the requests.
+        """
+        address = urlsplit(url)
+        self.connection = http.client.HTTPConnection(address.hostname, address.port, timeout=60)
+        self.size = size
+        self.write_ratio = write_ratio
+        self.rng = random.Random(seed)
+        self.cursors = {"Movie": None, "Show": None}
+        self.latencies = {}
+        self.errors = 0
+
+    def pick(self):
+        """
+        Returns the kind of the next request.
+        """
+        if self.rng.random() < self.write_ratio:
+            return "update_rating"
+        return self.rng.choices(list(READ_MIX), weights=list(READ_MIX.values()))[0]
+
+    def send(self, kind):
+        """
+        Sends one request of the given kind and returns its status and decoded answer.
+        """
+        rng = self.rng
+        body = None
+        if kind == "lookup":
+            method, path = "GET", f"/movies/{rng.randrange(self.size)}"
+        elif kind == "search_title":
+            # An adjective plus a number matches a handful of titles.
+            path = f"/search?title={quote(f'{rng.choice(ADJECTIVES)} {rng.randrange(self.size)}')}&limit=20"
+            method = "GET"
+        elif kind == "search_genre":
+            method, path = "GET", f"/search?genre={quote(rng.choice(GENRES))}&limit=20"
+        elif kind == "page":
+            types = rng.choice(("Movie", "Show"))
+            cursor = self.cursors[types]
+            method, path = "GET", f"/movies?type={types}&size=20" + (f"&cursor={cursor}" if cursor is not None else "")
+        else:
+            method, path = "POST", f"/movies/{rng.randrange(self.size)}/rating"
+            body = json.dumps({"rating": round(rng.uniform(0, 10), 1)})
+
+        self.connection.request(method, path, body, {"Content-Type": "application/json"} if body else {})
+        response = self.connection.getresponse()
+        document = json.loads(response.read())
+        if kind == "page" and response.status == 200:
+            self.cursors[types] = document["cursor"]
+        return response.status, document
+
+    def run(self, deadline):
+        """
+        Sends requests until the deadline (a time.perf_counter value).
+        """
+        while True:
+            kind = self.pick()
+            start = time.perf_counter()
+            if start >= deadline:
+                break
+            try:
+                status, _ = self.send(kind)
+            except (OSError, http.client.HTTPException, ValueError):
+                status = None
+                self.connection.close()
+            seconds = time.perf_counter() - start
+            if status != 200:
+                self.errors += 1
+            self.latencies.setdefault(kind, []).append(seconds)
+        self.connection.close()
+
+
+def percentile(ordered, percent):
+    """
+    Returns the nearest-rank percentile of a sorted, non-empty list.
+    """
+    return ordered[max(math.ceil(len(ordered) * percent / 100) - 1, 0)]
+
+
+def summarize(latencies, seconds):
+    """
+    Returns the request count, throughput and latency percentiles (in milliseconds) of a list of latencies.
+    """
+    ordered = sorted(latencies)
+    return {
+        "requests": len(ordered),
+        "requests_per_second": len(ordered) / seconds,
+        "p50_ms": percentile(ordered, 50) * 1000 if ordered else None,
+        "p99_ms": percentile(ordered, 99) * 1000 if ordered else None,
+        "max_ms": ordered[-1] * 1000 if ordered else None,
+    }
+
+
+def load_test(url, size, clients, duration, write_ratio, seed):
+    """
+    Runs the clients against a server and reports the results.
+
+    Parameters:
+        url: The base URL of the server.
+        size: The number of records in the served catalog.
+        clients: The number of concurrent clients.
+        duration: How long to send requests, in seconds.
+        write_ratio: The fraction of requests that are rating updates.
+        seed: Seed for choosing the requests.
+
+    Returns:
+        dict: The overall results and the results of every kind of request, plus the number of failed requests.
+    """
+    warm_up = Client(url, size, write_ratio, seed)
+    for kind in list(READ_MIX) + (["update_rating"] if write_ratio else []):
+        warm_up.send(kind)
+    warm_up.connection.close()
+
+    workers = [Client(url, size, write_ratio, seed + number + 1) for number in range(clients)]
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=worker.run, args=(deadline,)) for worker in workers]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+
+    by_kind = {}
+    for worker in workers:
+        for kind, latencies in worker.latencies.items():
+            by_kind.setdefault(kind, []).extend(latencies)
+    return {
+        "clients": clients,
+        "seconds": seconds,
+        "errors": sum(worker.errors for worker in workers),
+        "overall": summarize([latency for latencies in by_kind.values() for latency in latencies], seconds),
+        "requests": {kind: summarize(latencies, seconds) for kind, latencies in sorted(by_kind.items())},
+    }
+
+
+def start_server(module_path, filename, threads):
+    """
+    Starts a server process on a free port and waits until it answers.
+
+    Returns:
+        tuple: The process and the base URL it serves.
+    """
+    process = subprocess.Popen([sys.executable, module_path, "--data", filename, "serve", "--port", "0",
+                                "--threads", str(threads)], stdout=subprocess.PIPE, text=True, cwd=ROOT)
+    for line in process.stdout:
+        if line.startswith("Serving the catalog at "):
+            return process, line.split()[-1]
+    process.wait()
+    raise RuntimeError(f"The server exited with status {process.returncode} before serving.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Test a running server instead of starting one.")
+    parser.add_argument("--size", type=int, default=100_000, help="Records in the catalog (default: 100000).")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--threads", type=int, default=8, help="Worker threads of the started server.")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--write-ratio", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--module", default=os.path.join(ROOT, "Main file.py"))
+    parser.add_argument("--output", help="Also write the results to this JSON file.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        process = None
+        url = args.url
+        if url is None:
+            filename = os.path.join(directory, "movies_data.txt")
+            write_catalog(filename, args.size, args.seed)
+            process, url = start_server(args.module, filename, args.threads)
+        try:
+            results = load_test(url, args.size, args.clients, args.duration, args.write_ratio, args.seed)
+        finally:
+            if process is not None:
+                process.send_signal(signal.SIGINT)
+                process.wait()
+
+    print(f"{'request':>14} {'count':>8} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for kind, result in list(results["requests"].items()) + [("all", results["overall"])]:
+        print(f"{kind:>14} {result['requests']:>8} {result['requests_per_second']:>9.0f} {result['p50_ms']:>8.2f} "
+              f"{result['p99_ms']:>8.2f} {result['max_ms']:>8.2f}")
+    print(f"{results['clients']} client(s), {results['seconds']:.1f} s, {results['errors']} failed request(s)")
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
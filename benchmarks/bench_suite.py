@@ -0,0 +1,221 @@
+"""
+Times the main Movie Manager operations on synthetic catalogs and reports the results as JSON.
+
+For every size a catalog is generated (see benchmarks.catalog) and measured in a fresh interpreter, so the peak
+memory reported belongs to that catalog alone. The operations are:
+
+- load: Movie_Manager(...) reading the file; load_movies: reloading it.
+- save_movies: rewriting the file, first with cold and then with cached record texts.
+- search_title, search_title_broad, search_genre, find_movies: programmatic searches.
+- search_movies_interactive, list_movies_interactive: the menu methods, driven with scripted input.
+- lookup, update_movie_rating, remove_movie: work on random IDs.
+- page_all: walking every page of movies.
+
+Each result has the wall time, the number of items handled, the throughput and the peak RSS of the process after
+the operation. Write the report with --output and compare two reports with --compare.
+
+Usage:
+    python -m benchmarks.bench_suite [--sizes 10000 100000 1000000] [--output results.json]
+    python -m benchmarks.bench_suite --sizes 10000 --compare baseline.json
+    python -m benchmarks.bench_suite --compare baseline.json results.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+
+if __package__ in (None, ""):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.catalog import ADJECTIVES, GENRES, write_catalog
+from benchmarks.harness import load_module, measure, scripted_input
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_operations(module_path, filename, size, queries, seed, journal):
+    """
+    Runs every operation on one catalog. Runs in the child interpreter.
+
+    Parameters:
+        module_path: The path of the Movie Manager module.
+        filename: The catalog file; it is modified.
+        size: The number of records in the catalog.
+        queries: The number of searches, lookups and updates per operation.
+        seed: Seed for choosing IDs and queries.
+        journal: Whether the manager runs in journal mode.
+
+    Returns:
+        dict: Operation name mapped to its measurement.
+    """
+    module = load_module(module_path)
+    rng = random.Random(seed)
+    results = {}
+    managers = []
+
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        results["load"] = measure(lambda: managers.append(module.Movie_Manager(filename, journal=journal)), size)
+        manager = managers[0]
+        results["load_movies"] = measure(manager.load_movies, size)
+        results["save_movies"] = measure(manager.save_movies, size)
+        results["save_movies_cached"] = measure(manager.save_movies, size)
+
+        ids = [str(number) for number in rng.sample(range(size), min(queries, size))]
+        # "River 1234" matches a handful of titles, an adjective such as "silent" matches about one in twenty.
+        titles = [" ".join(manager.get_by_id(id).get_movie_title().split()[1:]) for id in ids]
+        adjectives = [rng.choice(ADJECTIVES) for _ in range(queries)]
+        genres = [rng.choice(GENRES) for _ in range(queries)]
+        directors = [f"Director {rng.randint(1, 50)}" for _ in range(queries)]
+
+        results["search_title"] = measure(lambda: [manager.search_by_title(title) for title in titles], len(titles))
+        results["search_title_broad"] = measure(
+            lambda: [manager.search_by_title(adjective) for adjective in adjectives], queries)
+        results["search_genre"] = measure(
+            lambda: [manager.search_by_field("genre", genre) for genre in genres], queries)
+        results["find_movies"] = measure(
+            lambda: [manager.find_movies(genre, director) for genre, director in zip(genres, directors)], queries)
+
+        answers = [answer for title in titles for answer in ("1", title)] + ["quit"]
+        with scripted_input(answers):
+            results["search_movies_interactive"] = measure(manager.search_movies, len(titles))
+
+        results["lookup"] = measure(lambda: [manager.get_by_id(id) for id in ids], len(ids))
+        results["update_movie_rating"] = measure(
+            lambda: [manager.update_movie_rating(id, round(rng.uniform(0, 10), 1)) for id in ids], len(ids))
+
+        def page_all():
+            cursor = None
+            while True:
+                _, cursor = manager.page("Movie", cursor, 10)
+                if cursor is None:
+                    return
+
+        results["page_all"] = measure(page_all, manager.count("Movie"))
+        pages = min(queries, manager.count("Movie") // 10)
+        with scripted_input(["next"] * pages + ["quit"]):
+            results["list_movies_interactive"] = measure(manager.list_movies, pages)
+
+        results["remove_movie"] = measure(lambda: [manager.remove_movie(id) for id in ids], len(ids))
+        manager.close()
+    return results
+
+
+def run_size(module_path, size, queries, seed, journal):
+    """
+    Generates a catalog of the given size and measures it in a fresh interpreter.
+
+    Parameters:
+        module_path: The path of the Movie Manager module.
+        size: The number of records.
+        queries: The number of searches, lookups and updates per operation.
+        seed: Seed for the catalog and the queries.
+        journal: Whether the manager runs in journal mode.
+
+    Returns:
+        dict: Operation name mapped to its measurement.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        filename = os.path.join(directory, "movies_data.txt")
+        write_catalog(filename, size, seed)
+        command = [sys.executable, "-m", "benchmarks.bench_suite", "--child", module_path, filename, str(size),
+                   "--queries", str(queries), "--seed", str(seed)]
+        if not journal:
+            command.append("--no-journal")
+        output = subprocess.run(command, check=True, capture_output=True, text=True, cwd=ROOT).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def compare(baseline, current):
+    """
+    Prints the wall time of every operation in two reports side by side.
+
+    Parameters:
+        baseline: The earlier report.
+        current: The later report.
+    """
+    print(f"{'size':>8} {'operation':<26} {'before s':>10} {'after s':>10} {'change':>8}")
+    for size, operations in current["results"].items():
+        for name, result in operations.items():
+            before = baseline["results"].get(size, {}).get(name)
+            if before is None:
+                continue
+            ratio = result["seconds"] / before["seconds"] if before["seconds"] else float("nan")
+            print(f"{size:>8} {name:<26} {before['seconds']:>10.4f} {result['seconds']:>10.4f} {ratio:>7.2f}x")
+
+
+def print_report(report):
+    """
+    Prints a report as a table.
+
+    Parameters:
+        report: The report to print.
+    """
+    print(f"{'size':>8} {'operation':<26} {'seconds':>10} {'items/s':>12} {'peak RSS MB':>12}")
+    for size, operations in report["results"].items():
+        for name, result in operations.items():
+            rate = f"{result['items_per_second']:.0f}" if result["items_per_second"] else "-"
+            print(f"{size:>8} {name:<26} {result['seconds']:>10.4f} {rate:>12} {result['peak_rss_kb'] / 1024:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--module", default=os.path.join(ROOT, "Main file.py"))
+    parser.add_argument("--queries", type=int, default=100, help="Searches, lookups and updates per operation.")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-journal", dest="journal", action="store_false",
+                        help="Rewrite the file on every change instead of appending to the journal.")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of standard output.")
+    parser.add_argument("--compare", nargs="+", metavar="REPORT",
+                        help="A baseline report to compare this run with, or two reports to compare without running.")
+    parser.add_argument("--child", nargs=3, metavar=("MODULE", "FILE", "SIZE"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        module_path, filename, size = args.child
+        results = run_operations(module_path, filename, int(size), args.queries, args.seed, args.journal)
+        print(json.dumps(results))
+        return
+
+    if args.compare and len(args.compare) == 2:
+        with open(args.compare[0]) as before, open(args.compare[1]) as after:
+            compare(json.load(before), json.load(after))
+        return
+
+    report = {
+        "meta": {
+            "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "module": args.module,
+            "queries": args.queries,
+            "seed": args.seed,
+            "journal": args.journal,
+        },
+        "results": {},
+    }
+    for size in args.sizes:
+        report["results"][str(size)] = run_size(args.module, size, args.queries, args.seed, args.journal)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=2)
+        print_report(report)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.compare:
+        with open(args.compare[0]) as file:
+            compare(json.load(file), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Generates synthetic catalogs in the movies_data.txt format.
+
+The mix follows what a real catalog looks like rather than uniform noise: about 70% movies and 30% shows, a quarter of
+the records with two genres, directors and producers drawn from a long-tailed (Zipf-like) distribution, release years
+skewed towards recent years, log-normal view counts and ratings clustered around 6.5. The same seed always produces
+the same file.
+
+Usage:
+    python -m benchmarks.catalog SIZE FILE [--seed 42]
+"""
+
+import argparse
+import bisect
+import itertools
+import random
+
+GENRES = ["Drama", "Comedy", "Action", "Thriller", "Documentary", "Horror", "Romance", "Sci-Fi", "Animation",
+          "Crime", "Fantasy", "Family"]
+# Relative frequency of each genre above.
+GENRE_WEIGHTS = [22, 18, 14, 10, 8, 7, 6, 5, 4, 3, 2, 1]
+AGE_RESTRICTIONS = ["PG-13", "R", "18+", "21+"]
+AGE_RESTRICTION_WEIGHTS = [50, 30, 15, 5]
+ADJECTIVES = ["Silent", "Broken", "Golden", "Last", "Hidden", "Crimson", "Endless", "Lost", "Secret", "Wild",
+              "Dark", "Bright", "Frozen", "Burning", "Distant", "Savage", "Quiet", "Electric", "Hollow", "Final"]
+NOUNS = ["River", "Empire", "Night", "Garden", "Signal", "Kingdom", "Harbor", "Machine", "Summer", "Witness",
+         "Frontier", "Station", "Mirror", "Storm", "Island", "Protocol", "Orchard", "Horizon", "Echo", "Voyage"]
+DIRECTORS = 5000
+PRODUCERS = 800
+
+
+def zipf_cumulative_weights(count, exponent=1.1):
+    """
+    Returns the cumulative weights of a Zipf-like distribution over count ranks, for random.choices.
+
+    Parameters:
+        count: The number of ranks.
+        exponent: How steeply the frequency falls with the rank.
+
+    Returns:
+        list: The cumulative weights.
+    """
+    return list(itertools.accumulate(1 / rank ** exponent for rank in range(1, count + 1)))
+
+
+def generate_records(size, seed=42):
+    """
+    Yields the text blocks of a synthetic catalog, one record at a time.
+
+    Parameters:
+        size: The number of records.
+        seed: Seed for the random generator, so runs are reproducible.
+
+    Yields:
+        str: One record in the movies_data.txt format, followed by a blank line.
+    """
+    rng = random.Random(seed)
+    director_weights = zipf_cumulative_weights(DIRECTORS)
+    producer_weights = zipf_cumulative_weights(PRODUCERS)
+    genre_weights = list(itertools.accumulate(GENRE_WEIGHTS))
+    age_weights = list(itertools.accumulate(AGE_RESTRICTION_WEIGHTS))
+
+    def pick(choices, cumulative_weights):
+        return choices[bisect.bisect(cumulative_weights, rng.random() * cumulative_weights[-1])]
+
+    def rank(cumulative_weights):
+        return bisect.bisect(cumulative_weights, rng.random() * cumulative_weights[-1]) + 1
+
+    for number in range(size):
+        is_show = rng.random() < 0.3
+        genre = pick(GENRES, genre_weights)
+        if rng.random() < 0.25:
+            second = pick(GENRES, genre_weights)
+            if second != genre:
+                genre = f"{genre}, {second}"
+        year = int(rng.triangular(1950, 2025, 2020))
+        views = min(int(rng.lognormvariate(10, 2)), 2_000_000_000)
+        rating = round(min(10.0, max(0.0, rng.gauss(6.5, 1.5))), 1)
+        if is_show:
+            duration = rng.randint(20, 60)
+            episodes = max(1, int(rng.expovariate(1 / 24)))
+        else:
+            duration = max(60, min(240, int(rng.gauss(110, 20))))
+            episodes = "-"
+        yield (
+            f"ID: {number}\n"
+            f"Title: {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)} {number}\n"
+            f"Genre: {genre}\n"
+            f"Duration: {duration}\n"
+            f"Producer: Studio {rank(producer_weights)}\n"
+            f"Release Date: {year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}\n"
+            f"Number of Views: {views}\n"
+            f"Average Rating: {rating}\n"
+            f"Director: Director {rank(director_weights)}\n"
+            f"Age Restriction: {pick(AGE_RESTRICTIONS, age_weights)}\n"
+            f"Type: {'Show' if is_show else 'Movie'}\n"
+            f"Episodes: {episodes}\n"
+            "\n"
+        )
+
+
+def write_catalog(filename, size, seed=42):
+    """
+    Writes a synthetic catalog of the given size in the movies_data.txt format.
+
+    Parameters:
+        filename: The file to write.
+        size: The number of records.
+        seed: Seed for the random generator, so runs are reproducible.
+    """
+    with open(filename, "w", buffering=1024 * 1024) as file:
+        file.writelines(generate_records(size, seed))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("size", type=int)
+    parser.add_argument("file")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    write_catalog(args.file, args.size, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Helpers shared by the benchmarks: loading the module under test, timing operations and driving the interactive
+methods without a terminal.
+"""
+
+import builtins
+import contextlib
+import importlib.util
+import os
+import resource
+import sys
+import time
+
+
+def load_module(path):
+    """
+    Imports the Movie Manager module from a file path (the file name contains a space, so it cannot be imported by
+    name). The module is registered in sys.modules so that worker processes of a parallel load can find it.
+
+    Parameters:
+        path: The path of the module file.
+
+    Returns:
+        module: The imported module.
+    """
+    spec = importlib.util.spec_from_file_location("movie_manager", path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+def peak_rss_kb():
+    """
+    Returns the peak resident set size of this process so far.
+
+    Returns:
+        int: The peak RSS in kilobytes.
+    """
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+@contextlib.contextmanager
+def scripted_input(answers):
+    """
+    Answers input() calls from a list and discards everything printed, so interactive methods can run unattended.
+
+    Parameters:
+        answers: The answers, in the order the prompts appear.
+
+    Raises:
+        RuntimeError: If the code asks for more answers than were given.
+    """
+    answers = iter(answers)
+
+    def answer(prompt=""):
+        try:
+            return next(answers)
+        except StopIteration:
+            raise RuntimeError(f"No scripted answer left for prompt {prompt!r}.")
+
+    original = builtins.input
+    builtins.input = answer
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            yield
+    finally:
+        builtins.input = original
+
+
+def measure(operation, count=1):
+    """
+    Runs an operation once and reports how long it took.
+
+    Parameters:
+        operation: A function without arguments.
+        count: How many items the operation handles, for the throughput.
+
+    Returns:
+        dict: seconds, items, items_per_second and peak_rss_kb after the operation.
+    """
+    start = time.perf_counter()
+    operation()
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": seconds,
+        "items": count,
+        "items_per_second": count / seconds if seconds else None,
+        "peak_rss_kb": peak_rss_kb(),
+    }
@@ -0,0 +1,41 @@
+"""
+Fixtures shared by the tests: the Movie Manager module and small synthetic catalogs.
+"""
+
+import os
+
+import pytest
+
+from benchmarks.catalog import write_catalog
+from benchmarks.harness import load_module
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULE_PATH = os.path.join(ROOT, "Main file.py")
+
+
+@pytest.fixture(scope="session")
+def mm():
+    """
+    The Movie Manager module ("Main file.py" cannot be imported by name).
+    """
+    return load_module(MODULE_PATH)
+
+
+@pytest.fixture
+def catalog_file(tmp_path):
+    """
+    A synthetic text catalog of 500 records, with multi-genre titles, in a temporary directory.
+    """
+    filename = str(tmp_path / "movies_data.txt")
+    write_catalog(filename, 500)
+    return filename
+
+
+def record(id, title=None, genre="Drama", rating=7.0, types="Movie"):
+    """
+    Returns the fields of a valid record, as read from a CSV or JSON Lines file.
+    """
+    return {"ID": str(id), "Title": title or f"Test Title {id}", "Genre": genre, "Duration": "95",
+            "Producer": "Studio 1", "Release Date": "2020-05-17", "Number of Views": "1000",
+            "Average Rating": str(rating), "Director": "Director 1", "Age Restriction": "PG-13", "Type": types,
+            "Episodes": "-" if types == "Movie" else "10"}
@@ -0,0 +1,77 @@
+"""
+Tests for the grouped reports: multi-genre titles, and the NumPy and plain Python paths against a brute force.
+"""
+
+import pytest
+
+from tests.conftest import record
+
+
+@pytest.fixture(params=["numpy", "python"])
+def analytics_mm(request, mm, monkeypatch):
+    """
+    The module, with NumPy hidden for the plain Python path.
+    """
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(mm, "numpy", None)
+    return mm
+
+
+def expected_genres(movies):
+    """
+    Counts, total views and rating sums per genre, a movie/show counting once in each genre it lists.
+    """
+    groups = {}
+    for movie in movies:
+        for genre in dict.fromkeys(part.strip() for part in movie.get_genre().split(",")):
+            group = groups.setdefault(genre, [0, 0, 0.0])
+            group[0] += 1
+            group[1] += movie.get_number_of_views()
+            group[2] += movie.get_average_rating()
+    return groups
+
+
+def check(report, movies):
+    groups = expected_genres(movies)
+    assert list(report) == sorted(groups)
+    for genre, (count, views, rating_sum) in groups.items():
+        assert report[genre]["count"] == count
+        assert report[genre]["views"] == views
+        assert report[genre]["mean_rating"] == pytest.approx(rating_sum / count)
+
+
+def test_multi_genre_title_counts_in_each_genre(analytics_mm):
+    analytics = analytics_mm.Catalog_Analytics([
+        analytics_mm.Catalog_Parser.build_movie(record(1, genre="Action, Comedy")),
+        analytics_mm.Catalog_Parser.build_movie(record(2, genre="Comedy")),
+    ])
+    report = analytics.group_by("genre")
+    assert list(report) == ["Action", "Comedy"]
+    assert report["Action"]["count"] == 1
+    assert report["Comedy"]["count"] == 2
+
+    analytics.remove("1")
+    assert list(analytics.group_by("genre")) == ["Comedy"]
+
+
+def test_genre_groups_match_a_brute_force(analytics_mm, catalog_file):
+    manager = analytics_mm.Movie_Manager(catalog_file)
+    movies = {movie.get_id(): movie for movie in manager.page("Movie", None, 1000)[0] +
+              manager.page("Show", None, 1000)[0]}
+    assert any("," in movie.get_genre() for movie in movies.values())
+    check(manager.group_report("genre"), movies.values())
+
+    added = [analytics_mm.Catalog_Parser.build_movie(record(id, genre="Drama, Western", rating=3.0))
+             for id in range(9000, 9010)]
+    manager.bulk_add(added)
+    manager.bulk_update_ratings({"1": 9.9})
+    # Removing most of the catalog compacts the columns.
+    removed = [id for id in movies if int(id) % 4][:300]
+    manager.bulk_remove(removed)
+    movies = {movie.get_id(): movie for movie in manager.page("Movie", None, 1000)[0] +
+              manager.page("Show", None, 1000)[0]}
+    check(manager.group_report("genre"), movies.values())
+    check(manager.group_report("genre", "Show"), [movie for movie in movies.values() if movie.get_type() == "Show"])
+    manager.close()
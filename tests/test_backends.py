@@ -0,0 +1,142 @@
+"""
+Tests that every storage backend answers the same queries with the same records: the text file (eager and lazy), the
+binary file, SQLite and the sharded text files.
+"""
+
+import os
+import shutil
+
+import pytest
+
+from tests.conftest import record
+
+BACKENDS = ("lazy", "binary", "sqlite", "sharded")
+
+
+def convert(mm, catalog_file, backend):
+    """
+    Converts the text catalog to a backend. The lazy text catalog gets a copy of the file, so that changes made
+    through it are not seen by the eager one.
+    """
+    if backend == "lazy":
+        shutil.copy(catalog_file, other_file(catalog_file, "lazy.txt"))
+    elif backend == "binary":
+        mm.Binary_Catalog_Storage.from_text_file(catalog_file, other_file(catalog_file, "catalog.bin"))
+    elif backend == "sqlite":
+        mm.Sqlite_Catalog_Storage.from_text_file(catalog_file, other_file(catalog_file, "catalog.db"))
+    elif backend == "sharded":
+        mm.Sharded_Catalog_Storage.from_text_file(catalog_file, other_file(catalog_file, "sharded.txt"), 4)
+
+
+def other_file(catalog_file, name):
+    return os.path.join(os.path.dirname(catalog_file), name)
+
+
+def open_manager(mm, catalog_file, backend):
+    """
+    Opens a manager on a backend converted from the text catalog.
+    """
+    if backend == "text":
+        return mm.Movie_Manager(catalog_file, journal=True, background_compaction=False)
+    if backend == "lazy":
+        return mm.Movie_Manager(other_file(catalog_file, "lazy.txt"), journal=True, background_compaction=False,
+                                lazy=True)
+    if backend == "binary":
+        return mm.Movie_Manager(storage=mm.Binary_Catalog_Storage(other_file(catalog_file, "catalog.bin")))
+    if backend == "sqlite":
+        return mm.Movie_Manager(storage=mm.Sqlite_Catalog_Storage(other_file(catalog_file, "catalog.db")))
+    return mm.Movie_Manager(storage=mm.Sharded_Catalog_Storage(other_file(catalog_file, "sharded.txt"), journal=True))
+
+
+def ids(movies):
+    return [movie.get_id() for movie in movies]
+
+
+def walk_pages(manager, types):
+    found = []
+    cursor = None
+    while True:
+        movies, cursor = manager.page(types, cursor, 37)
+        found += ids(movies)
+        if cursor is None:
+            return found
+
+
+# Searches return matches in catalog order, which for the sharded catalog is shard by shard, so only their sets are
+# compared; rankings and range queries have a defined order.
+UNORDERED_QUERIES = {
+    "title": lambda manager: ids(manager.search_by_title("Golden")),
+    "genre": lambda manager: ids(manager.find_movies(genre="Drama")),
+    "any_field": lambda manager: ids(manager.find_movies(genre="Horror", director="Director 1", match_all=False)),
+    "genre_text": lambda manager: ids(manager.search_by_field("genre", "horror, act")),
+    "director_text": lambda manager: ids(manager.search_by_field("director", "tor 2")),
+    "pages": lambda manager: walk_pages(manager, "Movie") + walk_pages(manager, "Show"),
+}
+ORDERED_QUERIES = {
+    "count": lambda manager: (manager.count(), manager.count("Movie"), manager.count("Show")),
+    "top_rating": lambda manager: ids(manager.top_movies("rating", 30)),
+    "lowest_views": lambda manager: ids(manager.top_movies("views", 30, "Show", lowest=True)),
+    "newest": lambda manager: ids(manager.top_movies("release_date", 30, "Movie")),
+    "duration_range": lambda manager: ids(manager.movies_in_range("duration", 90, 120)),
+    "ranges": lambda manager: ids(manager.movies_in_ranges({"release_date": ("2015-01-01", "2020-12-31"),
+                                                            "rating": (7, None)})),
+}
+
+
+def change(mm, manager):
+    manager.bulk_add([mm.Catalog_Parser.build_movie(record(9001, "Golden Test", "Drama, Horror", 9.7)),
+                      mm.Catalog_Parser.build_movie(record(9002, "Show Test", "Comedy", 0.3, "Show"))])
+    manager.bulk_update_ratings({"1": 10.0, "2": 0.0, "3": 7.5})
+    manager.bulk_remove(["4", "5", "9002"])
+
+
+def assert_same_results(expected, actual):
+    for name, query in UNORDERED_QUERIES.items():
+        assert sorted(query(actual)) == sorted(query(expected)), name
+    for name, query in ORDERED_QUERIES.items():
+        assert query(actual) == query(expected), name
+    reference = expected.group_report("genre")
+    report = actual.group_report("genre")
+    assert list(report) == list(reference)
+    for genre, stats in reference.items():
+        assert report[genre] == pytest.approx(stats), genre
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_answer_like_the_text_file(mm, catalog_file, backend):
+    convert(mm, catalog_file, backend)
+    expected = open_manager(mm, catalog_file, "text")
+    actual = open_manager(mm, catalog_file, backend)
+    assert_same_results(expected, actual)
+    assert actual.get_by_id("17").text_file() == expected.get_by_id("17").text_file()
+    expected.close()
+    actual.close()
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backends_agree_after_changes(mm, catalog_file, backend):
+    convert(mm, catalog_file, backend)
+    actual = open_manager(mm, catalog_file, backend)
+    change(mm, actual)
+    actual.close()
+    expected = open_manager(mm, catalog_file, "text")
+    change(mm, expected)
+
+    # Compared in a fresh session, so the changes must have been persisted.
+    reopened = open_manager(mm, catalog_file, backend)
+    assert_same_results(expected, reopened)
+    assert reopened.get_by_id("4") is None and reopened.get_by_id("1").get_average_rating() == 10.0
+    expected.close()
+    reopened.close()
+
+
+@pytest.mark.parametrize("backend", ("text", "sqlite"))
+def test_ranking_ties_follow_the_ranking_direction(mm, catalog_file, backend):
+    convert(mm, catalog_file, backend)
+    manager = open_manager(mm, catalog_file, backend)
+    for lowest in (False, True):
+        ranked = [(movie.get_average_rating(), movie.get_id()) for movie in manager.top_movies("rating", 500,
+                                                                                                lowest=lowest)]
+        assert len(ranked) == 500
+        assert ranked == sorted(ranked, reverse=not lowest)
+    manager.close()
@@ -0,0 +1,134 @@
+"""
+Tests for the bulk API: validation before any change, and keeping memory and disk in step when a save fails.
+"""
+
+import pytest
+
+from tests.conftest import record
+
+
+@pytest.fixture
+def recorder(mm):
+    class Recorder(mm.Movie_observer):
+        def __init__(self):
+            self.events = []
+
+        def update_viewer(self, movie, action):
+            self.events.append((action, movie.get_id()))
+
+        def update_observer(self, movie, action):
+            pass
+
+    return Recorder()
+
+
+@pytest.fixture
+def failing_saves(mm, monkeypatch):
+    """
+    Makes every save of the text storage fail while the returned switch is on.
+    """
+    switch = {"on": False}
+    persist_batch = mm.Text_File_Storage.persist_batch
+
+    def fail(self, changes, movies):
+        if switch["on"]:
+            raise OSError("No space left on device")
+        persist_batch(self, changes, movies)
+
+    monkeypatch.setattr(mm.Text_File_Storage, "persist_batch", fail)
+    return switch
+
+
+def snapshot(manager):
+    """
+    Returns what the indexes and rankings of a manager answer, to compare before and after a failed change.
+    """
+    return (manager.count(), manager.count("Movie"),
+            [movie.get_id() for movie in manager.search_by_title("Test Title")],
+            [movie.get_id() for movie in manager.find_movies(genre="Drama")],
+            [(movie.get_id(), movie.get_average_rating()) for movie in manager.top_movies("rating", 20)],
+            [movie.get_id() for movie in manager.page("Movie", None, 1000)[0]],
+            manager.group_report("type"))
+
+
+def test_invalid_batch_changes_nothing(mm, catalog_file):
+    manager = mm.Movie_Manager(catalog_file, journal=True, background_compaction=False)
+    with pytest.raises(ValueError):
+        manager.bulk_update_ratings({"1": 5.0, "2": 11})
+    with pytest.raises(ValueError):
+        manager.bulk_remove(["1", "missing"])
+    assert manager.get_by_id("1") is not None
+    assert manager.get_by_id("1").get_average_rating() != 5.0
+    manager.close()
+
+
+def test_failed_saves_leave_the_catalog_unchanged(mm, catalog_file, recorder, failing_saves):
+    manager = mm.Movie_Manager(catalog_file, journal=True, background_compaction=False)
+    manager.add_observer(recorder)
+    manager.bulk_add([mm.Catalog_Parser.build_movie(record(9000))])
+    before = snapshot(manager)
+    recorder.events.clear()
+
+    failing_saves["on"] = True
+    with pytest.raises(OSError):
+        manager.bulk_add([mm.Catalog_Parser.build_movie(record(9001))])
+    with pytest.raises(OSError):
+        manager.bulk_update_ratings({"9000": 0.5, "1": 10.0})
+    with pytest.raises(OSError):
+        manager.bulk_remove(["9000", "2"])
+    manager.update_movie_rating("3", 10.0)
+    manager.remove_movie("4")
+    assert manager.get_by_id("9001") is None
+    assert manager.get_by_id("9000").get_average_rating() == 7.0
+    assert snapshot(manager) == before
+    assert recorder.events == []
+
+    # The title of the failed add is free again, and nothing failed reached the file.
+    failing_saves["on"] = False
+    manager.bulk_add([mm.Catalog_Parser.build_movie(record(9001))])
+    manager.close()
+    reloaded = mm.Movie_Manager(catalog_file, journal=True, background_compaction=False)
+    assert reloaded.get_by_id("9001") is not None
+    assert reloaded.get_by_id("9000").get_average_rating() == 7.0
+    assert reloaded.get_by_id("2") is not None and reloaded.get_by_id("4") is not None
+    reloaded.close()
+
+
+def test_import_reports_a_failed_save(mm, catalog_file, tmp_path, failing_saves, capsys):
+    failing_saves["on"] = True
+    source = tmp_path / "new.jsonl"
+    source.write_text('{"ID": "9001", "Title": "Imported", "Genre": "Drama", "Duration": 90, "Producer": "P", '
+                      '"Release Date": "2020-01-01", "Number of Views": 1, "Average Rating": 5.0, '
+                      '"Director": "D", "Age Restriction": "R", "Type": "Movie", "Episodes": "-"}\n')
+    assert mm.run_command(["--data", catalog_file, "import", str(source)]) == 1
+    assert "No space left on device" in capsys.readouterr().err
+
+
+@pytest.mark.parametrize("field", ["number_of_views", "average_rating", "duration"])
+def test_boolean_fields_are_rejected(mm, catalog_file, field):
+    fields = dict(id="9001", title="Flag", genre="Drama", producer="Studio 1", release_date="2020-01-01",
+                  number_of_views=10, average_rating=7.0, director="Director 1", age_restrictions="PG-13",
+                  duration=90)
+    fields[field] = True
+    manager = mm.Movie_Manager(catalog_file)
+    with pytest.raises(ValueError):
+        manager.bulk_add([mm.Movies(**fields)])
+    show = mm.Shows("9002", "Flag Show", "Drama", "Studio 1", "2020-01-01", 10, 7.0, "Director 1", "PG-13", 30,
+                    True)
+    with pytest.raises(ValueError):
+        manager.bulk_add([show])
+    manager.close()
+
+
+def test_boolean_ratings_are_rejected_and_the_catalog_reloads(mm, catalog_file):
+    manager = mm.Movie_Manager(catalog_file)
+    with pytest.raises(ValueError):
+        manager.bulk_update_ratings({"3": True})
+    manager.bulk_update_ratings({"3": 4})
+    manager.close()
+
+    reloaded = mm.Movie_Manager(catalog_file)
+    assert reloaded.get_load_errors() == []
+    assert reloaded.get_by_id("3").get_average_rating() == 4.0
+    assert sum(len(reloaded.page(types, None, 1000)[0]) for types in ("Movie", "Show")) == 500
+    reloaded.close()
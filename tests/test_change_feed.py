@@ -0,0 +1,148 @@
+"""
+Tests for the change feed: sequence numbers, reading changes back, trimming and crash recovery.
+"""
+
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from tests.conftest import MODULE_PATH, ROOT, record
+
+# Runs in a child interpreter: argv is the module, the catalog and the ID prefix of the records to add.
+ADD_RECORDS = """
+import sys
+from benchmarks.harness import load_module
+from tests.conftest import record
+mm = load_module(sys.argv[1])
+manager = mm.Movie_Manager(sys.argv[2], journal=True, background_compaction=False,
+                           change_feed=sys.argv[2] + ".changes")
+for number in range(25):
+    manager.bulk_add([mm.Catalog_Parser.build_movie(record(f"{sys.argv[3]}{number}"))])
+    manager.update_movie_rating(f"{sys.argv[3]}{number}", 5.0)
+manager.close()
+"""
+
+
+def read_log(filename):
+    with open(filename) as file:
+        return [json.loads(line) for line in file]
+
+
+def test_every_change_gets_the_next_number(mm, catalog_file):
+    manager = mm.Movie_Manager(catalog_file, change_feed=catalog_file + ".changes")
+    assert manager.last_change_sequence() == 0
+    manager.bulk_add([mm.Catalog_Parser.build_movie(record(9001)), mm.Catalog_Parser.build_movie(record(9002))])
+    manager.update_movie_rating("9001", 3.5)
+    manager.remove_movie("9002")
+
+    changes = manager.changes_since(0)
+    assert [(change["seq"], change["action"], change["id"]) for change in changes] == [
+        (1, "add", "9001"), (2, "add", "9002"), (3, "update", "9001"), (4, "delete", "9002")]
+    assert changes[2]["record"]["Average Rating"] == 3.5
+    assert changes[3]["record"] is None
+    assert manager.changes_since(2) == changes[2:]
+    assert manager.changes_since(1, limit=2) == changes[1:3]
+    assert manager.changes_since(4) == []
+    assert manager.last_change_sequence() == 4
+    manager.close()
+
+
+def test_numbers_are_contiguous_across_processes(mm, catalog_file):
+    processes = [subprocess.Popen([sys.executable, "-c", ADD_RECORDS, MODULE_PATH, catalog_file, prefix], cwd=ROOT,
+                                  stdout=subprocess.DEVNULL) for prefix in "ab"]
+    assert [process.wait(timeout=120) for process in processes] == [0, 0]
+
+    changes = read_log(catalog_file + ".changes")
+    assert [change["seq"] for change in changes] == list(range(1, 101))
+    # Every record was added before its rating was updated.
+    for prefix in "ab":
+        actions = [change["action"] for change in changes if change["id"].startswith(prefix)]
+        assert actions == ["add", "update"] * 25
+
+
+def test_changes_since_matches_the_log(mm, tmp_path):
+    feed = mm.Change_Feed(str(tmp_path / "feed"), max_entries=1000)
+    movie = mm.Catalog_Parser.build_movie(record(1))
+    for size in (1, 3, 7, 2, 5):
+        feed.append([("update", movie)] * size)
+    changes = read_log(feed.get_filename())
+    for seq in range(0, 20):
+        for limit in (None, 1, 4):
+            assert feed.changes_since(seq, limit) == changes[seq:][:limit]
+
+
+def test_log_is_bounded(mm, tmp_path):
+    feed = mm.Change_Feed(str(tmp_path / "feed"), max_entries=10)
+    movie = mm.Catalog_Parser.build_movie(record(1))
+    for _ in range(40):
+        feed.append([("update", movie)])
+        assert len(read_log(feed.get_filename())) <= 15
+    assert feed.last_sequence() == 40
+    assert [change["seq"] for change in feed.changes_since(30)] == list(range(31, 41))
+    with pytest.raises(ValueError):
+        feed.changes_since(0)
+
+
+def test_torn_line_is_dropped(mm, tmp_path):
+    filename = str(tmp_path / "feed")
+    feed = mm.Change_Feed(filename)
+    movie = mm.Catalog_Parser.build_movie(record(1))
+    feed.append([("update", movie)] * 3)
+    with open(filename, "ab") as file:
+        file.write(b'{"seq": 4, "ti')
+
+    feed = mm.Change_Feed(filename)
+    assert feed.last_sequence() == 3
+    assert feed.append([("delete", movie)]) == 4
+    assert [change["seq"] for change in read_log(filename)] == [1, 2, 3, 4]
+
+
+def test_feed_must_be_enabled(mm, catalog_file):
+    manager = mm.Movie_Manager(catalog_file)
+    with pytest.raises(ValueError):
+        manager.changes_since(0)
+    manager.close()
+
+
+def test_batch_commands_record_changes_on_request(mm, catalog_file, tmp_path, capsys):
+    source = tmp_path / "new.jsonl"
+    source.write_text(json.dumps(record(9001)) + "\n")
+    assert mm.run_command(["--data", catalog_file, "import", str(source)]) == 0
+    capsys.readouterr()
+    assert mm.run_command(["--data", catalog_file, "changes"]) == 0
+    assert capsys.readouterr().out == ""
+
+    source.write_text(json.dumps(record(9002)) + "\n")
+    assert mm.run_command(["--data", catalog_file, "--change-feed", "import", str(source)]) == 0
+    capsys.readouterr()
+    assert mm.run_command(["--data", catalog_file, "changes"]) == 0
+    changes = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(change["seq"], change["action"], change["id"]) for change in changes] == [(1, "add", "9002")]
+
+    # Once the log exists, sessions that did not start it record their changes too.
+    source.write_text(json.dumps(record(9003)) + "\n")
+    assert mm.run_command(["--data", catalog_file, "import", str(source)]) == 0
+    menu = mm.Movie_Manager(catalog_file, change_feed=mm.Change_Feed(catalog_file + ".changes", create=False))
+    menu.update_movie_rating("9001", 2.5)
+    menu.close()
+    capsys.readouterr()
+    assert mm.run_command(["--data", catalog_file, "changes", "--since", "1"]) == 0
+    changes = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [(change["seq"], change["action"], change["id"]) for change in changes] == [(2, "add", "9003"),
+                                                                                       (3, "update", "9001")]
+
+
+def test_feed_that_does_not_create_the_log_waits_for_it(mm, catalog_file):
+    filename = catalog_file + ".changes"
+    manager = mm.Movie_Manager(catalog_file, change_feed=mm.Change_Feed(filename, create=False))
+    manager.update_movie_rating("1", 1.5)
+    assert not os.path.exists(filename)
+
+    mm.Change_Feed(filename).append([("update", manager.get_by_id("1"))])
+    manager.update_movie_rating("1", 2.5)
+    assert [(change["seq"], change["record"]["Average Rating"]) for change in read_log(filename)] == [(1, 1.5),
+                                                                                                      (2, 2.5)]
+    manager.close()
@@ -0,0 +1,41 @@
+"""
+Tests for the batch commands: argument checks that would otherwise do nothing or be ignored.
+"""
+
+import json
+
+import pytest
+
+from tests.conftest import record
+
+
+@pytest.mark.parametrize("command", ["import", "export"])
+@pytest.mark.parametrize("size", ["0", "-5"])
+def test_chunk_size_must_be_positive(mm, catalog_file, tmp_path, capsys, command, size):
+    source = tmp_path / "in.jsonl"
+    source.write_text(json.dumps(record(9001)) + "\n")
+    with pytest.raises(SystemExit):
+        mm.run_command(["--data", catalog_file, command, str(source), "--chunk-size", size])
+    assert "must be at least 1" in capsys.readouterr().err
+
+
+def test_import_records_rejects_empty_chunks(mm, catalog_file):
+    manager = mm.Movie_Manager(catalog_file)
+    with pytest.raises(ValueError):
+        manager.import_records([(1, record(9001))], chunk_size=0)
+    assert manager.get_by_id("9001") is None
+    manager.close()
+
+
+@pytest.mark.parametrize("criterion", [["--title", "Golden"], ["--genre", "Drama"], ["--director", "Director 1"],
+                                       ["--producer", "Studio 1"], ["--range", "rating", "5", "-"]])
+def test_top_cannot_be_filtered(mm, catalog_file, capsys, criterion):
+    with pytest.raises(SystemExit):
+        mm.run_command(["--data", catalog_file, "query", "--top", "rating", *criterion])
+    assert "--top cannot be combined" in capsys.readouterr().err
+
+
+def test_top(mm, catalog_file, capsys):
+    assert mm.run_command(["--data", catalog_file, "query", "--top", "rating", "--limit", "5"]) == 0
+    ratings = [json.loads(line)["Average Rating"] for line in capsys.readouterr().out.splitlines()]
+    assert len(ratings) == 5 and ratings == sorted(ratings, reverse=True)
@@ -0,0 +1,92 @@
+"""
+Tests for sharing a catalog between processes: the advisory File_Lock and merging the changes of other sessions.
+"""
+
+import subprocess
+import sys
+
+import pytest
+
+from tests.conftest import MODULE_PATH, ROOT
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="File_Lock only locks across processes with fcntl.")
+
+# Runs in a child interpreter: argv is the module, the catalog and the ID prefix of the records to add.
+ADD_RECORDS = """
+import sys
+from benchmarks.harness import load_module
+from tests.conftest import record
+mm = load_module(sys.argv[1])
+manager = mm.Movie_Manager(sys.argv[2], journal=True, background_compaction=False)
+for number in range(25):
+    manager.bulk_add([mm.Catalog_Parser.build_movie(record(f"{sys.argv[3]}{number}"))])
+manager.close()
+"""
+
+# Increments a counter file 50 times, reading and writing it in separate steps while holding the lock.
+INCREMENT = """
+import sys, time
+from benchmarks.harness import load_module
+mm = load_module(sys.argv[1])
+lock = mm.File_Lock(sys.argv[2] + ".lock")
+for _ in range(50):
+    with lock:
+        with open(sys.argv[2]) as file:
+            value = int(file.read())
+        time.sleep(0.001)
+        with open(sys.argv[2], "w") as file:
+            file.write(str(value + 1))
+"""
+
+
+def run_in_parallel(script, *argument_lists):
+    """
+    Runs a script in one child interpreter per argument list at the same time and waits for all of them.
+    """
+    processes = [subprocess.Popen([sys.executable, "-c", script, MODULE_PATH, *arguments], cwd=ROOT,
+                                  stdout=subprocess.DEVNULL) for arguments in argument_lists]
+    assert [process.wait(timeout=120) for process in processes] == [0] * len(processes)
+
+
+def test_lock_serializes_processes(tmp_path):
+    counter = str(tmp_path / "counter")
+    with open(counter, "w") as file:
+        file.write("0")
+    run_in_parallel(INCREMENT, [counter], [counter])
+    with open(counter) as file:
+        assert file.read() == "100"
+
+
+def test_lock_is_reentrant(mm, tmp_path):
+    lock = mm.File_Lock(str(tmp_path / "catalog.lock"))
+    with lock:
+        with lock:
+            pass
+    with lock:
+        pass
+
+
+def test_two_processes_append_to_one_catalog(mm, catalog_file):
+    run_in_parallel(ADD_RECORDS, [catalog_file, "a"], [catalog_file, "b"])
+    manager = mm.Movie_Manager(catalog_file, journal=True, background_compaction=False)
+    for prefix in "ab":
+        assert all(manager.get_by_id(f"{prefix}{number}") is not None for number in range(25))
+    assert manager.count() == 550
+    manager.close()
+
+
+def test_refresh_merges_the_changes_of_another_session(mm, catalog_file):
+    first = mm.Movie_Manager(catalog_file, journal=True, background_compaction=False)
+    second = mm.Movie_Manager(catalog_file, journal=True, background_compaction=False)
+    assert first.top_movies("rating", 1)[0].get_id() != "7"
+    second.update_movie_rating("7", 10.0)
+    second.bulk_remove(["8"])
+
+    assert first.refresh()
+    assert first.get_by_id("7").get_average_rating() == 10.0
+    assert first.get_by_id("8") is None
+    # The indexes built before the refresh are kept up to date.
+    assert first.top_movies("rating", 1)[0].get_id() == "7"
+    assert not first.refresh()
+    first.close()
+    second.close()
@@ -0,0 +1,94 @@
+"""
+Tests for the change journal: replay, torn-tail recovery and compaction.
+"""
+
+import os
+
+from tests.conftest import record
+
+
+def test_changes_survive_reload(mm, catalog_file):
+    manager = mm.Movie_Manager(catalog_file, journal=True, background_compaction=False)
+    manager.bulk_add([mm.Catalog_Parser.build_movie(record(9001))])
+    manager.bulk_update_ratings({"1": 9.9})
+    manager.bulk_remove(["2"])
+    manager.close()
+
+    reloaded = mm.Movie_Manager(catalog_file, journal=True, background_compaction=False)
+    assert reloaded.get_by_id("9001").get_movie_title() == "Test Title 9001"
+    assert reloaded.get_by_id("1").get_average_rating() == 9.9
+    assert reloaded.get_by_id("2") is None
+    reloaded.close()
+
+
+def test_torn_tail_is_cut_off(mm, catalog_file):
+    manager = mm.Movie_Manager(catalog_file, journal=True, background_compaction=False)
+    manager.update_movie_rating("1", 9.5)
+    manager.close()
+    journal_filename = catalog_file + ".journal"
+    complete_size = os.path.getsize(journal_filename)
+
+    # A crash in the middle of appending an entry, and one in the middle of a group of entries.
+    with open(journal_filename, "ab") as file:
+        file.write(b"Action: update\nID: 3\nAverage Ra")
+    manager = mm.Movie_Manager(catalog_file, journal=True, background_compaction=False)
+    assert manager.get_by_id("1").get_average_rating() == 9.5
+    assert os.path.getsize(journal_filename) == complete_size
+    manager.close()
+
+    with open(journal_filename, "ab") as file:
+        file.write(b"Action: begin\n\nAction: delete\nID: 4\n\nAction: delete\nID: 5\n\n")
+    manager = mm.Movie_Manager(catalog_file, journal=True, background_compaction=False)
+    assert manager.get_by_id("4") is not None and manager.get_by_id("5") is not None
+    assert os.path.getsize(journal_filename) == complete_size
+
+    # Appends continue on a clean boundary.
+    manager.update_movie_rating("3", 1.5)
+    manager.close()
+    manager = mm.Movie_Manager(catalog_file, journal=True, background_compaction=False)
+    assert manager.get_by_id("3").get_average_rating() == 1.5
+    manager.close()
+
+
+def test_compaction_folds_the_journal_into_the_file(mm, catalog_file):
+    manager = mm.Movie_Manager(catalog_file, journal=True, compaction_threshold=1, background_compaction=False)
+    manager.update_movie_rating("1", 2.5)
+    manager.close()
+    assert os.path.getsize(catalog_file + ".journal") == 0
+    manager = mm.Movie_Manager(catalog_file)
+    assert manager.get_by_id("1").get_average_rating() == 2.5
+    manager.close()
+
+
+def test_corrupt_entries_are_skipped(mm, catalog_file, capsys):
+    manager = mm.Movie_Manager(catalog_file, journal=True, background_compaction=False)
+    manager.update_movie_rating("1", 9.5)
+    manager.close()
+    with open(catalog_file + ".journal", "ab") as file:
+        file.write(b"Action: update\nID: 2\nAverage Rating: high\n\n"
+                   b"Action: update\nID: 3\n\n"
+                   b"Action: update\nID: 4\nAverage Rating: 11\n\n"
+                   b"Action: add\nID: 9001\nTitle: Incomplete\n\n"
+                   b"Action: update\nID: 5\nAverage Rating: 1.5\n\n")
+
+    manager = mm.Movie_Manager(catalog_file, journal=True, background_compaction=False)
+    assert manager.get_by_id("1").get_average_rating() == 9.5
+    assert manager.get_by_id("5").get_average_rating() == 1.5
+    assert manager.get_by_id("9001") is None
+    assert manager.count() == 500
+    output = capsys.readouterr().out
+    assert "Skipped update of '2'" in output and "Skipped update of '3'" in output
+    assert "Skipped update of '4'" in output
+    manager.close()
+
+
+def test_refresh_skips_corrupt_entries(mm, catalog_file, capsys):
+    manager = mm.Movie_Manager(catalog_file, journal=True, background_compaction=False)
+    manager.update_movie_rating("1", 9.5)
+    with open(catalog_file + ".journal", "ab") as file:
+        file.write(b"Action: update\nID: 2\nAverage Rating: high\n\n"
+                   b"Action: update\nID: 5\nAverage Rating: 1.5\n\n")
+    assert manager.refresh()
+    assert manager.get_by_id("5").get_average_rating() == 1.5
+    assert "Skipped update of '2'" in capsys.readouterr().out
+    manager.close()
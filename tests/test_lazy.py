@@ -0,0 +1,45 @@
+"""
+Tests for lazy loading: the offset index agrees with a full load on malformed and repeated records.
+"""
+
+
+def corrupt(filename):
+    """
+    Gives record 3 an invalid rating, drops the title of record 4 and repeats record 5 with a new rating.
+    """
+    with open(filename, encoding="utf-8") as file:
+        records = file.read().strip().split("\n\n")
+    records[3] = records[3].replace(records[3].splitlines()[7], "Average Rating: abc")
+    records[4] = "\n".join(line for line in records[4].splitlines() if not line.startswith("Title: "))
+    records.append(records[5].replace(records[5].splitlines()[7], "Average Rating: 1.5"))
+    with open(filename, "w", encoding="utf-8") as file:
+        file.write("\n\n".join(records) + "\n")
+
+
+def test_malformed_records_are_left_out(mm, catalog_file):
+    corrupt(catalog_file)
+    catalog = mm.Lazy_Text_Catalog(catalog_file)
+
+    assert len(catalog) == 498
+    assert "3" not in catalog and "4" not in catalog
+    assert len(list(catalog)) == 498
+    assert len(list(catalog.values())) == 498
+    assert catalog["5"].get_average_rating() == 1.5
+    messages = [message for line, message in catalog.get_load_errors()]
+    assert any("'3'" in message for message in messages)
+    assert any("'4'" in message for message in messages)
+    catalog.close()
+
+
+def test_lazy_manager_matches_a_full_load(mm, catalog_file):
+    corrupt(catalog_file)
+    eager = mm.Movie_Manager(catalog_file)
+    lazy = mm.Movie_Manager(catalog_file, lazy=True)
+
+    for types in ("Movie", "Show"):
+        assert [movie.get_id() for movie in lazy.page(types, None, 1000)[0]] == \
+            [movie.get_id() for movie in eager.page(types, None, 1000)[0]]
+    assert lazy.get_by_id("3") is None and lazy.get_by_id("4") is None
+    assert lazy.get_by_id("5").get_average_rating() == 1.5
+    lazy.close()
+    eager.close()
@@ -0,0 +1,87 @@
+"""
+Tests for the operation metrics: snapshot counts, bytes written by saves and the Prometheus text output.
+"""
+
+import os
+import re
+
+import pytest
+
+from tests.conftest import record
+
+SAMPLE = re.compile(r'^(\w+)\{operation="(\w+)"(?:,le="([^"]+)")?\} (\S+)$')
+
+
+def test_snapshot_counts_calls_records_and_bytes(mm, catalog_file):
+    manager = mm.Movie_Manager(catalog_file, metrics=True)
+    manager.search_by_field("genre", "drama")
+    manager.top_movies("rating", 7)
+    manager.top_movies("views", 3)
+    manager.bulk_update_ratings({"1": 2.0, "2": 3.0})
+    snapshot = manager.metrics()
+
+    assert snapshot["top_movies"]["count"] == 2
+    assert snapshot["top_movies"]["records"] == 10
+    assert snapshot["top_movies"]["histogram"]["+Inf"] == 2
+    assert snapshot["bulk_update_ratings"]["records"] == 2
+    # Outside journal mode a save rewrites the whole file.
+    assert snapshot["persist"]["count"] == 1
+    assert snapshot["persist"]["bytes_written"] == os.path.getsize(catalog_file)
+    assert snapshot["search_by_field"]["records"] == len(manager.search_by_field("genre", "drama"))
+    manager.close()
+
+
+def test_journal_saves_count_the_appended_bytes(mm, catalog_file):
+    manager = mm.Movie_Manager(catalog_file, journal=True, background_compaction=False, metrics=True)
+    manager.bulk_add([mm.Catalog_Parser.build_movie(record(9001))])
+    assert manager.metrics()["persist"]["bytes_written"] == os.path.getsize(catalog_file + ".journal")
+    manager.close()
+
+
+def test_prometheus_output_parses(mm, catalog_file, tmp_path):
+    manager = mm.Movie_Manager(catalog_file, metrics=True)
+    for _ in range(3):
+        manager.page("Movie", None, 20)
+    manager.bulk_remove(["1"])
+    filename = str(tmp_path / "metrics.prom")
+    manager.write_metrics(filename)
+    snapshot = manager.metrics()
+
+    buckets = {}
+    samples = {}
+    with open(filename) as file:
+        for line in file:
+            line = line.rstrip("\n")
+            if line.startswith("#"):
+                assert re.match(r"^# (HELP|TYPE) movie_manager_\w+ .+$", line), line
+                continue
+            match = SAMPLE.match(line)
+            assert match, line
+            name, operation, bound, value = match.groups()
+            value = float(value)
+            if bound is not None:
+                buckets.setdefault(operation, []).append((bound, value))
+            else:
+                samples[name, operation] = value
+
+    assert set(buckets) == set(snapshot)
+    for operation, stats in snapshot.items():
+        counts = [count for _, count in buckets[operation]]
+        assert counts == sorted(counts)
+        assert buckets[operation][-1] == ("+Inf", stats["count"])
+        assert [float(bound) for bound, _ in buckets[operation][:-1]] == list(mm.Movie_Metrics.BUCKETS)
+        assert samples["movie_manager_operation_seconds_count", operation] == stats["count"]
+        assert samples["movie_manager_operation_seconds_sum", operation] == pytest.approx(stats["seconds"])
+        assert samples["movie_manager_records_total", operation] == stats["records"]
+        assert samples["movie_manager_bytes_written_total", operation] == stats["bytes_written"]
+    assert snapshot["page"]["count"] == 3
+    manager.close()
+
+
+def test_metrics_are_off_by_default(mm, catalog_file, tmp_path):
+    manager = mm.Movie_Manager(catalog_file)
+    manager.top_movies("rating", 5)
+    assert manager.metrics() == {}
+    with pytest.raises(ValueError):
+        manager.write_metrics(str(tmp_path / "metrics.prom"))
+    manager.close()
@@ -0,0 +1,200 @@
+"""
+Tests for delivering notifications to observers, synchronously and from the asynchronous queue.
+"""
+
+import threading
+
+import pytest
+
+from tests.conftest import record
+
+
+@pytest.fixture
+def recorder(mm):
+    class Recorder(mm.Movie_observer):
+        """
+        Records (action, ID) pairs; waits for the gate before handling a movie with ID "gate".
+        """
+
+        def __init__(self):
+            self.events = []
+            self.entered = threading.Event()
+            self.gate = threading.Event()
+
+        def update_viewer(self, movie, action):
+            if movie.get_id() == "gate":
+                self.entered.set()
+                self.gate.wait(10)
+            self.events.append((action.name, movie.get_id()))
+
+        def update_observer(self, movie, action):
+            pass
+
+    return Recorder()
+
+
+def queue_behind_gate(mm, dispatcher, recorder, notifications):
+    """
+    Queues notifications while the worker is held up by the gate, then releases it and waits for delivery.
+    """
+    gate = mm.Catalog_Parser.build_movie(record("gate"))
+    dispatcher.dispatch([recorder], gate, mm.Movie_Action.ADDED)
+    assert recorder.entered.wait(10)
+    for movie, action, batch in notifications:
+        dispatcher.dispatch([recorder], movie, action, batch)
+    recorder.gate.set()
+    assert dispatcher.flush(10)
+    dispatcher.close()
+    return recorder.events[1:]
+
+
+def test_coalesce_keeps_the_order_of_different_actions(mm, recorder):
+    x = mm.Catalog_Parser.build_movie(record("x"))
+    events = queue_behind_gate(mm, mm.Async_Observer_Dispatcher(backpressure="coalesce"), recorder, [
+        (x, mm.Movie_Action.ADDED, False),
+        (x, mm.Movie_Action.DELETED, False),
+        (x, mm.Movie_Action.ADDED, False),
+    ])
+    assert events == [("ADDED", "x"), ("DELETED", "x"), ("ADDED", "x")]
+
+
+def test_coalesce_merges_repeats_of_the_latest_action(mm, recorder):
+    x = mm.Catalog_Parser.build_movie(record("x"))
+    y = mm.Catalog_Parser.build_movie(record("y"))
+    updated = mm.Movie_Action.RATING_UPDATED
+    events = queue_behind_gate(mm, mm.Async_Observer_Dispatcher(backpressure="coalesce"), recorder, [
+        (x, updated, False),
+        (y, updated, False),
+        (x, updated, False),
+        ([x], mm.Movie_Action.DELETED, True),
+        (x, mm.Movie_Action.ADDED, False),
+        (x, mm.Movie_Action.ADDED, False),
+    ])
+    assert events == [("RATING_UPDATED", "x"), ("RATING_UPDATED", "y"), ("DELETED", "x"), ("ADDED", "x")]
+
+
+def test_block_delivers_everything_in_order(mm, recorder):
+    movies = [mm.Catalog_Parser.build_movie(record(number)) for number in range(5)]
+    dispatcher = mm.Async_Observer_Dispatcher(max_size=2)
+    dispatcher.dispatch([recorder], movies[0], mm.Movie_Action.ADDED)
+    for movie in movies:
+        dispatcher.dispatch([recorder], movie, mm.Movie_Action.RATING_UPDATED)
+    dispatcher.close()
+    # After close, notifications are delivered right away.
+    dispatcher.dispatch([recorder], movies[0], mm.Movie_Action.DELETED)
+    assert recorder.events == [("ADDED", "0")] + [("RATING_UPDATED", str(number)) for number in range(5)] + [
+        ("DELETED", "0")]
+
+
+def test_drop_oldest_drops_when_full(mm, recorder):
+    dispatcher = mm.Async_Observer_Dispatcher(max_size=2, backpressure="drop_oldest")
+    movies = [mm.Catalog_Parser.build_movie(record(number)) for number in range(4)]
+    events = queue_behind_gate(mm, dispatcher, recorder,
+                               [(movie, mm.Movie_Action.ADDED, False) for movie in movies])
+    assert events == [("ADDED", "2"), ("ADDED", "3")]
+    assert dispatcher.get_dropped() == 2
+
+
+def test_failing_observer_does_not_stop_the_others(mm, catalog_file, recorder, capsys):
+    class Failing(mm.Movie_observer):
+        def update_viewer(self, movie, action):
+            raise RuntimeError("observer failed")
+
+        def update_observer(self, movie, action):
+            pass
+
+    manager = mm.Movie_Manager(catalog_file, dispatcher=mm.Async_Observer_Dispatcher())
+    manager.add_observer(Failing())
+    manager.add_observer(recorder)
+    manager.update_movie_rating("1", 4.0)
+    manager.flush()
+    assert recorder.events == [("RATING_UPDATED", "1")]
+    assert "observer failed" in capsys.readouterr().out
+    manager.close()
+
+
+def test_observers_that_read_the_catalog_do_not_block_writers(mm, catalog_file):
+    manager = mm.Movie_Manager(catalog_file, dispatcher=mm.Async_Observer_Dispatcher(max_size=2))
+
+    class Reader(mm.Movie_observer):
+        def __init__(self):
+            self.ratings = []
+
+        def update_viewer(self, movie, action):
+            # Needs the read lock, which a writer still holding the write lock would never give up.
+            self.ratings.append(manager.get_by_id(movie.get_id()).get_average_rating())
+
+        def update_observer(self, movie, action):
+            pass
+
+    reader = Reader()
+    manager.add_observer(reader)
+
+    def update():
+        for step in range(10):
+            manager.update_movie_rating("1", step / 2)
+
+    writer = threading.Thread(target=update, daemon=True)
+    writer.start()
+    writer.join(10)
+    assert not writer.is_alive()
+    assert manager.flush(10)
+    assert len(reader.ratings) == 10
+    manager.close()
+
+
+def test_notifications_are_sent_after_the_locks_are_released(mm, catalog_file):
+    manager = mm.Movie_Manager(catalog_file)
+    held = []
+
+    class Prober(mm.Movie_observer):
+        def update_viewer(self, movie, action):
+            # Another thread can only take the write lock if the change has released it.
+            prober = threading.Thread(target=lambda: held.append(manager.get_by_id("1") is not None))
+            prober.start()
+            prober.join(5)
+            held.append(prober.is_alive())
+
+        def update_observer(self, movie, action):
+            pass
+
+    manager.add_observer(Prober())
+    manager.bulk_update_ratings({"1": 2.0})
+    assert held == [True, False]
+    manager.close()
+
+
+def test_subscriptions_filter_actions(mm, catalog_file, recorder):
+    manager = mm.Movie_Manager(catalog_file)
+    manager.subscribe(recorder, [mm.Movie_Action.RATING_UPDATED])
+    manager.bulk_add([mm.Catalog_Parser.build_movie(record(9001))])
+    manager.update_movie_rating("9001", 3.0)
+    manager.bulk_update_ratings({"1": 4.0, "2": 5.0})
+    manager.remove_movie("9001")
+    manager.bulk_remove(["3"])
+    assert recorder.events == [("RATING_UPDATED", "9001"), ("RATING_UPDATED", "1"), ("RATING_UPDATED", "2")]
+
+    # Action numbers work too; unsubscribing from one action keeps the others.
+    manager.subscribe(recorder, [5])
+    manager.unsubscribe(recorder, [mm.Movie_Action.RATING_UPDATED])
+    manager.update_movie_rating("1", 6.0)
+    manager.remove_movie("4")
+    assert recorder.events[3:] == [("DELETED", "4")]
+
+    manager.unsubscribe(recorder)
+    manager.remove_movie("5")
+    assert len(recorder.events) == 4
+    with pytest.raises(ValueError):
+        manager.subscribe(recorder, [3])
+    manager.close()
+
+
+def test_every_action_is_sent_to_plain_observers(mm, catalog_file, recorder):
+    manager = mm.Movie_Manager(catalog_file)
+    manager.add_observer(recorder)
+    manager.bulk_add([mm.Catalog_Parser.build_movie(record(9001))])
+    manager.update_movie_rating("9001", 3.0)
+    manager.remove_movie("9001")
+    assert recorder.events == [("ADDED", "9001"), ("RATING_UPDATED", "9001"), ("DELETED", "9001")]
+    assert [mm.Movie_Action[name] for name, _ in recorder.events] == [1, 2, 5]
+    manager.close()
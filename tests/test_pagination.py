@@ -0,0 +1,52 @@
+"""
+Tests for cursor-based pagination over the Movie and Show partitions.
+"""
+
+import pytest
+
+
+def walk(manager, types, size):
+    found = []
+    cursor = None
+    while True:
+        movies, cursor = manager.page(types, cursor, size)
+        found += [movie.get_id() for movie in movies]
+        if cursor is None:
+            return found
+
+
+@pytest.mark.parametrize("size", [1, 7, 1000])
+def test_pages_cover_each_type_once_in_catalog_order(mm, catalog_file, size):
+    manager = mm.Movie_Manager(catalog_file)
+    for types in ("Movie", "Show"):
+        found = walk(manager, types, size)
+        assert len(found) == len(set(found)) == manager.count(types)
+        assert all(manager.get_by_id(id).get_type() == types for id in found)
+        # The synthetic catalog is written in ID order.
+        assert found == sorted(found, key=int)
+    manager.close()
+
+
+def test_cursors_stay_valid_while_the_catalog_changes(mm, catalog_file):
+    manager = mm.Movie_Manager(catalog_file)
+    first, cursor = manager.page("Movie", None, 10)
+    manager.bulk_remove([first[0].get_id(), first[-1].get_id()])
+    second, _ = manager.page("Movie", cursor, 10)
+    assert not {movie.get_id() for movie in first} & {movie.get_id() for movie in second}
+    manager.close()
+
+
+def test_page_size_must_be_positive(mm, catalog_file):
+    manager = mm.Movie_Manager(catalog_file)
+    for size in (0, -1):
+        with pytest.raises(ValueError):
+            manager.page("Movie", None, size)
+    with pytest.raises(ValueError):
+        manager.page("Film")
+    manager.close()
+
+
+def test_query_limit_must_be_positive(mm, catalog_file, capsys):
+    with pytest.raises(SystemExit):
+        mm.run_command(["--data", catalog_file, "query", "--genre", "Drama", "--limit", "0"])
+    assert "must be at least 1" in capsys.readouterr().err
@@ -0,0 +1,107 @@
+"""
+Tests for reading the text format: the line numbers of reported errors, and duplicate IDs on load.
+"""
+
+from tests.conftest import record
+
+
+def text_record(fields):
+    """
+    Returns the lines of a record in the data file format.
+    """
+    return [f"{key}: {value}\n" for key, value in fields.items()]
+
+
+def test_errors_point_at_their_lines(mm):
+    bad_rating = dict(record(2), **{"Average Rating": "abc"})
+    missing_title = {key: value for key, value in record(3).items() if key != "Title"}
+    lines = (["\n"] + text_record(record(1)) + ["\n", "\n"] + text_record(bad_rating) + ["\n"] +
+             text_record(record(4))[:3] + ["no separator here\n"] + text_record(record(4))[3:] + ["\n"] +
+             text_record(missing_title))
+    parser = mm.Catalog_Parser()
+    parsed = list(parser.parse_records(lines))
+
+    assert [(line, movie.get_id()) for line, movie in parsed] == [(2, "1"), (29, "4")]
+    assert parser.get_errors() == [
+        (16, "Skipped record '2': Invalid number: could not convert string to float: 'abc'."),
+        (32, "Expected 'Key: value', got 'no separator here'."),
+        (43, "Skipped record '3': Missing field(s): Title."),
+    ]
+    for line, message in parser.get_errors()[:2]:
+        assert lines[line - 1].startswith("ID: 2") or "no separator here" in lines[line - 1]
+
+    # A slice of a larger file is numbered from its first line.
+    parser = mm.Catalog_Parser()
+    assert [line for line, _ in parser.parse_records(lines[15:], 16)] == [29]
+    assert [line for line, _ in parser.get_errors()] == [16, 32, 43]
+
+
+def test_windows_line_endings(mm):
+    lines = [line.replace("\n", "\r\n") for line in text_record(record(1)) + ["\n"] + text_record(record(2))]
+    movies = list(mm.Catalog_Parser().parse(lines))
+    assert [movie.get_id() for movie in movies] == ["1", "2"]
+    assert movies[0].get_movie_title() == "Test Title 1"
+
+
+def test_duplicate_ids_are_reported_on_load(mm, tmp_path):
+    filename = str(tmp_path / "movies_data.txt")
+    with open(filename, "w") as file:
+        file.writelines(text_record(record(1)) + ["\n"] + text_record(record(2)) + ["\n"] +
+                        text_record(record(1, rating=2.5)))
+    manager = mm.Movie_Manager(filename)
+    assert manager.get_load_errors() == [(27, "Duplicate ID '1', replaces the earlier record.")]
+    assert manager.get_by_id("1").get_average_rating() == 2.5
+    assert manager.count() == 2
+    manager.close()
+
+
+def corrupt_catalog(filename):
+    """
+    Breaks the rating of every 37th record, adds a line without a separator to every 53rd and repeats a few IDs
+    further down, so errors land in every chunk of a parallel parse.
+    """
+    with open(filename) as file:
+        records = file.read().strip().split("\n\n")
+    for number in range(0, len(records), 37):
+        records[number] = records[number].replace("Average Rating: ", "Average Rating: x")
+    for number in range(5, len(records), 53):
+        records[number] = records[number].replace("\nDirector: ", "\nbroken line\nDirector: ")
+    for number in (450, 300, 100):
+        records.insert(number + 40, records[number].replace("Average Rating: ", "Average Rating: 1"))
+    with open(filename, "w") as file:
+        file.write("\n\n".join(records) + "\n")
+
+
+def test_parallel_parse_matches_sequential(mm, catalog_file, monkeypatch):
+    corrupt_catalog(catalog_file)
+    sequential = mm.Catalog_Parser()
+    expected = [(line, mm.Catalog_Parser.to_row(movie)) for line, movie in sequential.parse_file(catalog_file, 1)]
+
+    monkeypatch.setattr(mm.Catalog_Parser, "PARALLEL_MIN_BYTES", 0)
+    assert len(mm.Catalog_Parser.split_file(catalog_file, 12)) > 4
+    parallel = mm.Catalog_Parser()
+    actual = [(line, mm.Catalog_Parser.to_row(movie)) for line, movie in parallel.parse_file(catalog_file, 3)]
+
+    assert actual == expected
+    assert parallel.get_errors() == sequential.get_errors()
+    with open(catalog_file) as file:
+        lines = file.read().splitlines()
+    assert len(parallel.get_errors()) == 14 + 10
+    # Every error points at its own line, including those after a chunk boundary.
+    for line, message in parallel.get_errors():
+        if message.startswith("Expected"):
+            assert lines[line - 1] == "broken line"
+        else:
+            assert lines[line - 1] == f"ID: {message.split(chr(39))[1]}"
+
+    manager_errors = []
+    for workers in (1, 3):
+        manager = mm.Movie_Manager(catalog_file, workers=workers)
+        manager_errors.append(manager.get_load_errors())
+        manager.close()
+    assert manager_errors[0] == manager_errors[1]
+    duplicates = [(line, message) for line, message in manager_errors[1] if message.startswith("Duplicate ID")]
+    assert [message for _, message in duplicates] == [f"Duplicate ID '{id}', replaces the earlier record."
+                                                      for id in ("100", "300", "450")]
+    for line, message in duplicates:
+        assert lines[line - 1] == f"ID: {message.split(chr(39))[1]}"
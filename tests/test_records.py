@@ -0,0 +1,60 @@
+"""
+Tests for the records themselves: the cached text of a record follows every change to it.
+"""
+
+import pytest
+
+from tests.conftest import record
+
+
+def fresh_text(mm, movie):
+    """
+    Renders a record that has never been rendered before, with the same fields.
+    """
+    return mm.Catalog_Parser.build_movie(mm.Catalog_Parser.to_record(movie)).text_file()
+
+
+@pytest.mark.parametrize("types", ["Movie", "Show"])
+def test_cached_text_follows_changes(mm, types):
+    movie = mm.Catalog_Parser.build_movie(record(1, types=types))
+    text = movie.text_file()
+    assert movie.text_file() is text
+    assert "Average Rating: 7.0\n" in text
+
+    movie.set_movie_rating(8.5)
+    assert "Average Rating: 8.5\n" in movie.text_file()
+    movie.set_id("2")
+    assert movie.text_file().startswith("ID: 2\n")
+    movie.set_movie_title("Renamed")
+    assert "Title: Renamed\n" in movie.text_file()
+    assert movie.text_file() == fresh_text(mm, movie)
+
+    cached = movie.text_file()
+    with pytest.raises(ValueError):
+        movie.set_movie_rating(11)
+    assert movie.text_file() is cached
+
+
+def test_saved_file_follows_changes(mm, catalog_file):
+    manager = mm.Movie_Manager(catalog_file)
+    manager.get_by_id("1").text_file()
+    manager.update_movie_rating("1", 1.5)
+    manager.close()
+    with open(catalog_file) as file:
+        records = file.read().split("\n\n")
+    assert any(text.startswith("ID: 1\n") and "Average Rating: 1.5\n" in text for text in records)
+
+
+def test_release_date_cache_stays_bounded(mm, monkeypatch):
+    cache = mm.BaseFilm._BaseFilm__ordinals
+    monkeypatch.setattr(mm.BaseFilm, "ORDINAL_CACHE_SIZE", 10)
+    cache.clear()
+    for day in range(1, 29):
+        date = f"2020-02-{day:02d}"
+        movie = mm.Catalog_Parser.build_movie(dict(record(day), **{"Release Date": date}))
+        assert movie.get_release_ordinal() == mm.BaseFilm.release_ordinal(date)
+        assert len(cache) <= 10
+
+    invalid = mm.Movies("1", "Title", "Drama", "Studio 1", "not a date", 10, 7.0, "Director 1", "PG-13", 90)
+    assert invalid.get_release_ordinal() == 0
+    assert "not a date" not in cache
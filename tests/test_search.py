@@ -0,0 +1,39 @@
+"""
+Tests for searching by field text: multi-genre values and unknown fields, on the indexes and on SQLite.
+"""
+
+import pytest
+
+from tests.conftest import record
+
+
+@pytest.fixture(params=["text", "sqlite"])
+def manager(request, mm, tmp_path):
+    movies = [mm.Catalog_Parser.build_movie(record(1, genre="Action, Comedy")),
+              mm.Catalog_Parser.build_movie(record(2, genre="Comedy")),
+              mm.Catalog_Parser.build_movie(record(3, genre="Action"))]
+    if request.param == "sqlite":
+        manager = mm.Movie_Manager(storage=mm.Sqlite_Catalog_Storage(str(tmp_path / "catalog.db")))
+    else:
+        manager = mm.Movie_Manager(str(tmp_path / "movies_data.txt"))
+    manager.bulk_add(movies)
+    yield manager
+    manager.close()
+
+
+def found(manager, field, text):
+    return sorted(movie.get_id() for movie in manager.search_by_field(field, text))
+
+
+def test_multi_genre_text_is_found(manager):
+    assert found(manager, "genre", "action, comedy") == ["1"]
+    assert found(manager, "genre", "Comedy,Action") == ["1"]
+    assert found(manager, "genre", "tion, com") == ["1"]
+    assert found(manager, "genre", "comedy") == ["1", "2"]
+    assert found(manager, "genre", "action, drama") == []
+    assert found(manager, "genre", "") == ["1", "2", "3"]
+
+
+def test_unknown_field_is_rejected(manager):
+    with pytest.raises(ValueError):
+        manager.search_by_field("title", "x")
@@ -0,0 +1,54 @@
+"""
+Tests for the JSON service: rating updates and the rejection of invalid ratings.
+"""
+
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+
+@pytest.fixture
+def server(mm, catalog_file):
+    manager = mm.Movie_Manager(catalog_file)
+    server = mm.Catalog_Server(manager, ("127.0.0.1", 0), threads=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+    manager.close()
+
+
+def post_rating(server, id, body):
+    """
+    Posts a rating update and returns the status and the JSON document of the answer.
+    """
+    request = urllib.request.Request(f"{server.get_url()}/movies/{id}/rating", json.dumps(body).encode("utf-8"),
+                                     {"Content-Type": "application/json"}, method="POST")
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        with e:
+            return e.code, json.load(e)
+
+
+def test_rating_update(server):
+    assert post_rating(server, "1", {"rating": 8.5}) == (200, {"ID": "1", "Average Rating": 8.5})
+    assert server.manager.get_by_id("1").get_average_rating() == 8.5
+
+
+@pytest.mark.parametrize("rating", [True, False, "8.5", None, 11])
+def test_invalid_ratings_are_rejected(server, rating):
+    before = server.manager.get_by_id("1").get_average_rating()
+    status, document = post_rating(server, "1", {"rating": rating})
+    assert status == 400 and "error" in document
+    assert server.manager.get_by_id("1").get_average_rating() == before
+
+
+def test_unknown_movie(server):
+    assert post_rating(server, "no-such-id", {"rating": 5})[0] == 404
@@ -0,0 +1,39 @@
+"""
+Tests for Sorted_Index: order and range counts against a sorted list, through bucket splits and removals.
+"""
+
+import random
+
+
+def test_counts_match_a_sorted_list(mm):
+    class Small_Index(mm.Sorted_Index):
+        BUCKET_SIZE = 4
+
+    generator = random.Random(7)
+    pairs = [(generator.randint(0, 50) / 5, str(id)) for id in range(300)]
+    index = Small_Index(pairs[:100])
+    expected = sorted(pairs[:100])
+
+    def check():
+        assert list(index) == expected
+        assert list(reversed(index)) == expected[::-1]
+        assert len(index) == len(expected)
+        for _ in range(20):
+            low, high = sorted(generator.randint(-1, 11) for _ in range(2))
+            assert index.count_range(low, high) == sum(low <= key <= high for key, _ in expected)
+            assert list(index.range(low, high)) == [pair for pair in expected if low <= pair[0] <= high]
+        assert index.count_range(high=5) == sum(key <= 5 for key, _ in expected)
+        assert index.count_range(low=5) == sum(key >= 5 for key, _ in expected)
+
+    check()
+    for pair in pairs[100:]:
+        index.add(*pair)
+        expected.append(pair)
+    expected.sort()
+    check()
+    for pair in generator.sample(pairs, 280):
+        index.remove(*pair)
+        expected.remove(pair)
+    check()
+    index.remove(-1, "missing")
+    check()
@@ -0,0 +1,47 @@
+"""
+Tests for Title_Index: searches against a scan of every title, through replacements, removals and compaction.
+"""
+
+import random
+
+
+def test_searches_match_a_scan(mm):
+    generator = random.Random(3)
+
+    def title():
+        return "".join(generator.choice("abc ") for _ in range(generator.randint(1, 9))).strip() or "a"
+
+    titles = {str(id): title() for id in range(3000)}
+    index = mm.Title_Index()
+    for id, text in titles.items():
+        index.add(id, text.upper() if int(id) % 2 else text)
+
+    def check():
+        for text in ("a", "B", "ab", " ab", "abc", "ABCA", "cba c", "ccc", "zzz", ""):
+            normalized = text.strip().lower()
+            assert index.search(text) == [id for id, title in order.items() if normalized in title.lower()], text
+        for text in list(order.values())[:50] + ["not there"]:
+            assert index.contains_title(f"  {text.upper()} ") == any(title.lower() == text.lower()
+                                                                     for title in order.values())
+
+    order = dict(titles)
+    check()
+
+    # Replacing a title moves it to the end, as adding it again does.
+    for id in list(titles)[:100]:
+        titles[id] = title()
+        index.add(id, titles[id])
+        order.pop(id)
+        order[id] = titles[id]
+    check()
+
+    # Removing more than half of the titles compacts the index.
+    for id in generator.sample(list(titles), 2000):
+        index.remove(id)
+        order.pop(id)
+    index.remove("missing")
+    check()
+    for id in range(3000, 3100):
+        index.add(str(id), "abc abc")
+        order[str(id)] = "abc abc"
+    check()